@@ -1,59 +1,631 @@
 from fastapi.websockets import WebSocket
+import asyncio
 import json
-from typing import Dict, List, Optional
+import re
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
 from datetime import datetime
 
+from app.config import (
+    WS_SEND_QUEUE_SIZE,
+    WS_SEND_TIMEOUT,
+    WS_EVICT_AFTER,
+    WS_PING_INTERVAL,
+    WS_MAX_MISSED_PONGS,
+    WS_DEFAULT_TOPICS,
+    WS_STATUS_BATCH_WINDOW,
+    AUTO_ASSIGNMENT_INVITE_TIMEOUT,
+)
+from app.services.metrics import metrics
+from app.services.background import spawn
+from app.services.state_backend import StateBackend, get_state_backend
+from app.services.node_registry import NodeRegistry, get_node_registry
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+
+# Broadcast topics a session can subscribe to:
+#   agent:<id>    status updates about one agent (every session has its own agent's)
+#   agents        status updates about every agent
+#   rooms         every room update
+#   queue:<name>  room updates for calls in one queue
+#   *             everything (supervisors)
+_TOPIC = re.compile(r"^(\*|agents|rooms|agent:\d+|queue:[\w.-]+)$")
+
+
+def is_valid_topic(topic) -> bool:
+    return isinstance(topic, str) and _TOPIC.match(topic) is not None
+
+
+def encode_frame(message: dict) -> str:
+    """Serialize a message into a WebSocket text frame.
+
+    Frames stay text (not binary) because the browser client parses
+    ``event.data`` with ``JSON.parse``.
+    """
+    if orjson is not None:
+        return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(message)
+
+
+def stamp_frame(frame: str, seq: int) -> str:
+    """Prefix an encoded message with its per-session sequence number.
+
+    Splices the field into the JSON text so a broadcast is still encoded
+    only once, however many sessions it goes to.
+    """
+    return f'{{"seq":{seq},{frame[1:]}' if frame != "{}" else f'{{"seq":{seq}}}'
+
+
+# Queue entry standing for the snapshot begun by AgentConnection.begin_snapshot
+_SNAPSHOT = object()
+
+
+class AgentConnection:
+    """Outbound side of one agent WebSocket: a bounded queue drained by a writer task.
+
+    Frames carrying a coalesce key (e.g. one room's events) replace any
+    still-queued frame with the same key, so a slow socket only ever
+    receives the latest state instead of a backlog of stale updates.
+
+    Every frame is stamped with the next sequence number as it is written.
+    A dropped frame uses up a number, so the client sees the gap and asks
+    for a fresh snapshot; a coalesced one does not, since only the latest
+    state mattered.
+
+    A snapshot is slotted in where its state was captured (begin_snapshot):
+    frames queued before that go out first, frames queued while it is being
+    built wait behind it, so the client never applies an older snapshot
+    over newer deltas.
+    """
+
+    def __init__(self, websocket: WebSocket, agent_id: str, manager: "ConnectionManager"):
+        self.websocket = websocket
+        self.agent_id = agent_id
+        self.manager = manager
+        # Bounded by enqueue (WS_SEND_QUEUE_SIZE) rather than by the queue
+        # itself, so a snapshot marker always fits
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.coalesced: Dict[str, str] = {}
+        self.full_since: Optional[float] = None
+        # Pings sent since the last frame received from the agent
+        self.unanswered_pings = 0
+        # The stale listeners were told about this session's silence
+        self.stale_reported = False
+        # Broadcast topics this session receives (see is_valid_topic)
+        self.topics: Set[str] = set()
+        # Sequence number of the last frame written (or dropped)
+        self.seq = 0
+        # Set between begin_snapshot and the snapshot being written
+        self.snapshot_ready: Optional[asyncio.Event] = None
+        self.snapshot: Optional[str] = None
+        # Frames dropped while the snapshot was pending; their numbers are
+        # used up after it, since it cannot cover them
+        self.snapshot_gap = 0
+        self.writer_task: Optional[asyncio.Task] = None
+        self.closed = False
+
+    @property
+    def missed_pong(self) -> bool:
+        """A ping has gone a full interval without an answer.
+
+        The latest ping is counted as soon as it is sent and has had no time
+        to be answered, so it does not count as missed.
+        """
+        return self.unanswered_pings > 1
+
+    def start(self):
+        self.writer_task = asyncio.create_task(self._writer())
+
+    def stop(self):
+        self.closed = True
+        if self.writer_task and self.writer_task is not asyncio.current_task():
+            self.writer_task.cancel()
+
+    def enqueue(self, frame: str, coalesce_key: Optional[str] = None) -> bool:
+        """Queue a frame without blocking; returns False if it was dropped."""
+        if self.closed:
+            return False
+
+        if coalesce_key is not None and coalesce_key in self.coalesced:
+            # A frame for the same key is still waiting: overwrite it in place
+            self.coalesced[coalesce_key] = frame
+            return True
+
+        item: Tuple[Optional[str], Optional[str]] = (
+            (coalesce_key, None) if coalesce_key is not None else (None, frame)
+        )
+        if self.queue.qsize() >= WS_SEND_QUEUE_SIZE:
+            # The client notices the gap and resyncs
+            if self.snapshot_ready is not None:
+                self.snapshot_gap += 1
+            else:
+                self.seq += 1
+            metrics.inc("ws.frames_dropped")
+            now = time.monotonic()
+            if self.full_since is None:
+                self.full_since = now
+            elif now - self.full_since >= WS_EVICT_AFTER:
+                self.manager.evict(self, "send queue stayed full")
+            return False
+
+        self.queue.put_nowait(item)
+        self.full_since = None
+        if coalesce_key is not None:
+            self.coalesced[coalesce_key] = frame
+        return True
+
+    def begin_snapshot(self):
+        """Mark where a snapshot of the state as of now goes in the queue.
+
+        Frames queued so far are written before it. Their coalesce keys are
+        released, so a newer frame for the same key queues behind the
+        snapshot instead of overwriting one that goes out ahead of it.
+        """
+        if self.closed or self.snapshot_ready is not None:
+            return
+        queued = []
+        while not self.queue.empty():
+            coalesce_key, frame = self.queue.get_nowait()
+            if coalesce_key is not None:
+                frame = self.coalesced.pop(coalesce_key, None)
+                if frame is None:
+                    continue
+            queued.append((None, frame))
+        self.coalesced.clear()
+        for item in queued:
+            self.queue.put_nowait(item)
+        self.queue.put_nowait(_SNAPSHOT)
+        self.snapshot = None
+        self.snapshot_gap = 0
+        self.snapshot_ready = asyncio.Event()
+
+    def end_snapshot(self, frame: str):
+        """Hand over the snapshot started by begin_snapshot"""
+        if self.snapshot_ready is None:
+            return
+        self.snapshot = frame
+        self.snapshot_ready.set()
+
+    async def _writer(self):
+        try:
+            while True:
+                item = await self.queue.get()
+                if item is _SNAPSHOT:
+                    # Hold everything queued after it until it is built
+                    await self.snapshot_ready.wait()
+                    self.seq += 1
+                    await asyncio.wait_for(
+                        self.websocket.send_text(stamp_frame(self.snapshot, self.seq)),
+                        timeout=WS_SEND_TIMEOUT,
+                    )
+                    self.seq += self.snapshot_gap
+                    self.snapshot_ready, self.snapshot, self.snapshot_gap = None, None, 0
+                    continue
+                coalesce_key, frame = item
+                if coalesce_key is not None:
+                    frame = self.coalesced.pop(coalesce_key, None)
+                    if frame is None:
+                        continue
+                self.seq += 1
+                await asyncio.wait_for(
+                    self.websocket.send_text(stamp_frame(frame, self.seq)),
+                    timeout=WS_SEND_TIMEOUT,
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[WebSocket] Writer for agent {self.agent_id} failed: {e!r}")
+            self.manager.evict(self, "send failed")
+
+
+# Shared registry of which workers hold each agent's sessions, and the agents
+# each worker holds sessions for (so a dead worker's agents are found without a scan)
+def _agent_nodes(agent_id: str) -> str:
+    return f"ws_nodes:{agent_id}"
+
+
+def _node_agents(node_id: str) -> str:
+    return f"ws_agents:{node_id}"
+
 
 class ConnectionManager:
-    def __init__(self):
-        # Maps agent_id to their active WebSocket connection
-        self.active_connections: Dict[str, WebSocket] = {}
+    """Agent WebSockets held by this worker, with fan-out to the other workers.
+
+    An agent may have several sessions at once (tabs, devices), on any mix
+    of workers; every message for the agent goes to all of them, and the
+    agent only counts as disconnected once the last one is gone. A message
+    for sessions on another worker is published on that worker's own
+    delivery channel, so no worker has to be sticky. Broadcasts go to every
+    worker, and each worker hands them only to sessions subscribed to one
+    of the broadcast's topics, found through a topic -> sessions index.
+
+    Sessions are pinged every WS_PING_INTERVAL seconds. An agent none of
+    whose sessions answers is reported to the stale listeners; a session
+    that misses WS_MAX_MISSED_PONGS pongs is dropped. Sessions registered to
+    a worker that stops heartbeating are dropped too.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[StateBackend] = None,
+        nodes: Optional[NodeRegistry] = None,
+    ):
+        # Maps agent_id to their open sessions on this worker
+        self.active_connections: Dict[str, Set[AgentConnection]] = {}
+        self.session_count = 0
+        # topic -> sessions on this worker subscribed to it
+        self.subscribers: Dict[str, Set[AgentConnection]] = {}
+        # Status changes waiting for the next status_updates frame: agent_id -> update
+        self.status_batch_window = WS_STATUS_BATCH_WINDOW
+        self.pending_statuses: Dict[str, dict] = {}
+        self._status_flush: Optional[asyncio.Task] = None
+        self.backend = backend if backend is not None else get_state_backend()
+        self.nodes = nodes if nodes is not None else get_node_registry()
+        self._disconnect_listeners: List[Callable[[str, str], Awaitable[None]]] = []
+        self._stale_listeners: List[Callable[[str], None]] = []
+        self.backend.subscribe(self._deliver_channel(self.backend.node_id), self._on_deliver)
+        self.backend.subscribe("ws.broadcast", self._on_broadcast)
+        self.nodes.add_listener(on_lost=self._on_node_lost, on_rejoin=self._on_rejoin)
+
+    @staticmethod
+    def _deliver_channel(node_id: str) -> str:
+        return f"ws.deliver.{node_id}"
+
+    def add_disconnect_listener(self, listener: Callable[[str, str], Awaitable[None]]):
+        """Register an async listener(agent_id, reason) for an agent's last session
+        going away; reason is "closed", "evicted", "unresponsive" or "worker_lost"
+        """
+        self._disconnect_listeners.append(listener)
+
+    def add_stale_listener(self, listener: Callable[[str], None]):
+        """Register a listener(agent_id) for agents whose sessions missed a pong"""
+        self._stale_listeners.append(listener)
+
+    async def _notify_disconnect(self, agent_id: str, reason: str):
+        for listener in self._disconnect_listeners:
+            try:
+                await listener(agent_id, reason)
+            except Exception as e:
+                print(f"[ConnectionManager] Disconnect listener failed for agent {agent_id}: {e!r}")
 
-    async def connect(self, websocket: WebSocket, agent_id: str):
-        """Connect a new WebSocket for an agent."""
+    async def connect(self, websocket: WebSocket, agent_id: str) -> AgentConnection:
+        """Accept a new session for an agent; their other sessions stay open."""
         print(f"[ConnectionManager] Accepting WebSocket for agent {agent_id}")
         await websocket.accept()
         print(
             f"[ConnectionManager] WebSocket accepted, storing connection for agent {agent_id}"
         )
-        self.active_connections[agent_id] = websocket
+        connection = AgentConnection(websocket, agent_id, self)
+        connection.start()
+        self._subscribe(connection, [*WS_DEFAULT_TOPICS, f"agent:{agent_id}"])
+        sessions = self.active_connections.setdefault(agent_id, set())
+        sessions.add(connection)
+        self._count_sessions(1)
+        if len(sessions) == 1:
+            await self._register(agent_id)
         print(
             f"[ConnectionManager] Active connections after connect: {list(self.active_connections.keys())}"
         )
+        return connection
 
-    def disconnect(self, agent_id: str):
-        """Disconnect and remove a WebSocket connection."""
-        if agent_id in self.active_connections:
-            del self.active_connections[agent_id]
+    async def _register(self, agent_id: str):
+        await self.backend.sadd(_agent_nodes(agent_id), self.backend.node_id)
+        await self.backend.sadd(_node_agents(self.backend.node_id), agent_id)
+
+    async def disconnect(self, connection: AgentConnection, reason: str = "closed") -> bool:
+        """Remove one session.
 
-    async def send_personal_message(self, message: dict, agent_id: str):
-        """Send a message to a specific agent."""
-        print(f"[WebSocket] Attempting to send message to agent {agent_id}: {message}")
-        print(f"[WebSocket] Active connections: {list(self.active_connections.keys())}")
+        Returns True, after running the disconnect listeners, if it was the
+        agent's last session on any worker. Removing a session twice (e.g.
+        evicted, then closed) is a no-op.
+        """
+        connection.stop()
+        agent_id = connection.agent_id
+        sessions = self.active_connections.get(agent_id)
+        if sessions is None or connection not in sessions:
+            return False
+        sessions.discard(connection)
+        self._unsubscribe(connection, list(connection.topics))
+        self._count_sessions(-1)
+        if sessions:
+            return False
 
+        del self.active_connections[agent_id]
+        await self.backend.srem(_agent_nodes(agent_id), self.backend.node_id)
+        await self.backend.srem(_node_agents(self.backend.node_id), agent_id)
         if agent_id in self.active_connections:
-            try:
-                await self.active_connections[agent_id].send_json(message)
-                print(f"[WebSocket] Message sent successfully to agent {agent_id}")
-            except Exception as e:
-                print(f"[WebSocket] Error sending message to agent {agent_id}: {e}")
+            # A new session opened while we were unregistering
+            await self._register(agent_id)
+            return False
+        if await self.backend.smembers(_agent_nodes(agent_id)):
+            return False  # still connected to another worker
+        await self._notify_disconnect(agent_id, reason)
+        return True
+
+    def update_topics(
+        self,
+        connection: AgentConnection,
+        topics: Iterable[str],
+        subscribe: bool = True,
+        replace: bool = False,
+    ) -> List[str]:
+        """Apply a client's subscribe/unsubscribe request and acknowledge it.
+
+        Unknown topics are ignored, and a session always keeps its own
+        agent's topic. Returns the session's topics afterwards.
+        """
+        topics = [topic for topic in topics if is_valid_topic(topic)]
+        own = f"agent:{connection.agent_id}"
+        if replace:
+            self._unsubscribe(connection, [t for t in connection.topics if t != own])
+        if subscribe:
+            self._subscribe(connection, topics)
         else:
-            print(f"[WebSocket] Agent {agent_id} not found in active connections")
+            self._unsubscribe(connection, [topic for topic in topics if topic != own])
+        current = sorted(connection.topics)
+        connection.enqueue(encode_frame({"type": "subscribed", "topics": current}))
+        return current
+
+    def _subscribe(self, connection: AgentConnection, topics: Iterable[str]):
+        for topic in topics:
+            connection.topics.add(topic)
+            self.subscribers.setdefault(topic, set()).add(connection)
+
+    def _unsubscribe(self, connection: AgentConnection, topics: Iterable[str]):
+        for topic in topics:
+            connection.topics.discard(topic)
+            subscribers = self.subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(connection)
+                if not subscribers:
+                    del self.subscribers[topic]
+
+    def _count_sessions(self, delta: int):
+        self.session_count += delta
+        metrics.set_gauge("ws.sessions", self.session_count)
+
+    async def _on_node_lost(self, node_id: str):
+        """Drop the sessions a dead worker held; its agents may be unreachable"""
+        for agent_id in await self.backend.smembers(_node_agents(node_id)):
+            await self.backend.srem(_node_agents(node_id), agent_id)
+            # Every worker runs this; only the one whose srem lands reports the
+            # agent, and only if no session is left anywhere else
+            if (
+                await self.backend.srem(_agent_nodes(agent_id), node_id)
+                and agent_id not in self.active_connections
+                and not await self.backend.smembers(_agent_nodes(agent_id))
+            ):
+                metrics.inc("ws.ghosts_reaped")
+                await self._notify_disconnect(agent_id, "worker_lost")
+
+    def seen(self, connection: AgentConnection):
+        """The session sent a frame (a pong or anything else)"""
+        connection.unanswered_pings = 0
+        connection.stale_reported = False
+
+    async def run_heartbeat(self, interval: float = WS_PING_INTERVAL):
+        """Ping every session on this worker and drop the ones that stop answering"""
+        while True:
+            await asyncio.sleep(interval)
+            await self.ping_all()
+
+    async def ping_all(self, max_missed: int = WS_MAX_MISSED_PONGS):
+        frame = encode_frame({"type": "ping", "ts": time.time()})
+        for agent_id, sessions in list(self.active_connections.items()):
+            for connection in list(sessions):
+                if connection.unanswered_pings >= max_missed:
+                    # Half-open sockets never raise on receive; drop them from here
+                    metrics.inc("ws.unresponsive_dropped")
+                    self.evict(
+                        connection,
+                        f"missed {connection.unanswered_pings} pongs",
+                        reason="unresponsive",
+                    )
+                    continue
+                connection.unanswered_pings += 1
+                connection.enqueue(frame)
+
+            # Stale from the first ping interval in which no session answered,
+            # unless the agent is also connected to another worker
+            live = [connection for connection in sessions if not connection.closed]
+            if (
+                live
+                and all(connection.missed_pong for connection in live)
+                and not all(connection.stale_reported for connection in live)
+                and len(await self.backend.smembers(_agent_nodes(agent_id))) <= 1
+            ):
+                for connection in live:
+                    connection.stale_reported = True
+                for listener in self._stale_listeners:
+                    listener(agent_id)
+
+    async def _on_rejoin(self, node_id: str):
+        # Other workers dropped our sessions from the registry and marked the
+        # agents offline; closing makes the clients reconnect and register again
+        for sessions in list(self.active_connections.values()):
+            for connection in list(sessions):
+                self.evict(connection, "worker was declared lost")
+
+    def evict(self, connection: AgentConnection, detail: str, reason: str = "evicted"):
+        """Drop a session that cannot keep up (or answer) and close it in the background."""
+        if connection.closed:
+            return
+        print(f"[ConnectionManager] Evicting agent {connection.agent_id}: {detail}")
+        connection.stop()
+        spawn(self.disconnect(connection, reason), f"Disconnecting agent {connection.agent_id}")
+        # Closing makes the endpoint's receive loop raise WebSocketDisconnect
+        spawn(self._close_quietly(connection.websocket), f"Closing agent {connection.agent_id}'s socket")
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), timeout=WS_SEND_TIMEOUT)
+        except Exception:
+            pass
+
+    async def send_personal_message(
+        self, message: dict, agent_id: str, coalesce_key: Optional[str] = None
+    ) -> bool:
+        """Send a message to every session of an agent.
+
+        Returns False if no session, here or on another worker, could be given it.
+        """
+        frame = encode_frame(message)
+        delivered = False
+        for connection in list(self.active_connections.get(agent_id, ())):
+            delivered = connection.enqueue(frame, coalesce_key) or delivered
+
+        # The agent may also have sessions on other workers
+        for node_id in await self.backend.smembers(_agent_nodes(agent_id)):
+            if node_id == self.backend.node_id:
+                continue
+            if not self.nodes.is_alive(node_id):
+                print(f"[WebSocket] Skipping agent {agent_id}'s session on unresponsive worker {node_id}")
+                continue
+            await self.backend.publish(
+                self._deliver_channel(node_id),
+                {
+                    "origin": self.backend.node_id,
+                    "agent_id": agent_id,
+                    "frame": frame,
+                    "coalesce_key": coalesce_key,
+                },
+            )
+            delivered = True
+
+        if not delivered:
+            print(f"[WebSocket] Could not deliver {message.get('type')} to agent {agent_id}")
+        return delivered
+
+    async def _on_deliver(self, message: dict):
+        for connection in list(self.active_connections.get(message["agent_id"], ())):
+            connection.enqueue(message["frame"], message.get("coalesce_key"))
+
+    async def broadcast(
+        self,
+        message: dict,
+        exclude: Optional[List[str]] = None,
+        coalesce_key: Optional[str] = None,
+        topics: Optional[List[str]] = None,
+    ):
+        """Broadcast a message to the agents subscribed to any of its topics
+        (to every agent if topics is None), except those in exclude list.
 
-    async def broadcast(self, message: dict, exclude: Optional[List[str]] = None):
-        """Broadcast a message to all connected agents except those in exclude list."""
+        The frame is serialized once and handed to each socket's writer task,
+        so one slow socket never delays delivery to the others.
+        """
         exclude = exclude or []
-        for agent_id, connection in self.active_connections.items():
-            if agent_id not in exclude:
-                await connection.send_json(message)
+        frame = encode_frame(message)
+        self._broadcast_local(frame, exclude, coalesce_key, topics)
+        await self.backend.publish(
+            "ws.broadcast",
+            {
+                "origin": self.backend.node_id,
+                "frame": frame,
+                "exclude": exclude,
+                "coalesce_key": coalesce_key,
+                "topics": topics,
+            },
+        )
+
+    def _broadcast_local(
+        self,
+        frame: str,
+        exclude: List[str],
+        coalesce_key: Optional[str],
+        topics: Optional[List[str]] = None,
+    ):
+        if topics is None:
+            targets = {
+                connection
+                for sessions in self.active_connections.values()
+                for connection in sessions
+            }
+        else:
+            targets = set(self.subscribers.get("*", ()))
+            for topic in topics:
+                targets.update(self.subscribers.get(topic, ()))
+        excluded = set(exclude)
+        sent = 0
+        for connection in targets:
+            if connection.agent_id not in excluded:
+                connection.enqueue(frame, coalesce_key)
+                sent += 1
+        metrics.inc("ws.broadcast_frames", sent)
+
+    async def _on_broadcast(self, message: dict):
+        if message["origin"] != self.backend.node_id:
+            self._broadcast_local(
+                message["frame"],
+                message["exclude"],
+                message.get("coalesce_key"),
+                message.get("topics"),
+            )
 
     async def broadcast_status_update(self, agent_id: str, status: str):
-        """Broadcast an agent's status change to all other agents."""
+        """Broadcast an agent's status change to the agents subscribed to it.
+
+        Changes made within status_batch_window seconds of each other go out
+        together in one status_updates frame, keeping only each agent's
+        latest status. The agent's own sessions get it too, so their other
+        tabs follow.
+        """
+        self.pending_statuses[agent_id] = {
+            "agent_id": agent_id,
+            "status": status,
+            "timestamp": str(datetime.now()),
+        }
+        if self.status_batch_window <= 0:
+            await self.flush_status_updates()
+        elif self._status_flush is None:
+            self._status_flush = asyncio.create_task(self._flush_status_later())
+
+    async def _flush_status_later(self):
+        try:
+            await asyncio.sleep(self.status_batch_window)
+        finally:
+            self._status_flush = None
+        await self.flush_status_updates()
+
+    async def flush_status_updates(self):
+        """Send the status changes collected so far as one frame"""
+        updates, self.pending_statuses = self.pending_statuses, {}
+        if not updates:
+            return
+        metrics.observe("ws.status_batch_size", len(updates))
         await self.broadcast(
-            {"type": "status_update", "agent_id": agent_id, "status": status},
-            exclude=[agent_id],  # Don't send back to the originating agent
+            {
+                "type": "status_updates",
+                "updates": list(updates.values()),
+                "timestamp": str(datetime.now()),
+            },
+            topics=["agents", *(f"agent:{agent_id}" for agent_id in updates)],
         )
 
+    async def send_snapshot(
+        self, connection: AgentConnection, build: Callable[[], Awaitable[dict]]
+    ) -> bool:
+        """Send one session a full state snapshot; deltas follow it.
+
+        The snapshot goes out in the place its state was captured, ahead of
+        anything queued while build() runs. A session that cannot be given
+        one is closed: the page reconnects and gets a snapshot then, rather
+        than checking sequence numbers against nothing forever.
+        """
+        connection.begin_snapshot()
+        try:
+            snapshot = await build()
+        except Exception as e:
+            print(f"[WebSocket] Snapshot for agent {connection.agent_id} failed: {e!r}")
+            self.evict(connection, "snapshot failed")
+            return False
+        connection.end_snapshot(encode_frame({"type": "snapshot", **snapshot}))
+        return True
+
     async def send_incoming_call(self, agent_id: str, call_data: dict):
         """Send incoming call notification to an agent."""
         message = {
@@ -82,21 +654,44 @@ class ConnectionManager:
         if room_data:
             message["room"] = room_data
 
-        await self.broadcast(message)
+        # Room events are kept per room; a bare refresh hint collapses into one
+        room_name = room_data.get("room_name") if room_data else None
+        topics = ["rooms"]
+        if room_data and room_data.get("queue"):
+            topics.append(f"queue:{room_data['queue']}")
+        await self.broadcast(
+            message,
+            coalesce_key=f"room:{room_name}" if room_name else "room",
+            topics=topics,
+        )
 
     async def notify_incoming_call(self, agent_id: str, call_data: dict):
         """For backward compatibility with existing code."""
         await self.send_incoming_call(agent_id, call_data)
 
-    async def send_call_invitation(self, agent_id: str, invitation_data: dict):
-        """Send call invitation to an agent for auto-assignment"""
+    async def send_call_invitation(self, agent_id: str, invitation_data: dict) -> bool:
+        """Send call invitation to an agent for auto-assignment.
+
+        Returns False when the agent has no live socket to deliver it to.
+        """
         message = {
             "type": "call_invitation",
             "room_name": invitation_data.get("room_name"),
             "caller_id": invitation_data.get("caller_id"),
             "call_id": invitation_data.get("call_id"),
             "timestamp": invitation_data.get("timestamp"),
-            "timeout": 30,  # 30 seconds to respond
+            # Seconds to respond
+            "timeout": invitation_data.get("timeout", AUTO_ASSIGNMENT_INVITE_TIMEOUT),
+        }
+        return await self.send_personal_message(message, agent_id)
+
+    async def send_call_invitation_revoked(self, agent_id: str, revoke_data: dict):
+        """Withdraw a call invitation (answered elsewhere, caller hung up, ...)"""
+        message = {
+            "type": "call_invitation_revoked",
+            "room_name": revoke_data.get("room_name"),
+            "call_id": revoke_data.get("call_id"),
+            "reason": revoke_data.get("reason"),
         }
         await self.send_personal_message(message, agent_id)
 
@@ -109,3 +704,12 @@ class ConnectionManager:
             "agent_id": assignment_data.get("agent_id"),
         }
         await self.send_personal_message(message, agent_id)
+
+
+# Single connection hub shared by every router and service in this process
+connection_manager = ConnectionManager()
+
+
+def get_connection_manager() -> ConnectionManager:
+    """Get the process-wide ConnectionManager (usable as a FastAPI dependency)"""
+    return connection_manager
@@ -14,9 +14,29 @@ APP_NAME = os.getenv('APP_NAME', 'Call Center API')
 SECRET_KEY = os.getenv('SECRET_KEY', 'replacethiswithyoursecretkey')
 ALGORITHM = os.getenv('ALGORITHM', 'HS256')
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', '480'))
+# Authenticated agent principals are cached per token for this many seconds
+AUTH_CACHE_TTL = float(os.getenv('AUTH_CACHE_TTL', '30'))
+AUTH_CACHE_MAX_SIZE = int(os.getenv('AUTH_CACHE_MAX_SIZE', '10000'))
+# bcrypt runs on a bounded worker pool so it never blocks the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Logins allowed to wait for a worker before new ones are turned away with 503
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', '500'))
 
 # Database settings
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./callcenter.db')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() in ('true', '1', 't')
+# Server-side statement timeout (Postgres); lock wait timeout for SQLite
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '15000'))
+# Leak detector: sample checked-out connections every N seconds and flag
+# connections held longer than DB_LEAK_HOLD_WARNING seconds
+DB_LEAK_CHECK_INTERVAL = float(os.getenv('DB_LEAK_CHECK_INTERVAL', '30'))
+DB_LEAK_HOLD_WARNING = float(os.getenv('DB_LEAK_HOLD_WARNING', '60'))
+# Single-node SQLite installs: WAL journal with synchronous=NORMAL
+SQLITE_WAL = os.getenv('SQLITE_WAL', 'True').lower() in ('true', '1', 't')
 
 # LiveKit settings
 LIVEKIT_API_KEY = os.getenv('LIVEKIT_API_KEY', 'replacewithyourapikey')
@@ -36,6 +56,89 @@ else:
 LIVEKIT_SIP_TRUNK_ID = os.getenv('LIVEKIT_SIP_TRUNK_ID', 'ST_n7M4h5eh3ypR')
 # LIVEKIT_SIP_TRUNK_ID = os.getenv('LIVEKIT_SIP_TRUNK_ID', 'ST_uQh2fSqVd487')
 
+# LiveKit HTTP client settings (one pooled client for the application lifetime)
+LIVEKIT_HTTP_POOL_SIZE = int(os.getenv('LIVEKIT_HTTP_POOL_SIZE', '100'))
+LIVEKIT_HTTP_KEEPALIVE = float(os.getenv('LIVEKIT_HTTP_KEEPALIVE', '60'))
+LIVEKIT_HTTP_TIMEOUT = float(os.getenv('LIVEKIT_HTTP_TIMEOUT', '10'))
+LIVEKIT_HTTP_RETRIES = int(os.getenv('LIVEKIT_HTTP_RETRIES', '2'))
+LIVEKIT_HTTP_RETRY_BACKOFF = float(os.getenv('LIVEKIT_HTTP_RETRY_BACKOFF', '0.2'))
+# Most list_participants requests in flight at once when listing rooms with their participants
+LIVEKIT_PARTICIPANTS_CONCURRENCY = int(os.getenv('LIVEKIT_PARTICIPANTS_CONCURRENCY', '10'))
+
+# Auto-assignment settings
+# Inbound rooms are detected via LiveKit webhooks; polling only reconciles missed events
+AUTO_ASSIGNMENT_RECONCILE_INTERVAL = int(os.getenv('AUTO_ASSIGNMENT_RECONCILE_INTERVAL', '30'))
+# Seconds an agent has to answer a call invitation
+AUTO_ASSIGNMENT_INVITE_TIMEOUT = float(os.getenv('AUTO_ASSIGNMENT_INVITE_TIMEOUT', '30'))
+# Per-queue overrides, e.g. "sales:20,support:45" (queue comes from room metadata)
+AUTO_ASSIGNMENT_QUEUE_TIMEOUTS = {
+    name.strip(): float(seconds)
+    for name, seconds in (
+        item.split(':', 1)
+        for item in os.getenv('AUTO_ASSIGNMENT_QUEUE_TIMEOUTS', '').split(',')
+        if ':' in item
+    )
+}
+# Adaptive timeouts: once an agent has answered enough invitations, ring them for
+# FACTOR x their smoothed response time (never below MIN, never above the queue timeout)
+AUTO_ASSIGNMENT_ADAPTIVE_TIMEOUT = os.getenv('AUTO_ASSIGNMENT_ADAPTIVE_TIMEOUT', 'False').lower() in ('true', '1', 't')
+AUTO_ASSIGNMENT_ADAPTIVE_FACTOR = float(os.getenv('AUTO_ASSIGNMENT_ADAPTIVE_FACTOR', '3'))
+AUTO_ASSIGNMENT_ADAPTIVE_MIN_SAMPLES = int(os.getenv('AUTO_ASSIGNMENT_ADAPTIVE_MIN_SAMPLES', '3'))
+AUTO_ASSIGNMENT_MIN_INVITE_TIMEOUT = float(os.getenv('AUTO_ASSIGNMENT_MIN_INVITE_TIMEOUT', '8'))
+# Ring mode: sequential (one agent at a time), parallel (ring a group at once)
+# or staggered (ring a group, then add another group every RING_STAGGER seconds)
+AUTO_ASSIGNMENT_RING_MODE = os.getenv('AUTO_ASSIGNMENT_RING_MODE', 'sequential')
+AUTO_ASSIGNMENT_RING_GROUP_SIZE = int(os.getenv('AUTO_ASSIGNMENT_RING_GROUP_SIZE', '3'))
+AUTO_ASSIGNMENT_RING_STAGGER = float(os.getenv('AUTO_ASSIGNMENT_RING_STAGGER', '5'))
+# Resolution of the timer wheel that drives invitation timeouts and stagger rings
+AUTO_ASSIGNMENT_TIMER_TICK = float(os.getenv('AUTO_ASSIGNMENT_TIMER_TICK', '0.1'))
+# Inbound calls wait in a persistent queue when no agent is free; beyond
+# CALL_QUEUE_MAX_SIZE waiting calls new callers are turned away
+CALL_QUEUE_MAX_SIZE = int(os.getenv('CALL_QUEUE_MAX_SIZE', '100'))
+# Smoothing factor for the queue's wait-time estimates
+CALL_QUEUE_EWMA_ALPHA = float(os.getenv('CALL_QUEUE_EWMA_ALPHA', '0.2'))
+
+# Agent presence settings
+# Status changes live in memory and are written back to the agents table every N seconds
+PRESENCE_FLUSH_INTERVAL = float(os.getenv('PRESENCE_FLUSH_INTERVAL', '2'))
+# Agent selection: longest_idle, least_calls, round_robin or weighted
+ROUTING_STRATEGY = os.getenv('ROUTING_STRATEGY', 'longest_idle')
+
+# WebSocket fan-out settings
+# Outbound frames buffered per socket before stale events are dropped
+WS_SEND_QUEUE_SIZE = int(os.getenv('WS_SEND_QUEUE_SIZE', '256'))
+# Seconds a single send may take before the socket is considered dead
+WS_SEND_TIMEOUT = float(os.getenv('WS_SEND_TIMEOUT', '10'))
+# Seconds a socket's queue may stay full before it is evicted
+WS_EVICT_AFTER = float(os.getenv('WS_EVICT_AFTER', '15'))
+# Seconds between server pings on each agent socket. An agent that misses a pong is
+# skipped by routing; one that misses WS_MAX_MISSED_PONGS in a row is dropped and set Offline
+WS_PING_INTERVAL = float(os.getenv('WS_PING_INTERVAL', '20'))
+WS_MAX_MISSED_PONGS = int(os.getenv('WS_MAX_MISSED_PONGS', '2'))
+# Topics a new agent session receives broadcasts for until it subscribes itself
+# (comma-separated; '*' = everything, which is what clients without subscriptions expect)
+WS_DEFAULT_TOPICS = [t.strip() for t in os.getenv('WS_DEFAULT_TOPICS', '*').split(',') if t.strip()]
+# Status changes within this many seconds go out together in one frame (0 = send each at once)
+WS_STATUS_BATCH_WINDOW = float(os.getenv('WS_STATUS_BATCH_WINDOW', '0.25'))
+# Connect-time snapshots: how long the active room list is reused between sessions,
+# and how many of the agent's most recent calls are included
+SNAPSHOT_ROOMS_TTL = float(os.getenv('SNAPSHOT_ROOMS_TTL', '2'))
+SNAPSHOT_CALL_LIMIT = int(os.getenv('SNAPSHOT_CALL_LIMIT', '50'))
+
+# Shared state across uvicorn workers: memory (single worker) or redis
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'memory')
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+REDIS_KEY_PREFIX = os.getenv('REDIS_KEY_PREFIX', 'callcenter:')
+# Seconds a worker waits for the worker that owns a call to apply a forwarded response
+STATE_RPC_TIMEOUT = float(os.getenv('STATE_RPC_TIMEOUT', '5'))
+# Seconds a leader lease (e.g. the auto-assignment monitor's) lasts without renewal;
+# a crashed leader is replaced within about this long
+LEADER_LEASE_TTL = float(os.getenv('LEADER_LEASE_TTL', '10'))
+# Workers heartbeat every NODE_HEARTBEAT_INTERVAL seconds; one silent for NODE_TTL
+# seconds is treated as dead and the sockets registered to it are dropped
+NODE_HEARTBEAT_INTERVAL = float(os.getenv('NODE_HEARTBEAT_INTERVAL', '5'))
+NODE_TTL = float(os.getenv('NODE_TTL', '15'))
+
 # Logger setup - can be expanded in the future
 import logging
 
@@ -1,20 +1,180 @@
-from sqlalchemy import create_engine
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-from app.config import DATABASE_URL
-
-# Create database engine
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
+from app.config import (
+    DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_TIMEOUT_MS,
+    SQLITE_WAL,
+    DB_LEAK_CHECK_INTERVAL,
+    DB_LEAK_HOLD_WARNING,
+    logger,
 )
+from app.services.metrics import metrics
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe(
+                "db.pool.checkout_wait_ms", (time.perf_counter() - start) * 1000
+            )
+
+
+class TimedAsyncAdaptedQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    """Async-engine flavour of TimedQueuePool"""
+
+
+class PoolLeakDetector:
+    """Tracks checked-out connections so leaked sessions show up over time.
+
+    Checkout/checkin pool events maintain the set of connections currently
+    held; run() periodically samples it into metrics and warns about
+    connections held longer than DB_LEAK_HOLD_WARNING.
+    """
+
+    def __init__(self):
+        self.checked_out: Dict[int, float] = {}
+
+    def attach(self, target_engine):
+        event.listen(target_engine, "checkout", self._on_checkout)
+        event.listen(target_engine, "checkin", self._on_checkin)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checked_out[id(connection_record)] = time.monotonic()
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checked_out.pop(id(connection_record), None)
+
+    def sample(self) -> dict:
+        now = time.monotonic()
+        held_for = [now - since for since in list(self.checked_out.values())]
+        long_held = sum(1 for seconds in held_for if seconds >= DB_LEAK_HOLD_WARNING)
+
+        metrics.set_gauge("db.pool.checked_out", len(held_for))
+        metrics.set_gauge("db.pool.oldest_checkout_s", max(held_for, default=0.0))
+        metrics.set_gauge("db.pool.long_held", long_held)
+        # Summary over time: a steadily climbing max/p95 is the leak signature
+        metrics.observe("db.pool.checked_out_samples", len(held_for))
+
+        return {"checked_out": len(held_for), "long_held": long_held}
+
+    async def run(self, interval: float = DB_LEAK_CHECK_INTERVAL):
+        while True:
+            sample = self.sample()
+            if sample["long_held"]:
+                logger.warning(
+                    f"{sample['long_held']} DB connection(s) held longer than "
+                    f"{DB_LEAK_HOLD_WARNING:.0f}s ({sample['checked_out']} checked out)"
+                )
+            await asyncio.sleep(interval)
+
+
+def get_async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its asyncio driver (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url.startswith(("postgresql://", "postgresql+psycopg2://")):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    return url
+
+
+def _engine_options(url: str, use_async: bool) -> dict:
+    """Build pool and connect arguments appropriate for the URL's dialect"""
+    backend = make_url(url).get_backend_name()
+    options = {
+        "poolclass": TimedAsyncAdaptedQueuePool if use_async else TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+    if backend == "sqlite":
+        # SQLite has no statement timeout; bound the wait on a locked database instead
+        connect_args = {"timeout": DB_STATEMENT_TIMEOUT_MS / 1000}
+        if not use_async:
+            connect_args["check_same_thread"] = False
+        options["connect_args"] = connect_args
+    elif backend == "postgresql":
+        if use_async:
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+            }
+        else:
+            options["connect_args"] = {
+                "options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+            }
+
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+# Create database engine (sync; used for table creation and maintenance scripts)
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL, use_async=False))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine used by the application so queries never block the event loop
+ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, use_async=True)
+)
+# expire_on_commit=False: attributes stay readable after commit without lazy IO
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 Base = declarative_base()
 
+pool_leak_detector = PoolLeakDetector()
+pool_leak_detector.attach(async_engine.sync_engine)
+
+if SQLITE_WAL and engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
+    """Unit of work for non-request code: commit on success, roll back on error.
+
+    The session (and its pooled connection) is always released, unlike the
+    old next(get_db()) pattern which never closed the generator.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
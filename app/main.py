@@ -11,28 +11,81 @@ import asyncio
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from app.database.db import engine, Base
-from app.api.websocket_manager import ConnectionManager
-from app.routers import auth, agents, calls, auto_assignment
+from app.database.db import engine, Base, pool_leak_detector
+from app.api.websocket_manager import get_connection_manager
+from app.routers import auth, agents, calls, auto_assignment, webhooks, metrics
+from app.services.livekit_client import livekit_pool
+from app.services.presence import presence_index
+from app.services.state_backend import state_backend
+from app.services.node_registry import node_registry
+from app.services.snapshot import snapshot_builder
+from app.models.models import AgentStatus
 from app.config import LIVEKIT_WS_URL, logger  # Import logger as well
 
-# Create WebSocket connection manager
-manager = ConnectionManager()
+# Shared WebSocket connection hub
+manager = get_connection_manager()
 
 # Initialize auto-assignment service with the connection manager
 from app.services.auto_assignment_service import get_auto_assignment_service
 auto_assignment_service = get_auto_assignment_service(manager)
 
+
+async def on_agent_disconnected(agent_id: str, reason: str):
+    """An agent's last session is gone: stop routing to them.
+
+    The agent keeps their status so a page reload doesn't reset it, unless
+    they stopped answering pings (e.g. a laptop gone to sleep): then they
+    are set Offline so they are not rung the moment the laptop wakes up.
+    """
+    if reason == "unresponsive":
+        presence_index.set_status(int(agent_id), AgentStatus.OFFLINE.value)
+    presence_index.set_connected(int(agent_id), False)
+    await manager.broadcast_status_update(agent_id, "Offline")
+
+
+manager.add_disconnect_listener(on_agent_disconnected)
+# Routing skips an agent from their first missed pong until they answer again
+manager.add_stale_listener(lambda agent_id: presence_index.set_stale(int(agent_id), True))
+
+
+async def send_snapshot(connection, fresh_rooms: bool = False):
+    """Send a session everything its page shows; deltas keep it current after that"""
+    if not await manager.send_snapshot(
+        connection, lambda: snapshot_builder.build(int(connection.agent_id), fresh_rooms)
+    ):
+        logger.error(f"Could not build snapshot for agent {connection.agent_id}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown tasks"""
     # Startup
     logger.info("🚀 Starting LiveKit Call Center Application")
     
-    # Start auto-assignment monitoring service
+    # Shared state and pub/sub with the other workers (Redis when STATE_BACKEND=redis)
+    presence_index.replicate(state_backend)
+    await state_backend.start()
+    
+    # Heartbeat so other workers can tell when this one dies (and vice versa)
+    node_registry_task = asyncio.create_task(node_registry.run())
+    
+    # Ping agent sockets and drop the ones that stop answering
+    ws_heartbeat_task = asyncio.create_task(manager.run_heartbeat())
+    
+    # Open the shared LiveKit HTTP client used by every request
+    await livekit_pool.start()
+    
+    # Sample checked-out DB connections so session leaks show up in /api/metrics
+    leak_detector_task = asyncio.create_task(pool_leak_detector.run())
+    
+    # Seed the in-memory presence index and persist its changes in the background
+    await presence_index.load()
+    presence_flush_task = asyncio.create_task(presence_index.run_write_behind())
+    
+    # Campaign for auto-assignment leadership; the leader restores callers
+    # that were waiting in the queue and runs the monitor
     try:
         logger.info("Starting auto-assignment monitoring service...")
-        asyncio.create_task(auto_assignment_service.start_monitoring())
+        await auto_assignment_service.start_monitoring()
         logger.info("✅ Auto-assignment service started successfully")
     except Exception as e:
         logger.error(f"❌ Failed to start auto-assignment service: {str(e)}")
@@ -50,9 +103,22 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ Failed to stop auto-assignment service: {str(e)}")
     
+    await livekit_pool.aclose()
+    leak_detector_task.cancel()
+    ws_heartbeat_task.cancel()
+    
+    # Write out any status changes still waiting for the next flush
+    presence_flush_task.cancel()
+    await presence_index.flush()
+    
+    node_registry_task.cancel()
+    await node_registry.leave()
+    await state_backend.close()
+    
     logger.info("👋 Application shutdown complete")
 
 app = FastAPI(title="Call Center API", lifespan=lifespan)
+app.state.connection_manager = manager
 
 # CORS Middleware
 app.add_middleware(
@@ -79,6 +145,8 @@ app.include_router(auth.router, prefix="/api", tags=["Authentication"])
 app.include_router(agents.router, prefix="/api", tags=["Agents"])
 app.include_router(calls.router, prefix="/api", tags=["Calls"])
 app.include_router(auto_assignment.router, prefix="/api", tags=["Auto Assignment"])
+app.include_router(webhooks.router, prefix="/api", tags=["Webhooks"])
+app.include_router(metrics.router, prefix="/api", tags=["Metrics"])
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -107,16 +175,36 @@ async def get_websocket_test_page():
 @app.websocket("/ws/{agent_id}")
 async def websocket_endpoint(websocket: WebSocket, agent_id: str):
     print(f"[WebSocket] New connection request from agent {agent_id}")
-    await manager.connect(websocket, agent_id)
+    connection = await manager.connect(websocket, agent_id)
+    presence_index.set_connected(int(agent_id), True)
     print(f"[WebSocket] Agent {agent_id} connected successfully")
     print(
         f"[WebSocket] Active connections now: {list(manager.active_connections.keys())}"
     )
     try:
+        await send_snapshot(connection)
         while True:
             data = await websocket.receive_json()
+            # Any frame proves the socket is alive, pongs included
+            manager.seen(connection)
+            presence_index.touch(int(agent_id))
             # Handle different message types as needed
-            if data.get("type") == "status_update":
+            if data.get("type") == "pong":
+                continue
+            elif data.get("type") == "resync":
+                # The client saw a gap in the sequence numbers: a cached room
+                # list may predate the frames it missed
+                await send_snapshot(connection, fresh_rooms=True)
+            elif data.get("type") in ("subscribe", "unsubscribe"):
+                # Choose which broadcasts this session receives (see README)
+                topics = data.get("topics")
+                manager.update_topics(
+                    connection,
+                    topics if isinstance(topics, list) else [],
+                    subscribe=data["type"] == "subscribe",
+                    replace=bool(data.get("replace", False)),
+                )
+            elif data.get("type") == "status_update":
                 # Process status update and broadcast to other agents if needed
                 await manager.broadcast_status_update(agent_id, data.get("status"))
             elif data.get("type") == "call_invitation_response":
@@ -134,11 +222,13 @@ async def websocket_endpoint(websocket: WebSocket, agent_id: str):
                 )
     except WebSocketDisconnect:
         print(f"[WebSocket] Agent {agent_id} disconnected")
-        manager.disconnect(agent_id)
+    finally:
+        # Only the agent's last session (of all tabs and devices) takes them
+        # offline; on_agent_disconnected handles that
+        await manager.disconnect(connection)
         print(
             f"[WebSocket] Active connections now: {list(manager.active_connections.keys())}"
         )
-        await manager.broadcast_status_update(agent_id, "Offline")
 
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -20,6 +20,11 @@ class CallStatus(str, enum.Enum):
     FAILED = "Failed"
     IN_PROGRESS = "In_Progress"
 
+class QueuedCallStatus(str, enum.Enum):
+    WAITING = "Waiting"
+    ASSIGNED = "Assigned"
+    ABANDONED = "Abandoned"
+
 class Agent(Base):
     __tablename__ = "agents"
 
@@ -44,4 +49,17 @@ class Call(Base):
     status = Column(String)  # Completed, Rejected, Failed
     livekit_room_name = Column(String, nullable=True)
     
-    agent = relationship("Agent", back_populates="calls") 
\ No newline at end of file
+    agent = relationship("Agent", back_populates="calls")
+
+class QueuedCall(Base):
+    __tablename__ = "call_queue"
+
+    id = Column(Integer, primary_key=True, index=True)
+    room_name = Column(String, unique=True, index=True)
+    caller_id = Column(String)
+    priority = Column(Integer, default=0)  # higher is answered first
+    queue_name = Column(String, default="default")
+    enqueued_at = Column(DateTime, default=datetime.utcnow)
+    status = Column(String, default=QueuedCallStatus.WAITING, index=True)  # Waiting, Assigned, Abandoned
+    assigned_at = Column(DateTime, nullable=True)
+    call_id = Column(Integer, ForeignKey("calls.id"), nullable=True)  # from an earlier ring attempt
@@ -1,35 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from app.database.db import get_db
 from app.models.models import Agent, AgentStatus
 from app.routers.auth import get_current_agent
+from app.services.principal_cache import AgentPrincipal
+from app.services.presence import presence_index
 from app.schemas.schemas import AgentOut, StatusUpdate
-from app.api.websocket_manager import ConnectionManager
+from app.api.websocket_manager import ConnectionManager, get_connection_manager
 
 router = APIRouter()
-manager = ConnectionManager()
 
 @router.get("/agents/me", response_model=AgentOut)
-async def get_current_agent_info(current_agent: Agent = Depends(get_current_agent)):
+async def get_current_agent_info(current_agent: AgentPrincipal = Depends(get_current_agent)):
     return AgentOut(
         id=current_agent.id,
         username=current_agent.username,
         full_name=current_agent.full_name,
-        status=current_agent.status,
+        status=presence_index.status_of(current_agent.id) or current_agent.status,
         livekit_identity=current_agent.livekit_identity
     )
 
 @router.get("/agents", response_model=List[AgentOut])
-async def get_all_agents(db: Session = Depends(get_db), current_agent: Agent = Depends(get_current_agent)):
-    agents = db.query(Agent).all()
+async def get_all_agents(db: AsyncSession = Depends(get_db), current_agent: AgentPrincipal = Depends(get_current_agent)):
+    agents = (await db.scalars(select(Agent))).all()
     return [
         AgentOut(
             id=agent.id,
             username=agent.username,
             full_name=agent.full_name,
-            status=agent.status,
+            # The table can lag the presence index by one write-behind interval
+            status=presence_index.status_of(agent.id) or agent.status,
             livekit_identity=agent.livekit_identity
         ) for agent in agents
     ]
@@ -37,8 +40,8 @@ async def get_all_agents(db: Session = Depends(get_db), current_agent: Agent = D
 @router.put("/agents/status", response_model=AgentOut)
 async def update_agent_status(
     status_update: StatusUpdate,
-    db: Session = Depends(get_db),
-    current_agent: Agent = Depends(get_current_agent)
+    current_agent: AgentPrincipal = Depends(get_current_agent),
+    manager: ConnectionManager = Depends(get_connection_manager)
 ):
     # Validate status
     if status_update.status not in [status.value for status in AgentStatus]:
@@ -47,31 +50,35 @@ async def update_agent_status(
             detail=f"Invalid status. Must be one of {[s.value for s in AgentStatus]}"
         )
     
-    # Update agent status in DB
-    current_agent.status = status_update.status
-    db.commit()
-    db.refresh(current_agent)
+    # Update presence; the agents table follows via write-behind
+    presence_index.set_status(current_agent.id, status_update.status)
     
     # Broadcast status update to all connected clients
-    await manager.broadcast_status_update(str(current_agent.id), current_agent.status)
+    await manager.broadcast_status_update(str(current_agent.id), status_update.status)
     
     return AgentOut(
         id=current_agent.id,
         username=current_agent.username,
         full_name=current_agent.full_name,
-        status=current_agent.status,
+        status=status_update.status,
         livekit_identity=current_agent.livekit_identity
     )
 
 @router.get("/agents/available", response_model=List[AgentOut])
-async def get_available_agents(db: Session = Depends(get_db), current_agent: Agent = Depends(get_current_agent)):
-    agents = db.query(Agent).filter(Agent.status == AgentStatus.AVAILABLE).all()
+async def get_available_agents(db: AsyncSession = Depends(get_db), current_agent: AgentPrincipal = Depends(get_current_agent)):
+    available_ids = [
+        agent_id for agent_id, presence in presence_index.agents.items()
+        if presence.status == AgentStatus.AVAILABLE.value
+    ]
+    if not available_ids:
+        return []
+    agents = (await db.scalars(select(Agent).where(Agent.id.in_(available_ids)))).all()
     return [
         AgentOut(
             id=agent.id,
             username=agent.username,
             full_name=agent.full_name,
-            status=agent.status,
+            status=AgentStatus.AVAILABLE.value,
             livekit_identity=agent.livekit_identity
         ) for agent in agents
     ] 
\ No newline at end of file
@@ -1,15 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
 
 from app.database.db import get_db
 from app.models.models import Agent, AgentStatus
 from app.schemas.schemas import Token, AgentCreate, AgentOut
-from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.services.metrics import metrics
+from app.services.principal_cache import AgentPrincipal, principal_cache
+from app.services.presence import presence_index
+from app.config import (
+    SECRET_KEY,
+    ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_MAX_QUEUE,
+)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
@@ -23,9 +36,49 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
-def authenticate_agent(db: Session, username: str, password: str):
-    agent = db.query(Agent).filter(Agent.username == username).first()
-    if not agent or not verify_password(password, agent.hashed_password):
+# bcrypt costs ~250ms of CPU; run it on a bounded pool instead of the event loop
+password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+password_slots = asyncio.Semaphore(PASSWORD_HASH_WORKERS)
+password_waiting = 0
+
+async def run_password_work(fn, *args):
+    """Run a bcrypt call on the worker pool, recording queue and work time"""
+    global password_waiting
+    if password_waiting >= PASSWORD_HASH_MAX_QUEUE:
+        metrics.inc("auth.password.rejected")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent logins, please retry",
+            headers={"Retry-After": "1"},
+        )
+
+    queued_at = time.perf_counter()
+    password_waiting += 1
+    metrics.set_gauge("auth.password.waiting", password_waiting)
+    try:
+        await password_slots.acquire()
+    finally:
+        password_waiting -= 1
+        metrics.set_gauge("auth.password.waiting", password_waiting)
+
+    try:
+        started_at = time.perf_counter()
+        metrics.observe("auth.password.queue_ms", (started_at - queued_at) * 1000)
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(password_executor, fn, *args)
+        metrics.observe("auth.password.work_ms", (time.perf_counter() - started_at) * 1000)
+        return result
+    finally:
+        password_slots.release()
+
+async def authenticate_agent(db: AsyncSession, username: str, password: str):
+    agent = await db.scalar(select(Agent).where(Agent.username == username))
+    # End the read transaction so the pooled connection isn't held while
+    # the login waits for a bcrypt worker
+    await db.commit()
+    if not agent or not await run_password_work(verify_password, password, agent.hashed_password):
         return None
     return agent
 
@@ -39,7 +92,14 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_agent(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_agent(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
+) -> AgentPrincipal:
+    # Hot path: most authenticated requests are polls from an already-known token
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -52,24 +112,26 @@ async def get_current_agent(token: str = Depends(oauth2_scheme), db: Session = D
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    agent = db.query(Agent).filter(Agent.username == username).first()
+    agent = await db.scalar(select(Agent).where(Agent.username == username))
     if agent is None:
         raise credentials_exception
-    return agent
+
+    principal = AgentPrincipal.from_agent(agent)
+    principal_cache.put(token, principal, token_exp=payload.get("exp"))
+    return principal
 
 # Routes
 @router.post("/login", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    agent = authenticate_agent(db, form_data.username, form_data.password)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    agent = await authenticate_agent(db, form_data.username, form_data.password)
     if not agent:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    # Update agent status to Available on login
-    agent.status = AgentStatus.AVAILABLE.value
-    db.commit()
+    # Update agent status to Available on login (persisted by write-behind)
+    presence_index.set_status(agent.id, AgentStatus.AVAILABLE.value)
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -78,16 +140,20 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/logout")
-async def logout(current_agent: Agent = Depends(get_current_agent), db: Session = Depends(get_db)):
-    # Update agent status to Offline on logout
-    current_agent.status = AgentStatus.OFFLINE.value
-    db.commit()
+async def logout(
+    token: str = Depends(oauth2_scheme),
+    current_agent: AgentPrincipal = Depends(get_current_agent)
+):
+    # Update agent status to Offline on logout (persisted by write-behind)
+    presence_index.set_status(current_agent.id, AgentStatus.OFFLINE.value)
+    principal_cache.invalidate_token(token)
+    principal_cache.invalidate_username(current_agent.username)
     return {"message": "Successfully logged out"}
 
 @router.post("/register", response_model=AgentOut)
-async def register_agent(agent: AgentCreate, db: Session = Depends(get_db)):
+async def register_agent(agent: AgentCreate, db: AsyncSession = Depends(get_db)):
     # Check if username already exists
-    db_agent = db.query(Agent).filter(Agent.username == agent.username).first()
+    db_agent = await db.scalar(select(Agent).where(Agent.username == agent.username))
     if db_agent:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -95,7 +161,7 @@ async def register_agent(agent: AgentCreate, db: Session = Depends(get_db)):
         )
     
     # Create new agent
-    hashed_password = get_password_hash(agent.password)
+    hashed_password = await run_password_work(get_password_hash, agent.password)
     # Generate a unique LiveKit identity (can be username for simplicity)
     livekit_identity = agent.username
     
@@ -107,8 +173,11 @@ async def register_agent(agent: AgentCreate, db: Session = Depends(get_db)):
         livekit_identity=livekit_identity
     )
     db.add(db_agent)
-    db.commit()
-    db.refresh(db_agent)
+    await db.commit()
+    await db.refresh(db_agent)
+    # Drop anything cached under a previous holder of this username
+    principal_cache.invalidate_username(db_agent.username)
+    presence_index.set_status(db_agent.id, db_agent.status)
     
     return AgentOut(
         id=db_agent.id,
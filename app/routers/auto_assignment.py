@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, Optional
 from pydantic import BaseModel
 
 from app.database.db import get_db
 from app.models.models import Agent
 from app.routers.auth import get_current_agent
+from app.services.principal_cache import AgentPrincipal
 from app.services.auto_assignment_service import get_auto_assignment_service
 from app.config import logger
 
@@ -19,29 +20,41 @@ class CallInvitationResponse(BaseModel):
 class AutoAssignmentStatus(BaseModel):
     is_monitoring: bool
     pending_assignments: Dict[str, Any]
+    queue_depth: int = 0
+    is_leader: bool = False
+    leader: Optional[str] = None
 
 @router.post("/auto-assignment/respond")
 async def respond_to_call_invitation(
     response: CallInvitationResponse,
-    db: Session = Depends(get_db),
-    current_agent: Agent = Depends(get_current_agent)
+    db: AsyncSession = Depends(get_db),
+    current_agent: AgentPrincipal = Depends(get_current_agent)
 ):
     """Handle agent's response to call invitation"""
     try:
         auto_service = get_auto_assignment_service()
         
-        await auto_service.handle_invitation_response(
+        applied = await auto_service.handle_invitation_response(
             room_name=response.room_name,
             agent_id=int(current_agent.id),
             accepted=response.accepted,
             reason=response.reason
         )
         
+        if response.accepted and not applied:
+            # Another agent in the ring group got there first (or the caller left)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Call invitation is no longer available"
+            )
+        
         return {
             "status": "success",
             "message": f"Response {'accepted' if response.accepted else 'rejected'} for room {response.room_name}"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error handling invitation response: {str(e)}")
         raise HTTPException(
@@ -51,15 +64,14 @@ async def respond_to_call_invitation(
 
 @router.post("/auto-assignment/start")
 async def start_auto_assignment(
-    current_agent: Agent = Depends(get_current_agent)
+    current_agent: AgentPrincipal = Depends(get_current_agent)
 ):
     """Start the auto-assignment monitoring service"""
     try:
         auto_service = get_auto_assignment_service()
         
-        # Start monitoring in background
-        import asyncio
-        asyncio.create_task(auto_service.start_monitoring())
+        # Joins the leader election; a no-op if this worker already campaigns
+        await auto_service.start_monitoring()
         
         return {
             "status": "success",
@@ -75,7 +87,7 @@ async def start_auto_assignment(
 
 @router.post("/auto-assignment/stop")
 async def stop_auto_assignment(
-    current_agent: Agent = Depends(get_current_agent)
+    current_agent: AgentPrincipal = Depends(get_current_agent)
 ):
     """Stop the auto-assignment monitoring service"""
     try:
@@ -96,7 +108,7 @@ async def stop_auto_assignment(
 
 @router.get("/auto-assignment/status", response_model=AutoAssignmentStatus)
 async def get_auto_assignment_status(
-    current_agent: Agent = Depends(get_current_agent)
+    current_agent: AgentPrincipal = Depends(get_current_agent)
 ):
     """Get current auto-assignment service status"""
     try:
@@ -104,7 +116,10 @@ async def get_auto_assignment_status(
         
         return AutoAssignmentStatus(
             is_monitoring=auto_service.is_monitoring,
-            pending_assignments=auto_service.get_pending_assignments()
+            pending_assignments=await auto_service.get_pending_assignments(),
+            queue_depth=len(auto_service.queue),
+            is_leader=auto_service.leader.is_leader,
+            leader=auto_service.leader.leader
         )
         
     except Exception as e:
@@ -116,12 +131,12 @@ async def get_auto_assignment_status(
 
 @router.get("/auto-assignment/pending")
 async def get_pending_assignments(
-    current_agent: Agent = Depends(get_current_agent)
+    current_agent: AgentPrincipal = Depends(get_current_agent)
 ):
     """Get current pending call assignments"""
     try:
         auto_service = get_auto_assignment_service()
-        pending = auto_service.get_pending_assignments()
+        pending = await auto_service.get_pending_assignments()
         
         return {
             "pending_assignments": pending,
@@ -133,4 +148,12 @@ async def get_pending_assignments(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get pending assignments: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+@router.get("/auto-assignment/queue")
+async def get_call_queue_status(
+    current_agent: AgentPrincipal = Depends(get_current_agent)
+):
+    """Get waiting inbound calls with their position and estimated wait"""
+    auto_service = get_auto_assignment_service()
+    return auto_service.queue.snapshot()
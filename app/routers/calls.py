@@ -1,72 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status, BackgroundTasks
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import os
 import uuid
 import asyncio
+import time
 from livekit import rtc, api
-from livekit.api import CreateRoomRequest, DeleteRoomRequest
+from livekit.api import CreateRoomRequest, DeleteRoomRequest, ListParticipantsRequest, ListRoomsRequest
 from livekit.api.twirp_client import TwirpError
 from livekit.protocol.sip import CreateSIPParticipantRequest, SIPParticipantInfo
 import json
 
-from app.database.db import get_db
+from app.database.db import get_db, session_scope
 from app.models.models import Agent, Call, AgentStatus, CallDirection, CallStatus
 from app.routers.auth import get_current_agent
+from app.services.principal_cache import AgentPrincipal
+from app.services.presence import presence_index
+from app.services.routing import routing_strategy
+from app.services.call_queue import call_queue
+from app.services.state_backend import get_state_backend
 from app.schemas.schemas import CallCreate, CallOut, IncomingCallResponse
-from app.api.websocket_manager import ConnectionManager
-from app.config import LIVEKIT_API_KEY, LIVEKIT_API_SECRET, LIVEKIT_URL, LIVEKIT_WS_URL, LIVEKIT_SIP_TRUNK_ID, logger
+from app.api.websocket_manager import get_connection_manager
+from app.services.livekit_client import livekit_pool
+from app.config import LIVEKIT_API_KEY, LIVEKIT_API_SECRET, LIVEKIT_URL, LIVEKIT_WS_URL, LIVEKIT_SIP_TRUNK_ID, LIVEKIT_PARTICIPANTS_CONCURRENCY, logger
 
 router = APIRouter()
-manager = ConnectionManager()
+# Shared hub: the same instance that owns the agents' WebSocket connections
+manager = get_connection_manager()
 
-# Store active call connections
-active_calls: Dict[str, Dict[str, Any]] = {}
+state_backend = get_state_backend()
+
+# Calls in progress, shared by every worker: call_id -> room, agent, owning node
+ACTIVE_CALLS = "active_calls"
+# LiveKit RTC connections can't leave the worker that opened them
+rtc_rooms: Dict[str, rtc.Room] = {}
 
 class LivekitClientManager:
-    """Async context manager for LiveKit HTTP client"""
+    """Async context manager handing out the shared, pooled LiveKit client"""
     def __init__(self):
-        self.livekit_api = api.LiveKitAPI(
-            url=LIVEKIT_URL,
-            api_key=LIVEKIT_API_KEY,
-            api_secret=LIVEKIT_API_SECRET
-        )
+        self.livekit_api = None
 
     async def __aenter__(self):
+        self.livekit_api = await livekit_pool.get_api()
         return self.livekit_api
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.livekit_api:
-            await self.livekit_api.aclose()
+        # The client is owned by the application lifespan, not by this block
+        self.livekit_api = None
 
 class LiveKitService:
     @staticmethod
     def get_client():
-        """Get a LiveKit client instance with automatic cleanup"""
+        """Get the shared LiveKit client (no per-operation HTTP session)"""
         return LivekitClientManager()
 
     @staticmethod
-    async def create_room(room_name: str) -> Optional[api.Room]:
+    async def call(operation, retry: bool = True):
+        """Run a LiveKit request on the shared client with timeout and retries"""
+        return await livekit_pool.call(operation, retry=retry)
+
+    @staticmethod
+    async def create_room(room_name: str, metadata: str = "") -> Optional[api.Room]:
         """Create a LiveKit room"""
         try:
-            async with LiveKitService.get_client() as livekit_api:
-                response = await livekit_api.room.create_room(
+            response = await LiveKitService.call(
+                lambda livekit_api: livekit_api.room.create_room(
                     CreateRoomRequest(
                         name=room_name,
                         empty_timeout=300,  # 5 minutes idle timeout
+                        metadata=metadata,
                     )
                 )
-                logger.info(f"Room created: {room_name}")
-                
-                # Broadcast room update to all connected clients
-                await manager.broadcast_room_update({
-                    "event": "room_created",
-                    "room_name": room_name,
-                    "room_id": response.sid if hasattr(response, 'sid') else None
-                })
-                
-                return response
+            )
+            logger.info(f"Room created: {room_name}")
+            
+            # Broadcast room update to all connected clients; the row lets
+            # pages add the room without fetching the room list
+            await manager.broadcast_room_update({
+                "event": "room_created",
+                **LiveKitService.format_room(response),
+            })
+            
+            return response
         except Exception as e:
             logger.error(f"Error creating room: {str(e)}")
             return None
@@ -87,27 +104,28 @@ class LiveKitService:
                 
             logger.info(f"Creating SIP participant for {to_phone} in room {room_name} with identity {participant_identity} sip_trunk_id {sip_trunk_id}")
                 
-            async with LiveKitService.get_client() as livekit_api:
-                request = CreateSIPParticipantRequest(
-                    sip_trunk_id=sip_trunk_id,
-                    sip_call_to=to_phone,
-                    room_name=room_name,
-                    participant_identity=participant_identity,
-                    participant_name=participant_name,
-                )
-                
-                # For MVP, we'll simulate a successful response
-                # In a real implementation, you would uncomment this:
-                participant = await livekit_api.sip.create_sip_participant(request)
-                
-                # Simulated participant for demonstration
-                # participant = SIPParticipantInfo(
-                #     sip_call_id=str(uuid.uuid4()),
-                #     participant_id=participant_identity
-                # )
-                
-                logger.info(f"Created call to {to_phone} for room {room_name}")
-                return participant
+            request = CreateSIPParticipantRequest(
+                sip_trunk_id=sip_trunk_id,
+                sip_call_to=to_phone,
+                room_name=room_name,
+                participant_identity=participant_identity,
+                participant_name=participant_name,
+            )
+            
+            # Not retried: a repeated request could dial the number twice
+            participant = await LiveKitService.call(
+                lambda livekit_api: livekit_api.sip.create_sip_participant(request),
+                retry=False
+            )
+            
+            # Simulated participant for demonstration
+            # participant = SIPParticipantInfo(
+            #     sip_call_id=str(uuid.uuid4()),
+            #     participant_id=participant_identity
+            # )
+            
+            logger.info(f"Created call to {to_phone} for room {room_name}")
+            return participant
         except Exception as e:
             logger.error(f"Error creating call: {str(e)}")
             return None
@@ -116,19 +134,20 @@ class LiveKitService:
     async def end_call(room_name: str):
         """End a LiveKit call by deleting the room"""
         try:
-            async with LiveKitService.get_client() as livekit_api:
-                response = await livekit_api.room.delete_room(
+            response = await LiveKitService.call(
+                lambda livekit_api: livekit_api.room.delete_room(
                     DeleteRoomRequest(room=room_name)
                 )
-                logger.info(f"Room deleted: {room_name}")
-                
-                # Broadcast room update to all connected clients
-                await manager.broadcast_room_update({
-                    "event": "room_deleted",
-                    "room_name": room_name
-                })
-                
-                return response
+            )
+            logger.info(f"Room deleted: {room_name}")
+            
+            # Broadcast room update to all connected clients
+            await manager.broadcast_room_update({
+                "event": "room_deleted",
+                "room_name": room_name
+            })
+            
+            return response
         except TwirpError as e:
             if e.code == "not_found":
                 logger.info(f"Room {room_name} not found, nothing to end")
@@ -139,6 +158,92 @@ class LiveKitService:
             logger.error(f"Error ending call: {str(e)}")
             return None
 
+    @staticmethod
+    async def list_active_rooms(
+        names: Optional[List[str]] = None,
+        with_participants: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Active LiveKit rooms, formatted for the agent UI (raises on LiveKit errors).
+        
+        names limits the listing to those rooms; LiveKit does the filtering.
+        with_participants adds each room's participants, fetched concurrently
+        (at most LIVEKIT_PARTICIPANTS_CONCURRENCY requests at a time).
+        """
+        # An empty names list means every room
+        response = await LiveKitService.call(
+            lambda livekit_api: livekit_api.room.list_rooms(ListRoomsRequest(names=names or []))
+        )
+        # The response has a 'rooms' property that contains the list of rooms
+        rooms = list(response.rooms) if hasattr(response, 'rooms') else []
+        formatted_rooms = [LiveKitService.format_room(room) for room in rooms]
+        
+        if with_participants:
+            participants = await LiveKitService.list_participants([room.name for room in rooms])
+            for room_data, room_participants in zip(formatted_rooms, participants):
+                # On a failed lookup keep the count list_rooms reported
+                room_data["participants"] = room_participants or []
+                if room_participants is not None:
+                    room_data["participant_count"] = len(room_participants)
+        return formatted_rooms
+
+    @staticmethod
+    async def list_participants(room_names: List[str]) -> List[Optional[List[Dict[str, Any]]]]:
+        """Participants of each room, in order (None where the lookup failed)"""
+        slots = asyncio.Semaphore(LIVEKIT_PARTICIPANTS_CONCURRENCY)
+        
+        async def fetch(room_name: str) -> Optional[List[Dict[str, Any]]]:
+            async with slots:
+                try:
+                    response = await LiveKitService.call(
+                        lambda livekit_api: livekit_api.room.list_participants(
+                            ListParticipantsRequest(room=room_name)
+                        )
+                    )
+                except Exception as e:
+                    logger.error(f"Error getting participants for room {room_name}: {str(e)}")
+                    return None
+            participants = response.participants if hasattr(response, 'participants') else []
+            return [LiveKitService._format_participant(participant) for participant in participants]
+        
+        return await asyncio.gather(*(fetch(room_name) for room_name in room_names))
+
+    @staticmethod
+    def format_room(room) -> Dict[str, Any]:
+        """A LiveKit room as one row of the agent UI's room table"""
+        # Get participant count for each room - check different possible attributes
+        participant_count = 0
+        
+        # Try different ways to get participant count
+        if hasattr(room, 'num_participants'):
+            participant_count = room.num_participants
+        elif hasattr(room, 'participant_count'):
+            participant_count = room.participant_count
+        elif hasattr(room, 'participants') and isinstance(room.participants, list):
+            participant_count = len(room.participants)
+        
+        # Safely get creation time if available
+        creation_time = None
+        if hasattr(room, 'created_at'):
+            creation_time = room.created_at
+        elif hasattr(room, 'creation_time'):
+            creation_time = room.creation_time
+        
+        return {
+            "room_name": room.name,
+            "room_id": room.sid,
+            "status": "Active",
+            "participant_count": participant_count,
+            "creation_time": creation_time
+        }
+
+    @staticmethod
+    def _format_participant(participant) -> Dict[str, Any]:
+        return {
+            "id": participant.identity if hasattr(participant, 'identity') else None,
+            "name": participant.name if hasattr(participant, 'name') else None,
+            "is_publisher": participant.is_publisher if hasattr(participant, 'is_publisher') else False
+        }
+
 async def setup_rtc_room(room_name: str, identity: str) -> rtc.Room:
     """Set up RTC room and connection"""
     from livekit.api import AccessToken, VideoGrants
@@ -176,15 +281,14 @@ def on_participant_disconnected(participant):
     """Handle participant disconnected event"""
     logger.info(f"Participant disconnected: {participant.identity}")
     
+    asyncio.create_task(_participant_left(participant.identity))
+
+async def _participant_left(identity: str):
     # Find the call associated with this participant
-    call_id = None
-    for cid, call_data in active_calls.items():
-        if call_data.get("participant_identity") == participant.identity:
-            call_id = cid
+    for call_id, call_data in (await state_backend.hgetall(ACTIVE_CALLS)).items():
+        if call_data.get("participant_identity") == identity:
+            await handle_call_ended(call_id)
             break
-    
-    if call_id:
-        asyncio.create_task(handle_call_ended(call_id))
 
 def on_room_disconnected(reason):
     """Handle room disconnected event"""
@@ -192,33 +296,47 @@ def on_room_disconnected(reason):
 
 async def handle_call_ended(call_id: str):
     """Handle call ended event"""
-    if call_id in active_calls:
+    call_data = await state_backend.hget(ACTIVE_CALLS, call_id)
+    if call_data is not None:
         # Update call status in database
-        db = next(get_db())
-        db_call = db.query(Call).filter(Call.id == int(call_id)).first()
-        if db_call:
-            # Calculate call duration
-            if db_call.start_time is not None:
-                duration = (datetime.utcnow() - db_call.start_time).total_seconds()
-                db_call.duration = float(duration)
-            
-            # Update call status to Completed
-            db_call.status = CallStatus.COMPLETED
+        async with session_scope() as db:
+            db_call = await db.scalar(select(Call).where(Call.id == int(call_id)))
+            if db_call:
+                # Calculate call duration
+                if db_call.start_time is not None:
+                    duration = (datetime.utcnow() - db_call.start_time).total_seconds()
+                    db_call.duration = float(duration)
+                
+                # Update call status to Completed
+                db_call.status = CallStatus.COMPLETED
 
+        if db_call:
             # Update agent status back to Available
-            agent = db.query(Agent).filter(Agent.id == db_call.agent_id).first()
-            if agent:
-                agent.status = AgentStatus.AVAILABLE
-            
-            db.commit()
+            presence_index.set_status(db_call.agent_id, AgentStatus.AVAILABLE.value)
         
         # Clean up resources
-        call_data = active_calls[call_id]
-        if call_data.get("rtc_room"):
-            await call_data["rtc_room"].disconnect()
+        await release_rtc_room(call_id, call_data)
         
         # Remove from active calls
-        del active_calls[call_id]
+        await state_backend.hdel(ACTIVE_CALLS, call_id)
+
+async def release_rtc_room(call_id: str, call_data: dict):
+    """Disconnect a call's RTC connection on whichever worker holds it"""
+    rtc_room = rtc_rooms.pop(call_id, None)
+    if rtc_room is not None:
+        await rtc_room.disconnect()
+    elif call_data.get("node") != state_backend.node_id:
+        await state_backend.publish(
+            "calls.release_rtc", {"call_id": call_id, "node": call_data.get("node")}
+        )
+
+async def _on_release_rtc(message: dict):
+    if message["node"] == state_backend.node_id:
+        rtc_room = rtc_rooms.pop(message["call_id"], None)
+        if rtc_room is not None:
+            await rtc_room.disconnect()
+
+state_backend.subscribe("calls.release_rtc", _on_release_rtc)
 
 def generate_livekit_token(identity: str, room_name: str, is_publisher: bool = True) -> str:
     """Generate a LiveKit access token for a participant"""
@@ -236,9 +354,13 @@ def generate_livekit_token(identity: str, room_name: str, is_publisher: bool = T
     
     return token.to_jwt()
 
-def find_available_agent(db: Session):
-    """Find an available agent to route an incoming call to"""
-    return db.query(Agent).filter(Agent.status == AgentStatus.AVAILABLE).first()
+def find_available_agent() -> Optional[int]:
+    """Find an available agent to route an incoming call to (no DB round trip)"""
+    # Imported here: the auto-assignment service imports this router
+    from app.services.auto_assignment_service import get_auto_assignment_service
+
+    # Agents being rung for another call are spoken for, as in _drain_queue
+    return routing_strategy.select(exclude=get_auto_assignment_service().ringing_agents)
 
 def create_livekit_room():
     """Create a new LiveKit room for a call"""
@@ -248,23 +370,19 @@ def create_livekit_room():
 @router.post("/calls/outbound", response_model=CallOut)
 async def make_outbound_call(
     call: CallCreate,
-    db: Session = Depends(get_db),
-    current_agent: Agent = Depends(get_current_agent)
+    db: AsyncSession = Depends(get_db),
+    current_agent: AgentPrincipal = Depends(get_current_agent)
 ):
     # DEBUG: Print agent status for troubleshooting
-    print(f"DEBUG - Agent status check: agent_id={current_agent.id}, username={current_agent.username}, status={current_agent.status}")
-    
-    # Get fresh status from database to avoid stale data
-    fresh_agent = db.query(Agent).filter(Agent.id == current_agent.id).first()
-    if fresh_agent:
-        print(f"DEBUG - Fresh agent status: {fresh_agent.status}")
+    # The principal's status may be stale; the presence index holds the live one
+    fresh_status = presence_index.status_of(current_agent.id)
+    print(f"DEBUG - Agent status check: agent_id={current_agent.id}, username={current_agent.username}, status={fresh_status}")
     
     # Force the agent status to Available for this call
-    current_agent.status = AgentStatus.AVAILABLE.value
-    db.commit()
+    fresh_status = AgentStatus.AVAILABLE.value
     
     # Check if agent is available
-    if current_agent.status == AgentStatus.AVAILABLE.value or True:  # TEMPORARY FIX: Allow calls regardless of status
+    if fresh_status == AgentStatus.AVAILABLE.value or True:  # TEMPORARY FIX: Allow calls regardless of status
         # Use room name provided by the frontend
         room_name = call.room_name if hasattr(call, 'room_name') and call.room_name else create_livekit_room()
         
@@ -304,11 +422,11 @@ async def make_outbound_call(
             livekit_room_name=room_name
         )
         db.add(db_call)
+        await db.commit()
+        await db.refresh(db_call)
         
         # Update agent status to Busy
-        current_agent.status = AgentStatus.BUSY.value
-        db.commit()
-        db.refresh(db_call)
+        presence_index.set_status(current_agent.id, AgentStatus.BUSY.value, current_call=room_name)
         
         # We don't automatically create the SIP participant here anymore
         # The frontend will call the /api/sip/create-participant endpoint directly
@@ -334,14 +452,43 @@ async def make_outbound_call(
 async def handle_inbound_call(
     call_data: dict,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Find an available agent
-    agent = find_available_agent(db)
-    if not agent:
-        # No available agents, handle accordingly
-        # In a real implementation, you might queue the call or reject it
-        return {"status": "rejected", "reason": "No available agents"}
+    agent_id = find_available_agent()
+    if agent_id is None:
+        # No available agents: hold the caller in the waiting queue. The room is
+        # named inbound-* so auto-assignment rings it once an agent frees up
+        from app.services.auto_assignment_service import get_auto_assignment_service
+        
+        caller_id = call_data.get("from", "Unknown")
+        room_name = f"inbound-{caller_id}-{int(time.time())}"
+        priority = int(call_data.get("priority", 0))
+        queue_name = call_data.get("queue", "default")
+        position = None
+        # Only the auto-assignment leader holds the queue; elsewhere the leader
+        # queues the room when its webhook arrives, using the room metadata
+        queued_here = get_auto_assignment_service().leader.is_leader
+        if queued_here:
+            position = await call_queue.enqueue(room_name, caller_id, priority, queue_name)
+            if position is None:
+                return {"status": "rejected", "reason": "No available agents and call queue is full"}
+        
+        room = await LiveKitService().create_room(
+            room_name=room_name,
+            metadata=json.dumps({"priority": priority, "queue": queue_name})
+        )
+        if not room:
+            if queued_here:
+                await call_queue.mark_abandoned(room_name)
+            return {"status": "rejected", "reason": "Failed to create LiveKit room"}
+        
+        return {
+            "status": "queued",
+            "room_name": room_name,
+            "position": position,
+            "estimated_wait": call_queue.estimated_wait(position) if position else None
+        }
     
     # Create a LiveKit room for the call
     room_name = create_livekit_room()
@@ -355,7 +502,7 @@ async def handle_inbound_call(
     
     # Create call record
     db_call = Call(
-        agent_id=agent.id,
+        agent_id=agent_id,
         caller_id=call_data.get("from", "Unknown"),
         direction=CallDirection.INBOUND,
         start_time=datetime.utcnow(),
@@ -363,8 +510,8 @@ async def handle_inbound_call(
         livekit_room_name=room_name
     )
     db.add(db_call)
-    db.commit()
-    db.refresh(db_call)
+    await db.commit()
+    await db.refresh(db_call)
     
     # Notify agent of incoming call via WebSocket
     call_notification = {
@@ -375,7 +522,7 @@ async def handle_inbound_call(
     
     background_tasks.add_task(
         manager.notify_incoming_call,
-        str(agent.id),
+        str(agent_id),
         call_notification
     )
     
@@ -384,11 +531,11 @@ async def handle_inbound_call(
 @router.post("/calls/{call_id}/answer", response_model=CallOut)
 async def answer_call(
     call_id: int,
-    db: Session = Depends(get_db),
-    current_agent: Agent = Depends(get_current_agent)
+    db: AsyncSession = Depends(get_db),
+    current_agent: AgentPrincipal = Depends(get_current_agent)
 ):
     # Get the call
-    db_call = db.query(Call).filter(Call.id == call_id).first()
+    db_call = await db.scalar(select(Call).where(Call.id == call_id))
     if not db_call:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -403,8 +550,9 @@ async def answer_call(
         )
     
     # Update agent status to Busy
-    current_agent.status = AgentStatus.BUSY
-    db.commit()
+    presence_index.set_status(
+        current_agent.id, AgentStatus.BUSY.value, current_call=str(db_call.livekit_room_name)
+    )
     
     # Set up agent identity
     agent_identity = f"agent_{current_agent.id}"
@@ -417,12 +565,13 @@ async def answer_call(
         rtc_room = await setup_rtc_room(str(db_call.livekit_room_name), agent_identity)
         
         # Store call data
-        active_calls[str(db_call.id)] = {
+        rtc_rooms[str(db_call.id)] = rtc_room
+        await state_backend.hset(ACTIVE_CALLS, str(db_call.id), {
             "room_name": db_call.livekit_room_name,
             "agent_id": current_agent.id,
-            "rtc_room": rtc_room,
-            "participant_identity": f"caller_{db_call.id}"
-        }
+            "participant_identity": f"caller_{db_call.id}",
+            "node": state_backend.node_id
+        })
         
         if not rtc_room.isconnected():
             raise Exception("Failed to connect to LiveKit room")
@@ -430,8 +579,8 @@ async def answer_call(
     except Exception as e:
         # Failed to connect to room, update status
         db_call.status = CallStatus.FAILED
-        current_agent.status = AgentStatus.AVAILABLE
-        db.commit()
+        await db.commit()
+        presence_index.set_status(current_agent.id, AgentStatus.AVAILABLE.value)
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -453,11 +602,11 @@ async def answer_call(
 @router.post("/calls/{call_id}/reject")
 async def reject_call(
     call_id: int,
-    db: Session = Depends(get_db),
-    current_agent: Agent = Depends(get_current_agent)
+    db: AsyncSession = Depends(get_db),
+    current_agent: AgentPrincipal = Depends(get_current_agent)
 ):
     # Get the call
-    db_call = db.query(Call).filter(Call.id == call_id).first()
+    db_call = await db.scalar(select(Call).where(Call.id == call_id))
     if not db_call:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -473,7 +622,7 @@ async def reject_call(
     
     # Update call status to Rejected
     db_call.status = CallStatus.REJECTED
-    db.commit()
+    await db.commit()
     
     # End the LiveKit call if it exists
     livekit_service = LiveKitService()
@@ -484,11 +633,11 @@ async def reject_call(
 @router.post("/calls/{call_id}/hangup")
 async def hangup_call(
     call_id: int,
-    db: Session = Depends(get_db),
-    current_agent: Agent = Depends(get_current_agent)
+    db: AsyncSession = Depends(get_db),
+    current_agent: AgentPrincipal = Depends(get_current_agent)
 ):
     # Get the call
-    db_call = db.query(Call).filter(Call.id == call_id).first()
+    db_call = await db.scalar(select(Call).where(Call.id == call_id))
     if not db_call:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -510,81 +659,47 @@ async def hangup_call(
     # Update call status to Completed
     db_call.status = CallStatus.COMPLETED
     
+    await db.commit()
+    
     # Update agent status back to Available
-    current_agent.status = AgentStatus.AVAILABLE
-    db.commit()
+    presence_index.set_status(current_agent.id, AgentStatus.AVAILABLE.value)
     
     # End the LiveKit call
     livekit_service = LiveKitService()
     await livekit_service.end_call(room_name=str(db_call.livekit_room_name))
     
     # Clean up resources
-    if str(call_id) in active_calls:
-        call_data = active_calls[str(call_id)]
-        if call_data.get("rtc_room"):
-            await call_data["rtc_room"].disconnect()
-        del active_calls[str(call_id)]
+    call_data = await state_backend.hget(ACTIVE_CALLS, str(call_id))
+    if call_data is not None:
+        await release_rtc_room(str(call_id), call_data)
+        await state_backend.hdel(ACTIVE_CALLS, str(call_id))
     
     return {"status": "completed", "call_id": call_id, "duration": db_call.duration}
 
 @router.get("/calls", response_model=List[CallOut])
 async def get_agent_calls(
-    db: Session = Depends(get_db),
-    current_agent: Agent = Depends(get_current_agent)
+    db: AsyncSession = Depends(get_db),
+    current_agent: AgentPrincipal = Depends(get_current_agent)
 ):
     # Get all calls for the current agent
-    agent_calls = db.query(Call).filter(Call.agent_id == current_agent.id).order_by(Call.start_time.desc()).all()
+    agent_calls = (await db.scalars(
+        select(Call).where(Call.agent_id == current_agent.id).order_by(Call.start_time.desc())
+    )).all()
     return agent_calls
 
 @router.get("/calls/active-rooms")
 async def get_active_rooms(
-    db: Session = Depends(get_db),
-    current_agent: Agent = Depends(get_current_agent)
+    db: AsyncSession = Depends(get_db),
+    current_agent: AgentPrincipal = Depends(get_current_agent)
 ):
-    """Get active LiveKit rooms for inbound calls"""
+    """Get active LiveKit rooms for inbound calls.
+
+    Agent pages get the same list in their WebSocket snapshot and keep it
+    current from room_update events; this stays for other clients.
+    """
     try:
-        async with LiveKitService.get_client() as livekit_api:
-            # Get all active rooms from LiveKit
-            # The list_rooms method requires a ListRoomsRequest object
-            from livekit.api import ListRoomsRequest
-            response = await livekit_api.room.list_rooms(ListRoomsRequest())
-            
-            # Format the response
-            formatted_rooms = []
-            # The response has a 'rooms' property that contains the list of rooms
-            if hasattr(response, 'rooms'):
-                for room in response.rooms:
-                    # Get participant count for each room - check different possible attributes
-                    participant_count = 0
-                    
-                    # Try different ways to get participant count
-                    if hasattr(room, 'num_participants'):
-                        participant_count = room.num_participants
-                    elif hasattr(room, 'participant_count'):
-                        participant_count = room.participant_count
-                    elif hasattr(room, 'participants') and isinstance(room.participants, list):
-                        participant_count = len(room.participants)
-                    
-                    # For debugging
-                    logger.info(f"Room attributes: {dir(room)}")
-                    
-                    # Safely get creation time if available
-                    creation_time = None
-                    if hasattr(room, 'created_at'):
-                        creation_time = room.created_at
-                    elif hasattr(room, 'creation_time'):
-                        creation_time = room.creation_time
-                    
-                    # Format the room data
-                    formatted_rooms.append({
-                        "room_name": room.name,
-                        "room_id": room.sid,
-                        "status": "Active",
-                        "participant_count": participant_count,
-                        "creation_time": creation_time
-                    })
-            
-            return {"rooms": formatted_rooms}
+        # Get all active rooms from LiveKit
+        return {"rooms": await LiveKitService.list_active_rooms()}
     except Exception as e:
         logger.error(f"Error getting active rooms: {str(e)}")
         raise HTTPException(
@@ -592,11 +707,35 @@ async def get_active_rooms(
             detail=f"Failed to get active rooms: {str(e)}"
         )
 
+@router.get("/calls/rooms")
+async def get_rooms_with_participants(
+    names: Optional[List[str]] = Query(None),
+    participants: bool = True,
+    current_agent: AgentPrincipal = Depends(get_current_agent)
+):
+    """Active LiveKit rooms with their participants, in one request.
+    
+    One list_rooms call (filtered to names, if given) plus one concurrent
+    list_participants call per room, instead of a /calls/room/{name}
+    request per room.
+    """
+    try:
+        rooms = await LiveKitService.list_active_rooms(
+            names=names, with_participants=participants
+        )
+        return {"rooms": rooms}
+    except Exception as e:
+        logger.error(f"Error getting rooms: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get rooms: {str(e)}"
+        )
+
 @router.post("/calls/join-room")
 async def join_room(
     data: dict,
-    db: Session = Depends(get_db),
-    current_agent: Agent = Depends(get_current_agent)
+    db: AsyncSession = Depends(get_db),
+    current_agent: AgentPrincipal = Depends(get_current_agent)
 ):
     """Join an existing LiveKit room as an agent"""
     room_name = data.get("room_name")
@@ -623,12 +762,11 @@ async def join_room(
         )
         
         db.add(new_call)
-        db.commit()
-        db.refresh(new_call)
+        await db.commit()
+        await db.refresh(new_call)
         
         # Update agent status to Busy
-        current_agent.status = AgentStatus.BUSY.value
-        db.commit()
+        presence_index.set_status(current_agent.id, AgentStatus.BUSY.value, current_call=room_name)
         
         return {
             "token": token,
@@ -646,8 +784,8 @@ async def join_room(
 @router.post("/calls/end-room")
 async def end_room(
     data: dict,
-    db: Session = Depends(get_db),
-    current_agent: Agent = Depends(get_current_agent)
+    db: AsyncSession = Depends(get_db),
+    current_agent: AgentPrincipal = Depends(get_current_agent)
 ):
     """End a LiveKit room call"""
     room_name = data.get("room_name")
@@ -662,21 +800,21 @@ async def end_room(
     try:
         # Update call record if call_id is provided
         if call_id:
-            db_call = db.query(Call).filter(Call.id == call_id).first()
+            db_call = await db.scalar(select(Call).where(Call.id == call_id))
             if db_call:
                 # Calculate call duration
                 if db_call.start_time is not None:
                     duration = (datetime.utcnow() - db_call.start_time).total_seconds()
                     db_call.duration = float(duration)
-                    db.flush()
+                    await db.flush()
                 
                 # Update call status to Completed
                 db_call.status = CallStatus.COMPLETED.value
                 
-                # Update agent status back to Available
-                current_agent.status = AgentStatus.AVAILABLE.value
+                await db.commit()
                 
-                db.commit()
+                # Update agent status back to Available
+                presence_index.set_status(current_agent.id, AgentStatus.AVAILABLE.value)
         
         # End the room in LiveKit
         await LiveKitService.end_call(room_name)
@@ -693,8 +831,8 @@ async def end_room(
 @router.post("/sip/create-participant")
 async def create_sip_participant(
     data: dict,
-    db: Session = Depends(get_db),
-    current_agent: Agent = Depends(get_current_agent)
+    db: AsyncSession = Depends(get_db),
+    current_agent: AgentPrincipal = Depends(get_current_agent)
 ):
     """Create a SIP participant from the frontend to make an outbound call"""
     
@@ -726,16 +864,16 @@ async def create_sip_participant(
         )
     
     # Get the active call record
-    db_call = db.query(Call).filter(
+    db_call = await db.scalar(select(Call).where(
         Call.agent_id == current_agent.id,
         Call.livekit_room_name == room_name,
         Call.status == CallStatus.IN_PROGRESS
-    ).first()
+    ))
     
     if db_call:
         # Update the call record with the SIP participant information
         db_call.sip_participant_id = participant.participant_id
-        db.commit()
+        await db.commit()
     
     return {
         "status": "success",
@@ -787,64 +925,23 @@ async def check_livekit_connection():
 @router.get("/calls/room/{room_name}")
 async def get_room_details(
     room_name: str,
-    db: Session = Depends(get_db),
-    current_agent: Agent = Depends(get_current_agent)
+    db: AsyncSession = Depends(get_db),
+    current_agent: AgentPrincipal = Depends(get_current_agent)
 ):
     """Get detailed information about a specific LiveKit room"""
     try:
-        async with LiveKitService.get_client() as livekit_api:
-            # Get all rooms and filter by name
-            from livekit.api import ListRoomsRequest
-            rooms_response = await livekit_api.room.list_rooms(ListRoomsRequest())
-            
-            # Find the room by name
-            room = None
-            if hasattr(rooms_response, 'rooms'):
-                for r in rooms_response.rooms:
-                    if r.name == room_name:
-                        room = r
-                        break
-            
-            if not room:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Room {room_name} not found"
-                )
-            
-            # Get all participants in the room
-            participants = []
-            try:
-                from livekit.api import ListParticipantsRequest
-                participants_response = await livekit_api.room.list_participants(
-                    ListParticipantsRequest(room=room_name)
-                )
-                
-                if hasattr(participants_response, 'participants'):
-                    participants = participants_response.participants
-            except Exception as part_err:
-                logger.error(f"Error getting participants: {str(part_err)}")
-                
-            # Format the response
-            room_data = {
-                "room_name": room.name,
-                "room_id": room.sid,
-                "status": "Active",
-                "participant_count": len(participants) if isinstance(participants, list) else 0,
-                "creation_time": room.creation_time if hasattr(room, 'creation_time') else None,
-                "participants": []
-            }
-            
-            # Add participant details
-            for participant in participants:
-                if isinstance(participant, object):
-                    participant_data = {
-                        "id": participant.identity if hasattr(participant, 'identity') else None,
-                        "name": participant.name if hasattr(participant, 'name') else None,
-                        "is_publisher": participant.is_publisher if hasattr(participant, 'is_publisher') else False
-                    }
-                    room_data["participants"].append(participant_data)
-            
-            return room_data
+        # LiveKit filters by name, so only this room and its participants are fetched
+        rooms = await LiveKitService.list_active_rooms(
+            names=[room_name], with_participants=True
+        )
+        if not rooms:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Room {room_name} not found"
+            )
+        return rooms[0]
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting room details: {str(e)}")
         raise HTTPException(
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+
+from app.services.metrics import metrics
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics():
+    """Expose in-process metrics (pool wait times, queue depths, ...) as JSON"""
+    return metrics.snapshot()
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, HTTPException, Header, Request, status
+from typing import Optional
+from livekit import api
+
+from app.services.auto_assignment_service import get_auto_assignment_service
+from app.services.snapshot import get_snapshot_builder
+from app.config import LIVEKIT_API_KEY, LIVEKIT_API_SECRET, logger
+
+router = APIRouter()
+
+webhook_receiver = api.WebhookReceiver(
+    api.TokenVerifier(LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
+)
+
+@router.post("/livekit/webhook")
+async def receive_livekit_webhook(
+    request: Request,
+    authorization: Optional[str] = Header(None)
+):
+    """Receive signed LiveKit webhooks (room_started, participant_joined, room_finished)"""
+    body = (await request.body()).decode()
+    token = (authorization or "").removeprefix("Bearer ").strip()
+
+    try:
+        event = webhook_receiver.receive(body, token)
+    except Exception as e:
+        logger.warning(f"Rejected LiveKit webhook: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid webhook signature"
+        )
+
+    if event.event in ("room_started", "room_finished"):
+        # Snapshots built from here on must not show the old room list
+        get_snapshot_builder().invalidate_rooms()
+
+    try:
+        auto_service = get_auto_assignment_service()
+        await auto_service.handle_webhook_event(event)
+    except Exception as e:
+        # Acknowledge anyway; the reconciliation loop will pick the room up
+        logger.error(f"Error handling LiveKit webhook {event.event}: {str(e)}")
+
+    return {"status": "ok"}
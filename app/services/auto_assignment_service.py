@@ -1,244 +1,980 @@
 import asyncio
+import enum
+import json
+import time
 import uuid
+import weakref
 from typing import Dict, List, Optional, Set
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
 from livekit.api import ListRoomsRequest
 
-from app.database.db import get_db
-from app.models.models import Agent, Call, AgentStatus, CallDirection, CallStatus
+from app.database.db import session_scope
+from app.models.models import Call, AgentStatus, CallDirection, CallStatus
 from app.routers.calls import LiveKitService
-from app.api.websocket_manager import ConnectionManager
-from app.config import logger
+from app.api.websocket_manager import ConnectionManager, get_connection_manager
+from app.services.presence import PresenceIndex, get_presence_index
+from app.services.routing import RoutingStrategy, get_routing_strategy
+from app.services.call_queue import CallQueue, QueueEntry, get_call_queue
+from app.services.metrics import metrics
+from app.services.background import spawn
+from app.services.timer_wheel import TimerWheel
+from app.services.state_backend import StateBackend, get_state_backend
+from app.services.leader import LeaderElection
+from app.services.node_registry import NodeRegistry, get_node_registry
+from app.config import (
+    AUTO_ASSIGNMENT_RECONCILE_INTERVAL,
+    AUTO_ASSIGNMENT_RING_MODE,
+    AUTO_ASSIGNMENT_RING_GROUP_SIZE,
+    AUTO_ASSIGNMENT_RING_STAGGER,
+    AUTO_ASSIGNMENT_TIMER_TICK,
+    AUTO_ASSIGNMENT_INVITE_TIMEOUT,
+    AUTO_ASSIGNMENT_QUEUE_TIMEOUTS,
+    AUTO_ASSIGNMENT_ADAPTIVE_TIMEOUT,
+    AUTO_ASSIGNMENT_ADAPTIVE_FACTOR,
+    AUTO_ASSIGNMENT_ADAPTIVE_MIN_SAMPLES,
+    AUTO_ASSIGNMENT_MIN_INVITE_TIMEOUT,
+    CALL_QUEUE_EWMA_ALPHA,
+    STATE_RPC_TIMEOUT,
+    logger,
+)
+
+
+class AssignmentState(str, enum.Enum):
+    """Lifecycle of the assignment of one inbound call"""
+
+    RINGING = "ringing"
+    ACCEPTED = "accepted"
+    CONNECTED = "connected"  # the winning agent joined the room
+    ENDED = "ended"
+
+
+class InvitationState(str, enum.Enum):
+    """Outcome of one agent's invitation for a call"""
+
+    RINGING = "ringing"
+    ACCEPTED = "accepted"
+    DECLINED = "declined"
+    TIMED_OUT = "timed_out"
+    REVOKED = "revoked"
+    UNDELIVERED = "undelivered"
+
+
+# Allowed assignment transitions; any other move means a competing response won
+ASSIGNMENT_TRANSITIONS = {
+    AssignmentState.RINGING: {AssignmentState.ACCEPTED, AssignmentState.ENDED},
+    AssignmentState.ACCEPTED: {AssignmentState.CONNECTED, AssignmentState.ENDED},
+    AssignmentState.CONNECTED: {AssignmentState.ENDED},
+    AssignmentState.ENDED: set(),
+}
+
+# Shared across workers: inbound rooms already picked up, and which worker rings each room
+MONITORED_ROOMS = "monitored_rooms"
+PENDING_ASSIGNMENTS = "pending_assignments"
+# Lease held by the one worker that runs assignment
+MONITOR_LEASE = "auto_assignment"
 
 
 class AutoAssignmentService:
-    def __init__(self, connection_manager: ConnectionManager):
+    def __init__(
+        self,
+        connection_manager: ConnectionManager,
+        presence: Optional[PresenceIndex] = None,
+        routing: Optional[RoutingStrategy] = None,
+        queue: Optional[CallQueue] = None,
+        backend: Optional[StateBackend] = None,
+        nodes: Optional[NodeRegistry] = None,
+    ):
         self.manager = connection_manager
+        self.presence = presence if presence is not None else get_presence_index()
+        self.routing = routing if routing is not None else get_routing_strategy()
+        # CallQueue defines __len__, so an empty queue is falsy
+        self.queue = queue if queue is not None else get_call_queue()
+        self.backend = backend if backend is not None else get_state_backend()
+        self.nodes = nodes if nodes is not None else get_node_registry()
+        # Responses forwarded to the worker that owns the room: request_id -> result
+        self._replies: Dict[str, asyncio.Future] = {}
+        self.drain_task: Optional[asyncio.Task] = None
+        self.monitor_task: Optional[asyncio.Task] = None
+        self.monitor_interval = AUTO_ASSIGNMENT_RECONCILE_INTERVAL
         self.monitored_rooms: Set[str] = set()
         self.pending_assignments: Dict[str, Dict] = {}
-        self.assignment_timeouts: Dict[str, asyncio.Task] = {}
+        # Accepted calls, kept until the room finishes (ACCEPTED -> CONNECTED -> ENDED)
+        self.active_assignments: Dict[str, Dict] = {}
+        # Serializes responses, timeouts and rings for a room; a lock disappears
+        # once nothing holds or waits on it
+        self.room_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+        # Invitation timeouts ("invite", room, agent) and stagger rings ("stagger", room)
+        self.timers = TimerWheel(tick=AUTO_ASSIGNMENT_TIMER_TICK)
+        # agent_id -> room they are currently being rung for
+        self.ringing_agents: Dict[int, str] = {}
+        self.ring_mode = AUTO_ASSIGNMENT_RING_MODE
+        self.ring_group_size = AUTO_ASSIGNMENT_RING_GROUP_SIZE
+        self.ring_stagger = AUTO_ASSIGNMENT_RING_STAGGER
+        self.invitation_timeout = AUTO_ASSIGNMENT_INVITE_TIMEOUT
+        self.queue_timeouts: Dict[str, float] = dict(AUTO_ASSIGNMENT_QUEUE_TIMEOUTS)
+        self.adaptive_timeout = AUTO_ASSIGNMENT_ADAPTIVE_TIMEOUT
+        # agent_id -> smoothed seconds from invitation to answer, and sample count
+        self.response_latency: Dict[int, float] = {}
+        self.response_samples: Dict[int, int] = {}
         self.is_monitoring = False
+        # Only the leader rings calls, drains the queue and reconciles rooms
+        self.leader = LeaderElection(
+            MONITOR_LEASE,
+            self.backend,
+            on_elected=self._on_elected,
+            on_demoted=self._on_demoted,
+        )
 
-    async def start_monitoring(self, interval: int = 5):
-        """Start monitoring for new inbound rooms"""
-        if self.is_monitoring:
-            return
+        # Queued calls are rung as soon as an agent becomes routable
+        self.presence.add_listener(self._on_presence_change)
+        self.backend.subscribe("assignment.response", self._on_forwarded_response)
+        self.backend.subscribe("assignment.reply", self._on_forwarded_reply)
+        self.backend.subscribe("assignment.invitation", self._on_invitation_query)
+        self.backend.subscribe("assignment.event", self._on_forwarded_event)
+        self.nodes.add_listener(on_lost=self._on_node_lost)
+
+    async def start_monitoring(self, interval: Optional[int] = None):
+        """Join the election for the auto-assignment leader.
 
+        Every worker campaigns but only the leader assigns calls: it handles
+        inbound-room webhook events (the other workers forward theirs), drains
+        the call queue and runs the slow reconciliation loop for rooms whose
+        events were missed. Calling this again while running is a no-op.
+        """
+        if interval:
+            self.monitor_interval = interval
+        if self.is_monitoring and self.leader.running:
+            return
         self.is_monitoring = True
         logger.info("Starting auto-assignment monitoring service")
-
-        while self.is_monitoring:
-            try:
-                await self._check_for_new_inbound_rooms()
-                await asyncio.sleep(interval)
-            except Exception as e:
-                logger.error(f"Error in auto-assignment monitoring: {str(e)}")
-                await asyncio.sleep(interval)
+        self.leader.start()
 
     async def stop_monitoring(self):
-        """Stop monitoring for new inbound rooms"""
+        """Stop monitoring for new inbound rooms and hand over leadership.
+
+        Calls still ringing here are handed back: their invitations are
+        revoked, their claims released and they are written to the
+        call_queue table, where the next leader restores them from.
+        """
         self.is_monitoring = False
+        await self.leader.stop()
 
-        # Cancel all pending timeouts
-        for timeout_task in self.assignment_timeouts.values():
-            timeout_task.cancel()
+        for room_name in list(self.pending_assignments):
+            await self._release_claim(room_name, self.backend.node_id)
+            assignment = self._clear_assignment(room_name, "monitor_stopped")
+            try:
+                if assignment.get("queued_at"):
+                    # Keep its original place in line
+                    await self.queue.requeue(
+                        QueueEntry(
+                            room_name,
+                            assignment["caller_id"],
+                            assignment["priority"],
+                            assignment["queued_at"],
+                            assignment["db_call_id"],
+                            assignment["queue_name"],
+                        )
+                    )
+                else:
+                    # If the queue is full, reconciliation finds the room again
+                    await self.queue.enqueue(
+                        room_name,
+                        assignment["caller_id"],
+                        assignment["priority"],
+                        assignment["queue_name"],
+                        assignment["db_call_id"],
+                    )
+            except Exception as e:
+                logger.error(f"Error handing back room {room_name}: {str(e)}")
+        # Only the table matters now; the leader restores the queue from it
+        self.queue.clear()
 
-        self.assignment_timeouts.clear()
+        # Cancel all pending timeouts
+        self.timers.stop()
         self.pending_assignments.clear()
+        self.active_assignments.clear()
+        self.ringing_agents.clear()
         logger.info("Stopped auto-assignment monitoring service")
 
+    async def _on_elected(self):
+        """This worker now assigns calls: restore the queue and start reconciling"""
+        # Callers queued under the previous leader are still Waiting in the table
+        await self.queue.load(skip=self.pending_assignments)
+        self.monitor_task = asyncio.create_task(self._reconcile_loop())
+        self._schedule_drain()
+
+    async def _on_demoted(self):
+        """Another worker assigns calls now; calls already ringing here finish here"""
+        for task in (self.monitor_task, self.drain_task):
+            if task is not None:
+                task.cancel()
+        self.monitor_task = None
+        # The new leader restores waiting callers from the call_queue table
+        self.queue.clear()
+
+    async def _reconcile_loop(self):
+        while True:
+            await self._check_for_new_inbound_rooms()
+            await asyncio.sleep(self.monitor_interval)
+
+    async def handle_webhook_event(self, event):
+        """React to a verified LiveKit webhook event.
+
+        Only the leader acts on inbound rooms; other workers forward the
+        event to it. An event published while no worker leads is lost and
+        left to the new leader's reconciliation loop.
+        """
+        room_name = event.room.name if event.HasField("room") else ""
+        if not room_name.startswith("inbound-"):
+            return
+
+        room_event = {
+            "event": event.event,
+            "room_name": room_name,
+            "metadata": event.room.metadata,
+            "identity": event.participant.identity if event.HasField("participant") else "",
+            "room": LiveKitService.format_room(event.room),
+        }
+        if self.leader.is_leader:
+            await self._handle_room_event(room_event)
+        else:
+            await self.backend.publish(
+                "assignment.event", {"origin": self.backend.node_id, **room_event}
+            )
+
+    async def _on_forwarded_event(self, message: dict):
+        if message["origin"] != self.backend.node_id and self.leader.is_leader:
+            # Don't hold up the pub/sub listener while the room is rung
+            spawn(self._handle_room_event(message), f"Forwarded event for {message['room_name']}")
+
+    async def _handle_room_event(self, room_event: dict):
+        """Leader side of handle_webhook_event"""
+        event = room_event["event"]
+        room_name = room_event["room_name"]
+
+        if event == "participant_joined" and room_name in self.active_assignments:
+            # Agents join as agent_{id} (see /calls/join-room)
+            assignment = self.active_assignments[room_name]
+            if room_event["identity"] == f"agent_{assignment['agent_id']}":
+                self._transition(assignment, AssignmentState.CONNECTED)
+            return
+
+        if event in ("room_started", "participant_joined"):
+            # Both events fire for a new inbound call, possibly on different
+            # workers; only the first one counts
+            if (
+                room_name in self.monitored_rooms
+                or room_name in self.pending_assignments
+                or room_name in self.queue
+            ):
+                return
+            if not await self.backend.sadd(MONITORED_ROOMS, room_name):
+                return
+            self.monitored_rooms.add(room_name)
+            logger.info(f"New inbound room from webhook ({event}): {room_name}")
+            routing = self._room_routing(room_event["metadata"])
+            await self.manager.broadcast_room_update(
+                {
+                    "event": "room_created",
+                    # The whole row, so pages add it without fetching the room list
+                    **room_event["room"],
+                    "queue": routing.get("queue_name"),
+                }
+            )
+            await self._initiate_assignment(room_name, **routing)
+
+        elif event == "room_finished":
+            self.monitored_rooms.discard(room_name)
+            await self.backend.srem(MONITORED_ROOMS, room_name)
+            active = self.active_assignments.pop(room_name, None)
+            if active is not None:
+                self._transition(active, AssignmentState.ENDED)
+            elif room_name in self.pending_assignments:
+                # Caller hung up before anyone accepted
+                logger.info(f"Inbound room {room_name} finished while ringing")
+                assignment = self._clear_assignment(room_name, "caller_hung_up")
+                if assignment.get("queued_at"):
+                    await self.queue.mark_abandoned(room_name)
+                await self._reject_call_record(assignment.get("db_call_id"))
+            elif room_name in self.queue:
+                logger.info(f"Inbound room {room_name} abandoned while queued")
+                call_id = self.queue.entries[room_name].call_id
+                await self.queue.mark_abandoned(room_name)
+                # A declined ring left a call record behind
+                await self._reject_call_record(call_id)
+            await self.manager.broadcast_room_update(
+                {
+                    "event": "room_deleted",
+                    "room_name": room_name,
+                    "queue": self._room_routing(room_event["metadata"]).get("queue_name"),
+                }
+            )
+
     async def _check_for_new_inbound_rooms(self):
         """Check for new inbound rooms and initiate assignment process"""
         try:
-            async with LiveKitService.get_client() as livekit_api:
-                response = await livekit_api.room.list_rooms(ListRoomsRequest())
+            # Rooms a dead worker was ringing are rung again below
+            for room_name, owner in (await self.backend.hgetall(PENDING_ASSIGNMENTS)).items():
+                if not self.nodes.is_alive(owner["node"]):
+                    await self._release_claim(room_name, owner["node"])
+
+            response = await LiveKitService.call(
+                lambda livekit_api: livekit_api.room.list_rooms(ListRoomsRequest())
+            )
+
+            current_rooms = set()
+            if hasattr(response, "rooms"):
+                for room in response.rooms:
+                    room_name = room.name
+                    current_rooms.add(room_name)
 
-                current_rooms = set()
-                if hasattr(response, "rooms"):
-                    for room in response.rooms:
-                        room_name = room.name
-                        current_rooms.add(room_name)
+                    # Check if it's an inbound room no worker has seen before
+                    if (
+                        room_name.startswith("inbound-")
+                        and room_name not in self.monitored_rooms
+                        and room_name not in self.pending_assignments
+                        and room_name not in self.queue
+                        and await self.backend.sadd(MONITORED_ROOMS, room_name)
+                    ):
 
-                        # Check if it's an inbound room we haven't seen before
-                        if (
-                            room_name.startswith("inbound-")
-                            and room_name not in self.monitored_rooms
-                            and room_name not in self.pending_assignments
-                        ):
+                        logger.info(f"New inbound room detected: {room_name}")
+                        await self._initiate_assignment(
+                            room_name, **self._room_routing(room.metadata)
+                        )
 
-                            logger.info(f"New inbound room detected: {room_name}")
-                            await self._initiate_assignment(room_name)
+                # Queued rooms that no longer exist lost their webhook
+                for room_name in list(self.queue.entries):
+                    if room_name not in current_rooms:
+                        await self.queue.mark_abandoned(room_name)
+                for room_name in list(self.active_assignments):
+                    if room_name not in current_rooms:
+                        assignment = self.active_assignments.pop(room_name)
+                        self._transition(assignment, AssignmentState.ENDED)
+                for room_name in await self.backend.smembers(MONITORED_ROOMS):
+                    if room_name not in current_rooms:
+                        await self.backend.srem(MONITORED_ROOMS, room_name)
+                # Claims this worker left behind (e.g. an assignment that errored out)
+                for room_name, owner in (await self.backend.hgetall(PENDING_ASSIGNMENTS)).items():
+                    if (
+                        owner["node"] == self.backend.node_id
+                        and room_name not in self.pending_assignments
+                    ):
+                        await self.backend.hdel(PENDING_ASSIGNMENTS, room_name)
 
-                # Update monitored rooms
-                self.monitored_rooms = current_rooms
+            # Update monitored rooms
+            self.monitored_rooms = current_rooms
+
+            # Retry queued calls whose agents declined and stayed Available
+            self._schedule_drain()
 
         except Exception as e:
             logger.error(f"Error checking for new inbound rooms: {str(e)}")
 
-    async def _initiate_assignment(self, room_name: str):
-        """Initiate the assignment process for a new inbound room"""
+    async def _on_node_lost(self, node_id: str):
+        """A worker died while ringing calls: ring them again from here"""
+        if not self.leader.is_leader:
+            return  # the leader's reconciliation loop sweeps them later
+        released = [
+            room_name
+            for room_name, owner in (await self.backend.hgetall(PENDING_ASSIGNMENTS)).items()
+            if owner["node"] == node_id and await self._release_claim(room_name, node_id)
+        ]
+        if released:
+            logger.warning(f"Re-ringing {len(released)} calls left by lost node {node_id}")
+            await self._check_for_new_inbound_rooms()
+
+    async def _release_claim(self, room_name: str, node_id: str) -> bool:
+        """Forget a dead worker's claim so reconciliation picks the room up again"""
+        if not await self.backend.hdel_if(PENDING_ASSIGNMENTS, room_name, "node", node_id):
+            return False
+        await self.backend.srem(MONITORED_ROOMS, room_name)
+        self.monitored_rooms.discard(room_name)
+        metrics.inc("assignment.claims_reclaimed")
+        return True
+
+    async def _initiate_assignment(
+        self,
+        room_name: str,
+        priority: int = 0,
+        queue_name: str = "default",
+        queued: Optional[QueueEntry] = None,
+    ):
+        """Initiate the assignment process for a new (or dequeued) inbound room"""
+        async with self._room_lock(room_name):
+            if room_name in self.pending_assignments or room_name in self.active_assignments:
+                return  # webhook and reconciliation raced for the same room
+            if not queued and room_name in self.queue:
+                return
+            await self._start_assignment(room_name, priority, queue_name, queued)
+
+    async def _start_assignment(
+        self,
+        room_name: str,
+        priority: int,
+        queue_name: str,
+        queued: Optional[QueueEntry],
+    ):
         try:
             # Extract caller information from room name if possible
-            caller_id = self._extract_caller_id(room_name)
+            caller_id = queued.caller_id if queued else self._extract_caller_id(room_name)
 
             # Get available agents
-            db = next(get_db())
-            available_agents = self._get_available_agents(db)
+            available_agents = self._get_available_agents()
+
+            if available_agents and not await self._claim_room(room_name, caller_id):
+                # Another worker is already ringing this room; a dequeued caller
+                # keeps their place in case that worker gives up on the call
+                if queued:
+                    await self.queue.requeue(queued)
+                return
 
             if not available_agents:
                 logger.warning(f"No available agents for inbound room: {room_name}")
+                if queued:
+                    await self.queue.requeue(queued)
+                else:
+                    await self._enqueue_call(room_name, caller_id, priority, queue_name)
                 return
 
             # Create pending assignment record
             assignment_data = {
                 "room_name": room_name,
                 "caller_id": caller_id,
-                "available_agents": [agent.id for agent in available_agents],
+                "priority": queued.priority if queued else priority,
+                "queue_name": queued.queue_name if queued else queue_name,
+                "ring_mode": self.ring_mode,
+                "state": AssignmentState.RINGING,
+                "agent_id": None,  # the winner, once accepted
+                "available_agents": available_agents,
                 "current_agent_index": 0,
+                "ringing_agents": [],
+                "invitations": {},  # agent_id -> InvitationState
+                # agent_id -> monotonic time their invitation was sent, and
+                # seconds they were given to answer
+                "invited_at": {},
+                "timeouts": {},
                 "created_at": datetime.utcnow(),
-                "db_call_id": None,
+                "queued_at": queued.enqueued_at if queued else None,
+                "db_call_id": queued.call_id if queued else None,
             }
 
             self.pending_assignments[room_name] = assignment_data
+            await self._share_assignment(assignment_data)
+
+            # Sequential rings one agent at a time; parallel/staggered ring a group
+            await self._ring_next_agents(room_name)
 
-            # Start assignment process with first available agent
-            await self._assign_to_next_agent(room_name)
+            if self.ring_mode == "staggered" and room_name in self.pending_assignments:
+                self.timers.schedule(
+                    ("stagger", room_name), self.ring_stagger, self._stagger_ring, room_name
+                )
 
         except Exception as e:
             logger.error(f"Error initiating assignment for room {room_name}: {str(e)}")
 
-    async def _assign_to_next_agent(self, room_name: str):
-        """Assign the call to the next available agent"""
-        if room_name not in self.pending_assignments:
+    async def _enqueue_call(
+        self,
+        room_name: str,
+        caller_id: str,
+        priority: int = 0,
+        queue_name: str = "default",
+        call_id: Optional[int] = None,
+    ):
+        """Hold a call in the waiting queue; end it only if the queue is full"""
+        position = await self.queue.enqueue(room_name, caller_id, priority, queue_name, call_id)
+        if position is None:
+            logger.warning(f"Call queue full, ending inbound room {room_name}")
+            await LiveKitService.end_call(room_name)
+            return
+        logger.info(f"Inbound room {room_name} queued at position {position}")
+
+    def _on_presence_change(self, presence, old_status: str):
+        """PresenceIndex listener: a newly routable agent can take a queued call"""
+        if presence.routable and len(self.queue):
+            self._schedule_drain()
+
+    def _schedule_drain(self):
+        if not self.leader.is_leader:
+            return  # only the leader rings queued calls
+        if self.drain_task is not None and not self.drain_task.done():
+            return  # the running drain re-checks for free agents on every pass
+        try:
+            self.drain_task = asyncio.get_running_loop().create_task(self._drain_queue())
+        except RuntimeError:
+            pass  # no event loop (e.g. offline scripts driving the presence index)
+
+    async def _drain_queue(self):
+        """Ring queued calls, best first, while there are agents free to ring"""
+        try:
+            while len(self.queue) and self.routing.select(exclude=self.ringing_agents) is not None:
+                entry = self.queue.pop()
+                if entry is None:
+                    break
+                logger.info(f"Dequeued inbound room {entry.room_name}")
+                await self._initiate_assignment(entry.room_name, queued=entry)
+                if (
+                    entry.room_name not in self.pending_assignments
+                    and entry.room_name not in self.active_assignments
+                ):
+                    # Nobody was rung (e.g. every invitation bounced and the
+                    # call went back in the queue): stop here instead of
+                    # popping it again; the next presence change or
+                    # reconciliation pass drains the queue again
+                    metrics.inc("assignment.drain_stalled")
+                    break
+        except Exception as e:
+            logger.error(f"Error draining call queue: {str(e)}")
+
+    @staticmethod
+    def _room_routing(metadata: str) -> Dict:
+        """Priority and queue from room metadata, e.g. '{"priority": 5, "queue": "sales"}'"""
+        try:
+            metadata = json.loads(metadata or "{}")
+            return {
+                "priority": int(metadata.get("priority", 0)),
+                "queue_name": str(metadata.get("queue", "default")),
+            }
+        except (ValueError, TypeError, AttributeError):
+            return {}
+
+    @property
+    def wave_size(self) -> int:
+        """How many agents are invited at once"""
+        return 1 if self.ring_mode == "sequential" else max(1, self.ring_group_size)
+
+    def _room_lock(self, room_name: str) -> asyncio.Lock:
+        lock = self.room_locks.get(room_name)
+        if lock is None:
+            lock = self.room_locks[room_name] = asyncio.Lock()
+        return lock
+
+    @staticmethod
+    def _transition(assignment: Dict, new_state: AssignmentState) -> bool:
+        """Compare-and-set the assignment state.
+
+        Returns False when the move is not allowed from the current state,
+        i.e. a competing response already moved the assignment on. There is
+        no await between the check and the write, so it is atomic on the loop.
+        """
+        if new_state not in ASSIGNMENT_TRANSITIONS[assignment["state"]]:
+            return False
+        assignment["state"] = new_state
+        metrics.inc(f"assignment.state.{new_state.value}")
+        return True
+
+    def _settle_invitation(
+        self, assignment: Dict, agent_id: int, outcome: InvitationState
+    ) -> bool:
+        """Move an agent's invitation out of RINGING; only the first outcome counts"""
+        if assignment["invitations"].get(agent_id) != InvitationState.RINGING:
+            return False
+        assignment["invitations"][agent_id] = outcome
+        assignment["ringing_agents"].remove(agent_id)
+        self.timers.cancel(("invite", assignment["room_name"], agent_id))
+        self._release_agent(agent_id, assignment["room_name"])
+        return True
+
+    async def _ring_next_agents(self, room_name: str):
+        """Invite the next wave of candidates for a room (room lock held).
+
+        Candidates that are no longer routable, or are already ringing for
+        another room, are skipped. If nobody is left to ring and nobody is
+        still ringing, the call is given up.
+        """
+        assignment = self.pending_assignments.get(room_name)
+        if assignment is None or assignment["state"] != AssignmentState.RINGING:
             return
 
-        assignment = self.pending_assignments[room_name]
         available_agents = assignment["available_agents"]
-        current_index = assignment["current_agent_index"]
 
-        if current_index >= len(available_agents):
-            logger.warning(f"No more available agents for room {room_name}")
-            await self._handle_no_agents_available(room_name)
+        wave = []
+        while len(wave) < self.wave_size and self._refill_candidates(assignment):
+            agent_id = available_agents[assignment["current_agent_index"]]
+            assignment["current_agent_index"] += 1
+            # Fresh availability comes from the presence index, not the database
+            if self.presence.is_routable(agent_id) and agent_id not in self.ringing_agents:
+                # Reserve the agent now: the awaits below let other rooms ring
+                self.ringing_agents[agent_id] = room_name
+                wave.append(agent_id)
+
+        if not wave:
+            if not assignment["ringing_agents"]:
+                logger.warning(f"No more available agents for room {room_name}")
+                await self._handle_no_agents_available(room_name)
             return
 
-        agent_id = available_agents[current_index]
+        try:
+            if not assignment.get("db_call_id"):
+                async with session_scope() as db:
+                    # Create call record if not exists
+                    db_call = Call(
+                        agent_id=wave[0],
+                        caller_id=assignment["caller_id"],
+                        direction=CallDirection.INBOUND,
+                        start_time=datetime.utcnow(),
+                        status=CallStatus.IN_PROGRESS,
+                        livekit_room_name=room_name,
+                    )
+                    db.add(db_call)
+                    await db.flush()
+                    assignment["db_call_id"] = db_call.id
+        except Exception as e:
+            logger.error(f"Error creating call record for room {room_name}: {str(e)}")
+            for agent_id in wave:
+                self._release_agent(agent_id, room_name)
+            await self._ring_next_agents(room_name)
+            return
 
         try:
-            # Get fresh agent data
-            db = next(get_db())
-            agent = db.query(Agent).filter(Agent.id == agent_id).first()
-
-            if not agent or agent.status != AgentStatus.AVAILABLE.value:
-                # Agent no longer available, try next one
-                assignment["current_agent_index"] += 1
-                await self._assign_to_next_agent(room_name)
-                return
+            for agent_id in wave:
+                # The caller may hang up while we are in the DB or on the socket
+                if assignment["state"] != AssignmentState.RINGING:
+                    return
+                if not self.presence.is_routable(agent_id):
+                    continue  # took another call (e.g. outbound) in the meantime
+                await self._invite_agent(assignment, agent_id)
+        finally:
+            # Hand back agents reserved for this wave but never invited
+            for agent_id in wave:
+                if agent_id not in assignment["invitations"]:
+                    self._release_agent(agent_id, room_name)
 
-            # Create call record if not exists
-            if not assignment.get("db_call_id"):
-                db_call = Call(
-                    agent_id=agent.id,
-                    caller_id=assignment["caller_id"],
-                    direction=CallDirection.INBOUND,
-                    start_time=datetime.utcnow(),
-                    status=CallStatus.IN_PROGRESS,
-                    livekit_room_name=room_name,
-                )
-                db.add(db_call)
-                db.commit()
-                db.refresh(db_call)
-                assignment["db_call_id"] = db_call.id
-            else:
-                # Update existing call record with new agent
-                db_call = (
-                    db.query(Call).filter(Call.id == assignment["db_call_id"]).first()
-                )
-                if db_call:
-                    db_call.agent_id = agent.id
-                    db.commit()
+        # Every invitation in the wave bounced (stale sockets): move straight on
+        if assignment["state"] == AssignmentState.RINGING and not assignment["ringing_agents"]:
+            await self._ring_next_agents(room_name)
+        elif assignment["state"] == AssignmentState.RINGING:
+            await self._share_assignment(assignment)
 
-            # Send call invitation to agent
-            invitation_data = {
-                "room_name": room_name,
+    async def _claim_room(self, room_name: str, caller_id: str) -> bool:
+        """Become the worker that rings a room; False if another worker already is"""
+        if await self.backend.hsetnx(
+            PENDING_ASSIGNMENTS,
+            room_name,
+            {"node": self.backend.node_id, "caller_id": caller_id},
+        ):
+            return True
+        # A leftover claim of our own (not yet deleted) is ours to reuse
+        owner = await self.backend.hget(PENDING_ASSIGNMENTS, room_name)
+        return owner is None or owner["node"] == self.backend.node_id
+
+    async def _share_assignment(self, assignment: Dict):
+        """Publish who is ringing a room so any worker can report or route to it"""
+        await self.backend.hset(
+            PENDING_ASSIGNMENTS,
+            assignment["room_name"],
+            {
+                "node": self.backend.node_id,
                 "caller_id": assignment["caller_id"],
-                "call_id": assignment["db_call_id"],
-                "timestamp": datetime.utcnow().isoformat(),
-            }
+                "state": assignment["state"],
+                "ringing_agents": assignment["ringing_agents"],
+                "created_at": assignment["created_at"],
+            },
+        )
 
-            await self.manager.send_call_invitation(str(agent.id), invitation_data)
+    def _invitation_timeout_for(self, agent_id: int, queue_name: str) -> float:
+        """Seconds to ring an agent: the queue's timeout, shortened in adaptive
+        mode for agents who usually answer quickly"""
+        timeout = self.queue_timeouts.get(queue_name, self.invitation_timeout)
+        if (
+            self.adaptive_timeout
+            and self.response_samples.get(agent_id, 0) >= AUTO_ASSIGNMENT_ADAPTIVE_MIN_SAMPLES
+        ):
+            adaptive = self.response_latency[agent_id] * AUTO_ASSIGNMENT_ADAPTIVE_FACTOR
+            timeout = min(timeout, max(AUTO_ASSIGNMENT_MIN_INVITE_TIMEOUT, adaptive))
+        return timeout
 
-            logger.info(
-                f"Sent invitation to agent {agent.id} via WebSocket for room {room_name}"
-            )
-            print(
-                f"[AutoAssignment] Sent invitation to agent {agent.id} for room {room_name}"
-            )
+    def _record_response_latency(self, agent_id: int, seconds: float):
+        previous = self.response_latency.get(agent_id)
+        self.response_latency[agent_id] = (
+            seconds
+            if previous is None
+            else CALL_QUEUE_EWMA_ALPHA * seconds + (1 - CALL_QUEUE_EWMA_ALPHA) * previous
+        )
+        self.response_samples[agent_id] = self.response_samples.get(agent_id, 0) + 1
+        metrics.observe("assignment.response_latency_s", seconds)
 
-            # Set timeout for agent response (30 seconds)
-            timeout_task = asyncio.create_task(
-                self._handle_invitation_timeout(room_name, agent_id)
-            )
-            self.assignment_timeouts[f"{room_name}_{agent_id}"] = timeout_task
+    async def _invite_agent(self, assignment: Dict, agent_id: int) -> bool:
+        """Send one call invitation and start its response timer.
 
-            logger.info(
-                f"Call invitation sent to agent {agent_id} for room {room_name}"
-            )
+        Returns False (and leaves the agent un-rung) if the invitation could
+        not be delivered, so the caller never waits on a dead socket.
+        """
+        room_name = assignment["room_name"]
+        timeout = self._invitation_timeout_for(agent_id, assignment["queue_name"])
 
-        except Exception as e:
-            logger.error(
-                f"Error assigning to agent {agent_id} for room {room_name}: {str(e)}"
+        # Send call invitation to agent
+        invitation_data = {
+            "room_name": room_name,
+            "caller_id": assignment["caller_id"],
+            "call_id": assignment["db_call_id"],
+            "timestamp": datetime.utcnow().isoformat(),
+            "timeout": timeout,
+        }
+
+        assignment["ringing_agents"].append(agent_id)
+        assignment["invitations"][agent_id] = InvitationState.RINGING
+        assignment["timeouts"][agent_id] = timeout
+        self.ringing_agents[agent_id] = room_name
+        delivered = await self.manager.send_call_invitation(str(agent_id), invitation_data)
+        if not delivered:
+            logger.warning(
+                f"Invitation for room {room_name} not delivered to agent {agent_id}, skipping"
             )
-            assignment["current_agent_index"] += 1
-            await self._assign_to_next_agent(room_name)
+            metrics.inc("assignment.invitation_undelivered")
+            self._settle_invitation(assignment, agent_id, InvitationState.UNDELIVERED)
+            # No live socket took it: routing skips the agent until their
+            # socket answers again (or they reconnect)
+            self.presence.set_stale(agent_id, True)
+            return False
+        if assignment["invitations"][agent_id] != InvitationState.RINGING:
+            return False  # revoked while the invitation was on its way
+        assignment["invited_at"][agent_id] = time.monotonic()
 
-    async def _handle_invitation_timeout(
-        self, room_name: str, agent_id: int, timeout: int = 30
-    ):
-        """Handle invitation timeout and move to next agent"""
-        await asyncio.sleep(timeout)
+        logger.info(
+            f"Sent invitation to agent {agent_id} via WebSocket for room {room_name}"
+        )
+        print(
+            f"[AutoAssignment] Sent invitation to agent {agent_id} for room {room_name}"
+        )
+
+        # Set timeout for agent response
+        self.timers.schedule(
+            ("invite", room_name, agent_id),
+            timeout,
+            self._handle_invitation_timeout,
+            room_name,
+            agent_id,
+        )
+        return True
 
+    async def _stagger_ring(self, room_name: str):
+        """Staggered mode: widen the ring group every AUTO_ASSIGNMENT_RING_STAGGER seconds"""
+        async with self._room_lock(room_name):
+            assignment = self.pending_assignments.get(room_name)
+            if assignment is None or assignment["state"] != AssignmentState.RINGING:
+                return
+            if not self._refill_candidates(assignment):
+                return
+            await self._ring_next_agents(room_name)
+            if assignment["state"] == AssignmentState.RINGING:
+                self.timers.schedule(
+                    ("stagger", room_name), self.ring_stagger, self._stagger_ring, room_name
+                )
+
+    async def _handle_invitation_timeout(self, room_name: str, agent_id: int):
+        """Handle invitation timeout and move to next agent"""
         if room_name in self.pending_assignments:
             logger.info(f"Invitation timeout for agent {agent_id}, room {room_name}")
             await self.handle_invitation_response(room_name, agent_id, False, "timeout")
 
     async def handle_invitation_response(
         self, room_name: str, agent_id: int, accepted: bool, reason: str = ""
-    ):
-        """Handle agent's response to call invitation"""
+    ) -> bool:
+        """Handle agent's response to call invitation.
+
+        Responses can arrive at the same time over the WebSocket, the REST
+        route and the timeout timer; they are serialized per room and each
+        invitation settles exactly once. Returns False when the response no
+        longer applies: the call was answered by someone else, the caller
+        hung up, or this agent's invitation was already answered or timed out.
+        """
         if room_name not in self.pending_assignments:
-            return
+            owner = await self.backend.hget(PENDING_ASSIGNMENTS, room_name)
+            if owner is not None and owner["node"] != self.backend.node_id:
+                # The agent's socket or request landed on a different worker
+                return await self._forward_response(room_name, agent_id, accepted, reason)
 
-        # Cancel timeout task
-        timeout_key = f"{room_name}_{agent_id}"
-        if timeout_key in self.assignment_timeouts:
-            self.assignment_timeouts[timeout_key].cancel()
-            del self.assignment_timeouts[timeout_key]
+        async with self._room_lock(room_name):
+            assignment = self.pending_assignments.get(room_name)
+            if (
+                assignment is None
+                or assignment["invitations"].get(agent_id) != InvitationState.RINGING
+            ):
+                return False
 
-        assignment = self.pending_assignments[room_name]
+            invited_at = assignment["invited_at"].get(agent_id)
+            if reason == "timeout":
+                metrics.inc("assignment.invitation_timeout")
+            elif invited_at is not None:
+                self._record_response_latency(agent_id, time.monotonic() - invited_at)
 
-        if accepted:
-            logger.info(f"Agent {agent_id} accepted call for room {room_name}")
-            await self._finalize_assignment(room_name, agent_id)
-        else:
-            logger.info(
-                f"Agent {agent_id} rejected call for room {room_name}. Reason: {reason}"
+            if accepted:
+                if not self._transition(assignment, AssignmentState.ACCEPTED):
+                    return False
+                logger.info(f"Agent {agent_id} accepted call for room {room_name}")
+                self._settle_invitation(assignment, agent_id, InvitationState.ACCEPTED)
+                assignment["agent_id"] = agent_id
+                self._clear_assignment(room_name, "answered_elsewhere", winner=agent_id)
+                self.active_assignments[room_name] = assignment
+                await self._finalize_assignment(assignment, agent_id)
+            else:
+                logger.info(
+                    f"Agent {agent_id} rejected call for room {room_name}. Reason: {reason}"
+                )
+                self._settle_invitation(
+                    assignment,
+                    agent_id,
+                    InvitationState.TIMED_OUT if reason == "timeout" else InvitationState.DECLINED,
+                )
+                # Ring the next wave once everyone currently ringing has declined;
+                # staggered mode would otherwise wait for its next tick
+                if not assignment["ringing_agents"]:
+                    await self._ring_next_agents(room_name)
+            return True
+
+    async def _forward_response(
+        self, room_name: str, agent_id: int, accepted: bool, reason: str
+    ) -> bool:
+        """Hand a response to the worker ringing the room and wait for its verdict"""
+        try:
+            return await self._request(
+                "assignment.response",
+                {
+                    "room_name": room_name,
+                    "agent_id": agent_id,
+                    "accepted": accepted,
+                    "reason": reason,
+                },
             )
-            # Move to next agent
-            assignment["current_agent_index"] += 1
-            await self._assign_to_next_agent(room_name)
+        except asyncio.TimeoutError:
+            logger.warning(f"No reply from the worker ringing {room_name}")
+            return False
 
-    async def _finalize_assignment(self, room_name: str, agent_id: int):
-        """Finalize the assignment and clean up"""
+    async def _request(self, channel: str, message: dict):
+        """Publish a request for another worker and wait for its reply"""
+        request_id = uuid.uuid4().hex
+        reply = asyncio.get_running_loop().create_future()
+        self._replies[request_id] = reply
         try:
-            assignment = self.pending_assignments[room_name]
+            await self.backend.publish(
+                channel,
+                {**message, "origin": self.backend.node_id, "request_id": request_id},
+            )
+            return await asyncio.wait_for(reply, STATE_RPC_TIMEOUT)
+        finally:
+            self._replies.pop(request_id, None)
+
+    async def _reply(self, request: dict, result):
+        await self.backend.publish(
+            "assignment.reply",
+            {"to": request["origin"], "request_id": request["request_id"], "result": result},
+        )
+
+    async def _on_forwarded_response(self, message: dict):
+        if message["room_name"] not in self.pending_assignments:
+            return  # not ours
+
+        async def apply():
+            applied = await self.handle_invitation_response(
+                message["room_name"], message["agent_id"], message["accepted"], message["reason"]
+            )
+            await self._reply(message, applied)
+
+        # Don't hold up the pub/sub listener while the response is applied
+        spawn(apply(), f"Forwarded response for {message['room_name']}")
+
+    async def _on_forwarded_reply(self, message: dict):
+        reply = self._replies.get(message["request_id"])
+        if message["to"] == self.backend.node_id and reply is not None and not reply.done():
+            reply.set_result(message["result"])
+
+    async def pending_invitation(self, agent_id: int) -> Optional[Dict]:
+        """The invitation an agent is being rung with right now, if any.
 
+        Shaped like the call_invitation message, with timeout reduced to the
+        seconds left to answer. Asks the worker ringing the call when that
+        is not this one.
+        """
+        invitation = self._local_invitation(agent_id)
+        if invitation is not None:
+            return invitation
+        for room_name, owner in (await self.backend.hgetall(PENDING_ASSIGNMENTS)).items():
+            if (
+                owner["node"] != self.backend.node_id
+                and agent_id in owner.get("ringing_agents", ())
+                and self.nodes.is_alive(owner["node"])
+            ):
+                try:
+                    return await self._request(
+                        "assignment.invitation", {"node": owner["node"], "agent_id": agent_id}
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(f"No reply from the worker ringing {room_name}")
+        return None
+
+    def _local_invitation(self, agent_id: int) -> Optional[Dict]:
+        assignment = self.pending_assignments.get(self.ringing_agents.get(agent_id))
+        if (
+            assignment is None
+            or assignment["invitations"].get(agent_id) != InvitationState.RINGING
+            or agent_id not in assignment["invited_at"]
+        ):
+            return None
+        elapsed = time.monotonic() - assignment["invited_at"][agent_id]
+        return {
+            "room_name": assignment["room_name"],
+            "caller_id": assignment["caller_id"],
+            "call_id": assignment["db_call_id"],
+            "timestamp": datetime.utcnow().isoformat(),
+            "timeout": max(0, round(assignment["timeouts"][agent_id] - elapsed)),
+        }
+
+    async def _on_invitation_query(self, message: dict):
+        if message["node"] == self.backend.node_id:
+            await self._reply(message, self._local_invitation(message["agent_id"]))
+
+    def _release_agent(self, agent_id: int, room_name: str):
+        if self.ringing_agents.get(agent_id) == room_name:
+            del self.ringing_agents[agent_id]
+
+    def _clear_assignment(
+        self, room_name: str, reason: str, winner: Optional[int] = None
+    ) -> Optional[Dict]:
+        """Drop a pending assignment, its timers and revoke outstanding invitations"""
+        assignment = self.pending_assignments.pop(room_name, None)
+        if assignment is None:
+            return None
+        spawn(self.backend.hdel(PENDING_ASSIGNMENTS, room_name), f"Releasing claim on {room_name}")
+        if winner is None:
+            self._transition(assignment, AssignmentState.ENDED)
+
+        # Invitation timeouts are cancelled as each invitation is revoked
+        self.timers.cancel(("stagger", room_name))
+        for agent_id in list(assignment["ringing_agents"]):
+            if self._settle_invitation(assignment, agent_id, InvitationState.REVOKED):
+                spawn(
+                    self.manager.send_call_invitation_revoked(
+                        str(agent_id),
+                        {
+                            "room_name": room_name,
+                            "call_id": assignment["db_call_id"],
+                            "reason": reason,
+                        },
+                    ),
+                    f"Revoking invitation for agent {agent_id}",
+                )
+        return assignment
+
+    async def _finalize_assignment(self, assignment: Dict, agent_id: int):
+        """Finalize the assignment and clean up"""
+        room_name = assignment["room_name"]
+        try:
             # Update agent status to busy
-            db = next(get_db())
-            agent = db.query(Agent).filter(Agent.id == agent_id).first()
-            if agent:
-                agent.status = AgentStatus.BUSY.value
-                db.commit()
+            self.presence.set_status(
+                agent_id, AgentStatus.BUSY.value, current_call=room_name
+            )
+
+            if assignment.get("queued_at"):
+                await self.queue.mark_assigned(room_name, assignment["queued_at"])
+
+            # Several agents may have been invited; the call belongs to the winner
+            if assignment.get("db_call_id"):
+                async with session_scope() as db:
+                    db_call = await db.get(Call, assignment["db_call_id"])
+                    if db_call:
+                        db_call.agent_id = agent_id
 
             # Send final assignment notification
             assignment_data = {
@@ -251,9 +987,6 @@ class AutoAssignmentService:
                 str(agent_id), assignment_data
             )
 
-            # Clean up
-            del self.pending_assignments[room_name]
-
             logger.info(
                 f"Call assignment finalized for agent {agent_id}, room {room_name}"
             )
@@ -262,37 +995,75 @@ class AutoAssignmentService:
             logger.error(f"Error finalizing assignment for room {room_name}: {str(e)}")
 
     async def _handle_no_agents_available(self, room_name: str):
-        """Handle case when no agents are available"""
-        logger.warning(f"No agents available for room {room_name}, ending call")
+        """Nobody answered: put the call (back) in the waiting queue"""
+        assignment = self._clear_assignment(room_name, "no_agents")
+        if assignment is None:
+            return
 
+        logger.warning(f"No agent answered room {room_name}, returning it to the queue")
         try:
-            # End the LiveKit room
-            await LiveKitService.end_call(room_name)
-
-            # Update call status if exists
-            if room_name in self.pending_assignments:
-                assignment = self.pending_assignments[room_name]
-                if assignment.get("db_call_id"):
-                    db = next(get_db())
-                    db_call = (
-                        db.query(Call)
-                        .filter(Call.id == assignment["db_call_id"])
-                        .first()
+            if assignment.get("queued_at"):
+                # Keep its original place in line
+                await self.queue.requeue(
+                    QueueEntry(
+                        room_name,
+                        assignment["caller_id"],
+                        assignment["priority"],
+                        assignment["queued_at"],
+                        assignment["db_call_id"],
+                        assignment["queue_name"],
                     )
-                    if db_call:
-                        db_call.status = CallStatus.REJECTED.value
-                        db.commit()
-
-                del self.pending_assignments[room_name]
+                )
+            else:
+                await self._enqueue_call(
+                    room_name,
+                    assignment["caller_id"],
+                    assignment["priority"],
+                    assignment["queue_name"],
+                    assignment["db_call_id"],
+                )
+                if room_name not in self.queue:
+                    # Queue was full and the room has been ended
+                    await self._reject_call_record(assignment["db_call_id"])
 
         except Exception as e:
             logger.error(
                 f"Error handling no agents available for room {room_name}: {str(e)}"
             )
 
-    def _get_available_agents(self, db: Session) -> List[Agent]:
-        """Get list of available agents"""
-        return db.query(Agent).filter(Agent.status == AgentStatus.AVAILABLE.value).all()
+    async def _reject_call_record(self, call_id: Optional[int]):
+        """Close the call record of a call nobody answered"""
+        if not call_id:
+            return
+        try:
+            async with session_scope() as db:
+                db_call = await db.get(Call, call_id)
+                if db_call and db_call.status == CallStatus.IN_PROGRESS.value:
+                    db_call.status = CallStatus.REJECTED.value
+                    if db_call.start_time:
+                        db_call.duration = (datetime.utcnow() - db_call.start_time).total_seconds()
+        except Exception as e:
+            logger.error(f"Error closing call record {call_id}: {str(e)}")
+
+    def _get_available_agents(self) -> List[int]:
+        """The first wave of available, connected agents not already ringing, best first"""
+        return self.routing.rank(limit=self.wave_size, exclude=self.ringing_agents)
+
+    def _refill_candidates(self, assignment: Dict) -> bool:
+        """Rank the next wave of candidates once those ranked so far are used up.
+
+        Candidates are ranked one wave at a time, so ringing a call costs
+        O(k log n) for the k agents tried rather than a sort of every agent.
+        Returns False when no routable agent is left to try.
+        """
+        candidates = assignment["available_agents"]
+        if assignment["current_agent_index"] < len(candidates):
+            return True
+        more = self.routing.rank(
+            limit=self.wave_size, exclude=set(self.ringing_agents).union(candidates)
+        )
+        candidates.extend(more)
+        return bool(more)
 
     def _extract_caller_id(self, room_name: str) -> str:
         """Extract caller ID from room name if possible"""
@@ -305,9 +1076,9 @@ class AutoAssignmentService:
             pass
         return "Unknown"
 
-    def get_pending_assignments(self) -> Dict[str, Dict]:
-        """Get current pending assignments (for debugging/monitoring)"""
-        return self.pending_assignments.copy()
+    async def get_pending_assignments(self) -> Dict[str, Dict]:
+        """Get current pending assignments on every worker (for debugging/monitoring)"""
+        return await self.backend.hgetall(PENDING_ASSIGNMENTS)
 
 
 # Global instance
@@ -318,7 +1089,7 @@ def get_auto_assignment_service(connection_manager=None) -> AutoAssignmentServic
     """Get the global auto-assignment service instance"""
     global auto_assignment_service
     if auto_assignment_service is None:
-        if connection_manager is None:
-            raise ValueError("ConnectionManager must be provided on first call")
-        auto_assignment_service = AutoAssignmentService(connection_manager)
+        auto_assignment_service = AutoAssignmentService(
+            connection_manager or get_connection_manager()
+        )
     return auto_assignment_service
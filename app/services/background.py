@@ -0,0 +1,22 @@
+import asyncio
+from typing import Awaitable, Set
+
+from app.config import logger
+
+# The event loop keeps only weak references to tasks, so a task nobody holds
+# can be garbage-collected before it finishes: background tasks live here
+_tasks: Set[asyncio.Task] = set()
+
+
+def spawn(coro: Awaitable, what: str) -> asyncio.Task:
+    """Run a coroutine without waiting for it; a failure is logged, not lost"""
+    task = asyncio.ensure_future(coro)
+    _tasks.add(task)
+    task.add_done_callback(lambda done: _finished(done, what))
+    return task
+
+
+def _finished(task: asyncio.Task, what: str):
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"{what} failed: {task.exception()!r}")
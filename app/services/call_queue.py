@@ -0,0 +1,255 @@
+import heapq
+import itertools
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.database.db import session_scope
+from app.models.models import QueuedCall, QueuedCallStatus
+from app.services.metrics import metrics
+from app.config import CALL_QUEUE_MAX_SIZE, CALL_QUEUE_EWMA_ALPHA, logger
+
+
+@dataclass
+class QueueEntry:
+    room_name: str
+    caller_id: str
+    priority: int = 0
+    enqueued_at: float = 0.0  # epoch seconds
+    call_id: Optional[int] = None  # call record from an earlier ring attempt
+    queue_name: str = "default"
+
+
+class CallQueue:
+    """Waiting inbound calls: highest priority first, FIFO within a priority.
+
+    Entries live in a heap (stale entries are skipped lazily) and every
+    waiting call also has a row in the call_queue table, so the queue is
+    restored after a restart.
+    """
+
+    def __init__(self, max_size: int = CALL_QUEUE_MAX_SIZE):
+        self.max_size = max_size
+        self.entries: Dict[str, QueueEntry] = {}
+        self._heap: List[Tuple[int, float, int, str]] = []
+        self._seq = itertools.count()
+        # Smoothed seconds between calls leaving the queue, and waited per call
+        self.dequeue_interval: Optional[float] = None
+        self.average_wait: Optional[float] = None
+        self._last_dequeue: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, room_name: str) -> bool:
+        return room_name in self.entries
+
+    async def load(self, skip: Iterable[str] = ()):
+        """Restore waiting calls from the call_queue table.
+
+        Called when this worker becomes the assignment leader. Calls already
+        queued here, and rooms in skip (e.g. ringing right now), are left alone.
+        """
+        skip = set(skip)
+        async with session_scope() as db:
+            rows = (
+                await db.scalars(
+                    select(QueuedCall).where(
+                        QueuedCall.status == QueuedCallStatus.WAITING.value
+                    )
+                )
+            ).all()
+        for row in rows:
+            if row.room_name in skip or row.room_name in self.entries:
+                continue
+            # enqueued_at is stored as naive UTC, like the rest of the schema
+            enqueued_at = (row.enqueued_at or datetime.utcnow()).replace(
+                tzinfo=timezone.utc
+            ).timestamp()
+            self._push(
+                QueueEntry(
+                    row.room_name,
+                    row.caller_id,
+                    row.priority or 0,
+                    enqueued_at,
+                    row.call_id,
+                    row.queue_name or "default",
+                )
+            )
+        self._update_gauges()
+        logger.info(f"Call queue restored with {len(self.entries)} waiting calls")
+
+    async def enqueue(
+        self,
+        room_name: str,
+        caller_id: str,
+        priority: int = 0,
+        queue_name: str = "default",
+        call_id: Optional[int] = None,
+    ) -> Optional[int]:
+        """Add a call to the queue; returns its position, or None if the queue is full"""
+        if room_name in self.entries:
+            return self.position(room_name)
+        if len(self.entries) >= self.max_size:
+            metrics.inc("queue.rejected_full")
+            return None
+
+        entry = QueueEntry(room_name, caller_id, priority, time.time(), call_id, queue_name)
+        async with session_scope() as db:
+            row = await db.scalar(select(QueuedCall).where(QueuedCall.room_name == room_name))
+            if row is None:
+                row = QueuedCall(room_name=room_name)
+                db.add(row)
+            row.caller_id = caller_id
+            row.priority = priority
+            row.queue_name = queue_name
+            row.enqueued_at = datetime.utcfromtimestamp(entry.enqueued_at)
+            row.status = QueuedCallStatus.WAITING.value
+            row.assigned_at = None
+            row.call_id = call_id
+
+        self._push(entry)
+        metrics.inc("queue.enqueued")
+        self._update_gauges()
+        logger.info(f"Queued inbound call {room_name} ({queue_name}, priority {priority})")
+        return self.position(room_name)
+
+    async def requeue(self, entry: QueueEntry):
+        """Put a call back in its original place (nobody answered its ring)"""
+        if entry.room_name in self.entries:
+            return
+        self._push(entry)
+        self._update_gauges()
+        if entry.call_id is not None:
+            # The next ring reuses the call record, after a restart too
+            await self._update(entry.room_name, call_id=entry.call_id)
+
+    def pop(self) -> Optional[QueueEntry]:
+        """Take the next call to ring; its row stays Waiting until it is answered"""
+        while self._heap:
+            neg_priority, enqueued_at, _, room_name = heapq.heappop(self._heap)
+            entry = self.entries.get(room_name)
+            if entry is None or self._key(entry) != (neg_priority, enqueued_at):
+                continue  # removed (or re-queued) since this entry was pushed
+            del self.entries[room_name]
+
+            now = time.time()
+            if self._last_dequeue is not None:
+                self.dequeue_interval = self._ewma(
+                    self.dequeue_interval, now - self._last_dequeue
+                )
+            self._last_dequeue = now
+            self._update_gauges()
+            return entry
+        return None
+
+    def clear(self):
+        """Forget every waiting call in memory; their rows stay Waiting"""
+        self.entries.clear()
+        self._heap.clear()
+        self._update_gauges()
+
+    def remove(self, room_name: str) -> Optional[QueueEntry]:
+        entry = self.entries.pop(room_name, None)
+        if entry is not None:
+            self._update_gauges()
+        return entry
+
+    async def mark_assigned(self, room_name: str, enqueued_at: float):
+        """Record that a queued call was answered"""
+        waited = time.time() - enqueued_at
+        self.average_wait = self._ewma(self.average_wait, waited)
+        metrics.observe("queue.wait_s", waited)
+        await self._update(
+            room_name, status=QueuedCallStatus.ASSIGNED.value, assigned_at=datetime.utcnow()
+        )
+
+    async def mark_abandoned(self, room_name: str):
+        """Caller hung up (or the room vanished) while waiting"""
+        self.remove(room_name)
+        metrics.inc("queue.abandoned")
+        await self._update(room_name, status=QueuedCallStatus.ABANDONED.value)
+
+    def position(self, room_name: str) -> Optional[int]:
+        """1-based queue position"""
+        if room_name not in self.entries:
+            return None
+        key = self._key(self.entries[room_name])
+        return 1 + sum(1 for entry in self.entries.values() if self._key(entry) < key)
+
+    def estimated_wait(self, position: int) -> Optional[float]:
+        """Seconds until a call at this position is expected to be rung"""
+        if self.dequeue_interval is not None:
+            return position * self.dequeue_interval
+        return self.average_wait
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        ordered = sorted(self.entries.values(), key=self._key)
+        return {
+            "depth": len(ordered),
+            "average_wait": self.average_wait,
+            "calls": [
+                {
+                    "room_name": entry.room_name,
+                    "caller_id": entry.caller_id,
+                    "queue": entry.queue_name,
+                    "priority": entry.priority,
+                    "position": position,
+                    "waiting_for": now - entry.enqueued_at,
+                    "estimated_wait": self.estimated_wait(position),
+                }
+                for position, entry in enumerate(ordered, start=1)
+            ],
+        }
+
+    @staticmethod
+    def _key(entry: QueueEntry) -> Tuple[int, float]:
+        return (-entry.priority, entry.enqueued_at)
+
+    def _push(self, entry: QueueEntry):
+        self.entries[entry.room_name] = entry
+        heapq.heappush(
+            self._heap, (*self._key(entry), next(self._seq), entry.room_name)
+        )
+        if len(self._heap) > 4 * len(self.entries) + 64:
+            self._heap = [
+                (*self._key(queued), next(self._seq), queued.room_name)
+                for queued in self.entries.values()
+            ]
+            heapq.heapify(self._heap)
+
+    @staticmethod
+    def _ewma(current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        return CALL_QUEUE_EWMA_ALPHA * sample + (1 - CALL_QUEUE_EWMA_ALPHA) * current
+
+    def _update_gauges(self):
+        metrics.set_gauge("queue.depth", len(self.entries))
+        oldest = min((entry.enqueued_at for entry in self.entries.values()), default=None)
+        metrics.set_gauge("queue.oldest_wait_s", time.time() - oldest if oldest else 0.0)
+
+    async def _update(self, room_name: str, **fields):
+        try:
+            async with session_scope() as db:
+                row = await db.scalar(
+                    select(QueuedCall).where(QueuedCall.room_name == room_name)
+                )
+                if row is not None:
+                    for name, value in fields.items():
+                        setattr(row, name, value)
+        except Exception as e:
+            logger.error(f"Error updating queued call {room_name}: {str(e)}")
+
+
+# Global instance
+call_queue = CallQueue()
+
+
+def get_call_queue() -> CallQueue:
+    """Get the global inbound call queue"""
+    return call_queue
@@ -0,0 +1,129 @@
+import asyncio
+import contextlib
+import time
+from typing import Awaitable, Callable, Optional
+
+from app.services.metrics import metrics
+from app.services.state_backend import StateBackend, get_state_backend
+from app.config import LEADER_LEASE_TTL, logger
+
+Callback = Callable[[], Awaitable[None]]
+
+
+class LeaderElection:
+    """Lease-based leader election over the shared state backend.
+
+    Every worker campaigns for the same lease; the one holding it is the
+    leader and renews it every ttl/3 seconds. A leader that shuts down
+    releases the lease and tells the others, so one of them takes over at
+    once; one that dies stops renewing and is replaced when the lease
+    expires. A leader that cannot reach the backend steps down before its
+    lease can expire, so two workers never lead at the same time.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        backend: Optional[StateBackend] = None,
+        ttl: float = LEADER_LEASE_TTL,
+        on_elected: Optional[Callback] = None,
+        on_demoted: Optional[Callback] = None,
+    ):
+        self.name = name
+        self.backend = backend if backend is not None else get_state_backend()
+        self.ttl = ttl
+        self.renew_interval = ttl / 3
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.is_leader = False
+        # Node id of the leader as last seen by this worker (None: no leader)
+        self.leader: Optional[str] = None
+        # Monotonic time until which the lease we last got is certainly ours
+        self._valid_until = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.backend.subscribe(self._channel, self._on_released)
+
+    @property
+    def _channel(self) -> str:
+        return f"leader.{self.name}"
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start campaigning in the background (no-op if already running)"""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop campaigning and hand the lease over if this worker holds it"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        if not self.is_leader:
+            return
+        await self._set_leader(False)
+        try:
+            await self.backend.release_lease(self.name)
+            await self.backend.publish(
+                self._channel, {"origin": self.backend.node_id, "event": "released"}
+            )
+        except Exception as e:
+            logger.error(f"Could not release leader lease {self.name}: {str(e)}")
+        self.leader = None
+        self._report()
+
+    async def campaign(self) -> bool:
+        """Take or renew the lease once; returns whether this worker leads"""
+        started = time.monotonic()
+        try:
+            held = await self.backend.acquire_lease(self.name, self.ttl)
+            self.leader = (
+                self.backend.node_id if held else await self.backend.lease_holder(self.name)
+            )
+        except Exception as e:
+            logger.error(f"Leader lease {self.name} renewal failed: {str(e)}")
+            # Keep leading only if the lease cannot lapse before the next attempt
+            held = self.is_leader and started + self.renew_interval < self._valid_until
+        else:
+            if held:
+                # Counted from before the request: the backend's clock started later
+                self._valid_until = started + self.ttl
+
+        if held != self.is_leader:
+            await self._set_leader(held)
+        self._report()
+        return self.is_leader
+
+    async def _run(self):
+        while True:
+            await self.campaign()
+            await asyncio.sleep(self.renew_interval)
+
+    async def _on_released(self, message: dict):
+        # The leader stepped down: campaign now rather than on the next tick
+        if message["origin"] != self.backend.node_id and self.running:
+            await self.campaign()
+
+    async def _set_leader(self, is_leader: bool):
+        self.is_leader = is_leader
+        if is_leader:
+            metrics.inc(f"leader.{self.name}.elections")
+            logger.info(f"Node {self.backend.node_id} is now leader for {self.name}")
+            callback = self.on_elected
+        else:
+            metrics.inc(f"leader.{self.name}.demotions")
+            logger.warning(f"Node {self.backend.node_id} is no longer leader for {self.name}")
+            callback = self.on_demoted
+        if callback is not None:
+            try:
+                await callback()
+            except Exception as e:
+                logger.error(f"Leader {self.name} callback failed: {str(e)}")
+
+    def _report(self):
+        metrics.set_gauge(f"leader.{self.name}.is_leader", int(self.is_leader))
+        metrics.set_info(f"leader.{self.name}", self.leader or "")
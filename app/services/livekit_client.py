@@ -0,0 +1,121 @@
+import asyncio
+import random
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import aiohttp
+from livekit import api
+from livekit.api.twirp_client import TwirpError, TwirpErrorCode
+
+from app.config import (
+    LIVEKIT_API_KEY,
+    LIVEKIT_API_SECRET,
+    LIVEKIT_URL,
+    LIVEKIT_HTTP_POOL_SIZE,
+    LIVEKIT_HTTP_KEEPALIVE,
+    LIVEKIT_HTTP_TIMEOUT,
+    LIVEKIT_HTTP_RETRIES,
+    LIVEKIT_HTTP_RETRY_BACKOFF,
+    logger,
+)
+
+T = TypeVar("T")
+
+# Twirp error codes worth retrying; everything else is the caller's problem
+TRANSIENT_TWIRP_CODES = {
+    TwirpErrorCode.UNAVAILABLE,
+    TwirpErrorCode.INTERNAL,
+    TwirpErrorCode.DEADLINE_EXCEEDED,
+    TwirpErrorCode.RESOURCE_EXHAUSTED,
+    TwirpErrorCode.ABORTED,
+}
+
+
+class LiveKitClientPool:
+    """Application-lifetime LiveKit API client over one keep-alive HTTP session"""
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._api: Optional[api.LiveKitAPI] = None
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """Open the shared HTTP session (called from the app lifespan)"""
+        async with self._lock:
+            if self._api is not None:
+                return
+            connector = aiohttp.TCPConnector(
+                limit=LIVEKIT_HTTP_POOL_SIZE,
+                keepalive_timeout=LIVEKIT_HTTP_KEEPALIVE,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=LIVEKIT_HTTP_TIMEOUT),
+            )
+            self._api = api.LiveKitAPI(
+                url=LIVEKIT_URL,
+                api_key=LIVEKIT_API_KEY,
+                api_secret=LIVEKIT_API_SECRET,
+                session=self._session,
+            )
+            logger.info(
+                f"LiveKit client pool started (pool size {LIVEKIT_HTTP_POOL_SIZE})"
+            )
+
+    async def aclose(self):
+        """Close the shared HTTP session"""
+        async with self._lock:
+            if self._api is not None:
+                await self._api.aclose()
+            if self._session is not None:
+                await self._session.close()
+            self._api = None
+            self._session = None
+
+    async def get_api(self) -> api.LiveKitAPI:
+        """Get the shared client, starting it lazily outside the lifespan (scripts)"""
+        if self._api is None:
+            await self.start()
+        return self._api
+
+    async def call(
+        self,
+        operation: Callable[[api.LiveKitAPI], Awaitable[T]],
+        retry: bool = True,
+    ) -> T:
+        """Run one LiveKit request with a timeout, retrying transient failures.
+
+        Pass retry=False for requests that must not be repeated blindly
+        (e.g. dialing a SIP participant).
+        """
+        livekit_api = await self.get_api()
+        attempts = LIVEKIT_HTTP_RETRIES + 1 if retry else 1
+
+        for attempt in range(attempts):
+            try:
+                return await asyncio.wait_for(
+                    operation(livekit_api), timeout=LIVEKIT_HTTP_TIMEOUT
+                )
+            except TwirpError as e:
+                if e.code not in TRANSIENT_TWIRP_CODES or attempt == attempts - 1:
+                    raise
+                error = e
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == attempts - 1:
+                    raise
+                error = e
+
+            # Full jitter keeps a burst of failing callers from retrying in lockstep
+            delay = random.uniform(0, LIVEKIT_HTTP_RETRY_BACKOFF * (2 ** attempt))
+            logger.warning(
+                f"Transient LiveKit error ({error!r}), retry {attempt + 1} in {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+
+
+# Global instance
+livekit_pool = LiveKitClientPool()
+
+
+def get_livekit_pool() -> LiveKitClientPool:
+    """Get the global LiveKit client pool"""
+    return livekit_pool
@@ -0,0 +1,87 @@
+import threading
+from collections import deque
+from typing import Deque, Dict
+
+
+class _Summary:
+    """Running count/sum/max plus a window of recent samples for percentiles"""
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def snapshot(self) -> dict:
+        recent = sorted(self.recent)
+
+        def percentile(p: float) -> float:
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(p * len(recent)))]
+
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+        }
+
+
+class Metrics:
+    """Minimal in-process metrics registry (counters, gauges, summaries, info).
+
+    Thread-safe because some producers (e.g. the sync DB pool) run outside
+    the event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self.summaries: Dict[str, _Summary] = {}
+        # String-valued facts, e.g. which node leads the cluster
+        self.info: Dict[str, str] = {}
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def set_info(self, name: str, value: str):
+        with self._lock:
+            self.info[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            summary = self.summaries.get(name)
+            if summary is None:
+                summary = self.summaries[name] = _Summary()
+            summary.observe(value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "summaries": {
+                    name: summary.snapshot()
+                    for name, summary in self.summaries.items()
+                },
+                "info": dict(self.info),
+            }
+
+
+# Global instance
+metrics = Metrics()
@@ -0,0 +1,140 @@
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from app.services.metrics import metrics
+from app.services.background import spawn
+from app.services.state_backend import StateBackend, get_state_backend
+from app.config import NODE_HEARTBEAT_INTERVAL, NODE_TTL, logger
+
+# Shared: node_id -> {"seen": epoch seconds of its last heartbeat, "beat": id of
+# that heartbeat, "started_at": ...}
+NODES = "nodes"
+
+NodeListener = Callable[[str], Awaitable[None]]
+
+
+class NodeRegistry:
+    """Which workers are alive, from heartbeats in the shared state backend.
+
+    Each worker refreshes its entry every NODE_HEARTBEAT_INTERVAL seconds
+    and checks everyone else's. A worker silent for NODE_TTL seconds is
+    declared lost by the first worker to remove its entry, and every worker
+    then runs its listeners to clean up what it left behind (sockets
+    registered to it, calls it was ringing). A worker that finds it was
+    declared lost (e.g. after a long stall) runs its rejoin listeners, since
+    the others already cleaned up after it. Heartbeats use wall-clock time,
+    so hosts need NTP.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[StateBackend] = None,
+        interval: float = NODE_HEARTBEAT_INTERVAL,
+        ttl: float = NODE_TTL,
+    ):
+        self.backend = backend if backend is not None else get_state_backend()
+        self.interval = interval
+        self.ttl = ttl
+        self.started_at = time.time()
+        # node_id -> last heartbeat, as of this worker's last check
+        self.nodes: Dict[str, float] = {}
+        # Declared lost and not heard from since
+        self.lost: Set[str] = set()
+        self._registered = False
+        self._lost_listeners: List[NodeListener] = []
+        self._rejoin_listeners: List[NodeListener] = []
+        self.backend.subscribe("nodes.lost", self._on_lost)
+
+    def add_listener(
+        self,
+        on_lost: Optional[NodeListener] = None,
+        on_rejoin: Optional[NodeListener] = None,
+    ):
+        """Register async listeners(node_id) for another worker being declared
+        lost, and for this worker rejoining after it was"""
+        if on_lost is not None:
+            self._lost_listeners.append(on_lost)
+        if on_rejoin is not None:
+            self._rejoin_listeners.append(on_rejoin)
+
+    def is_alive(self, node_id: str) -> bool:
+        """False for a worker that has gone silent; one not seen yet counts as alive"""
+        if node_id == self.backend.node_id:
+            return True
+        if node_id in self.lost:
+            return False
+        seen = self.nodes.get(node_id)
+        return seen is None or time.time() - seen < self.ttl
+
+    async def heartbeat(self):
+        if self._registered and await self.backend.hget(NODES, self.backend.node_id) is None:
+            logger.warning(f"Node {self.backend.node_id} was declared lost, rejoining")
+            metrics.inc("nodes.rejoined")
+            await self._notify(self._rejoin_listeners, self.backend.node_id)
+        self._registered = True
+        await self.backend.hset(
+            NODES,
+            self.backend.node_id,
+            {"seen": time.time(), "beat": uuid.uuid4().hex, "started_at": self.started_at},
+        )
+
+    async def check(self):
+        """Refresh the view of live workers and reap the ones that went silent"""
+        now = time.time()
+        entries = await self.backend.hgetall(NODES)
+        self.nodes = {node_id: entry["seen"] for node_id, entry in entries.items()}
+        # A lost worker that heartbeats again has rejoined
+        self.lost -= {node_id for node_id, seen in self.nodes.items() if now - seen < self.ttl}
+        for node_id, entry in entries.items():
+            seen = entry["seen"]
+            if node_id == self.backend.node_id or now - seen < self.ttl:
+                continue
+            # Only the worker that removes the entry announces the loss; a
+            # heartbeat that just came in changes "beat" and keeps the node alive
+            if await self.backend.hdel_if(NODES, node_id, "beat", entry["beat"]):
+                logger.warning(f"Node {node_id} missed heartbeats for {now - seen:.1f}s, reaping it")
+                metrics.inc("nodes.lost")
+                await self.backend.publish(
+                    "nodes.lost", {"origin": self.backend.node_id, "node_id": node_id}
+                )
+        metrics.set_gauge("nodes.alive", len(self.nodes))
+
+    async def _on_lost(self, message: dict):
+        node_id = message["node_id"]
+        if node_id == self.backend.node_id:
+            return  # noticed by our own next heartbeat
+        self.lost.add(node_id)
+        self.nodes.pop(node_id, None)
+        # Don't hold up the pub/sub listener while listeners clean up
+        spawn(self._notify(self._lost_listeners, node_id), f"Handling lost node {node_id}")
+
+    async def _notify(self, listeners: List[NodeListener], node_id: str):
+        for listener in listeners:
+            try:
+                await listener(node_id)
+            except Exception as e:
+                logger.error(f"Node listener failed for {node_id}: {str(e)}")
+
+    async def run(self):
+        while True:
+            try:
+                await self.heartbeat()
+                await self.check()
+            except Exception as e:
+                logger.error(f"Node heartbeat failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def leave(self):
+        """Remove this worker's entry on a clean shutdown"""
+        await self.backend.hdel(NODES, self.backend.node_id)
+
+
+# Global instance
+node_registry = NodeRegistry()
+
+
+def get_node_registry() -> NodeRegistry:
+    """Get the global node registry"""
+    return node_registry
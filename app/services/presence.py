@@ -0,0 +1,220 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set
+
+from sqlalchemy import select, update
+
+from app.database.db import session_scope
+from app.models.models import Agent, AgentStatus
+from app.services.metrics import metrics
+from app.services.background import spawn
+from app.config import PRESENCE_FLUSH_INTERVAL, logger
+
+
+@dataclass
+class AgentPresence:
+    """Live routing state for one agent"""
+
+    agent_id: int
+    status: str = AgentStatus.OFFLINE.value
+    connected: bool = False
+    last_activity: float = field(default_factory=time.time)
+    # Last frame (message or pong) received on the agent's socket
+    last_seen: float = field(default_factory=time.time)
+    # Socket open but not answering pings (e.g. a laptop gone to sleep)
+    stale: bool = False
+    current_call: Optional[str] = None
+
+    @property
+    def routable(self) -> bool:
+        """Available and reachable over a responsive WebSocket (invitations need one)"""
+        return (
+            self.status == AgentStatus.AVAILABLE.value
+            and self.connected
+            and not self.stale
+        )
+
+
+class PresenceIndex:
+    """In-process source of truth for agent status, used on the ring path.
+
+    Routing reads only from memory. Status changes are marked dirty and
+    persisted to the agents table in batches by a write-behind task.
+    """
+
+    def __init__(self):
+        self.agents: Dict[int, AgentPresence] = {}
+        # Routable agents in the order they became routable (dict = ordered set)
+        self._routable: Dict[int, None] = {}
+        self._dirty: Set[int] = set()
+        self._listeners: List[Callable[[AgentPresence, str], None]] = []
+        self._backend = None  # set by replicate()
+        self._applying_remote = False
+
+    async def load(self):
+        """Seed the index from the agents table (called at startup)"""
+        async with session_scope() as db:
+            rows = (await db.execute(select(Agent.id, Agent.status))).all()
+        for agent_id, status in rows:
+            self.agents[agent_id] = AgentPresence(
+                agent_id=agent_id, status=status or AgentStatus.OFFLINE.value
+            )
+        logger.info(f"Presence index loaded with {len(self.agents)} agents")
+
+    def add_listener(self, listener: Callable[[AgentPresence, str], None]):
+        """Register a callback invoked as listener(presence, old_status) on changes"""
+        self._listeners.append(listener)
+
+    def get(self, agent_id: int) -> AgentPresence:
+        presence = self.agents.get(agent_id)
+        if presence is None:
+            presence = self.agents[agent_id] = AgentPresence(agent_id=agent_id)
+        return presence
+
+    def status_of(self, agent_id: int) -> Optional[str]:
+        presence = self.agents.get(agent_id)
+        return presence.status if presence else None
+
+    def set_status(
+        self,
+        agent_id: int,
+        status: str,
+        current_call: Optional[str] = None,
+    ):
+        """Change an agent's status (persisted by the write-behind task)"""
+        status = AgentStatus(status).value
+        presence = self.get(agent_id)
+        old_status = presence.status
+        presence.status = status
+        presence.current_call = current_call if status == AgentStatus.BUSY.value else None
+        presence.last_activity = time.time()
+        if old_status != status:
+            self._dirty.add(agent_id)
+        self._changed(presence, old_status)
+
+    def set_connected(self, agent_id: int, connected: bool):
+        presence = self.get(agent_id)
+        presence.connected = connected
+        presence.stale = False
+        presence.last_activity = presence.last_seen = time.time()
+        self._changed(presence, presence.status)
+
+    def set_stale(self, agent_id: int, stale: bool):
+        """Mark an agent whose socket stopped answering pings; routing skips them"""
+        presence = self.get(agent_id)
+        if presence.stale != stale:
+            presence.stale = stale
+            self._changed(presence, presence.status)
+
+    def replicate(self, backend):
+        """Keep this index in step with the other workers' over the state backend.
+
+        Each worker persists only its own changes; replicated ones are
+        applied in memory and not flushed again.
+        """
+        self._backend = backend
+        backend.subscribe("presence", self._on_remote_change)
+
+    async def _on_remote_change(self, message: dict):
+        if message["origin"] == self._backend.node_id:
+            return
+        presence = self.get(message["agent_id"])
+        old_status = presence.status
+        presence.status = message["status"]
+        presence.connected = message["connected"]
+        presence.stale = message.get("stale", False)
+        presence.last_seen = message.get("last_seen", presence.last_seen)
+        presence.current_call = message.get("current_call")
+        presence.last_activity = time.time()
+        self._applying_remote = True
+        try:
+            self._changed(presence, old_status)
+        finally:
+            self._applying_remote = False
+
+    def _publish(self, presence: AgentPresence):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no event loop (offline scripts)
+        spawn(
+            self._backend.publish(
+                "presence",
+                {
+                    "origin": self._backend.node_id,
+                    "agent_id": presence.agent_id,
+                    "status": presence.status,
+                    "connected": presence.connected,
+                    "stale": presence.stale,
+                    "last_seen": presence.last_seen,
+                    "current_call": presence.current_call,
+                },
+            ),
+            f"Publishing presence of agent {presence.agent_id}",
+        )
+
+    def touch(self, agent_id: int):
+        """Record a frame from the agent's socket; a stale agent is live again"""
+        presence = self.get(agent_id)
+        presence.last_activity = presence.last_seen = time.time()
+        if presence.stale:
+            self.set_stale(agent_id, False)
+
+    def routable_agents(self) -> List[int]:
+        """Routable agent ids, longest-routable first"""
+        return list(self._routable)
+
+    def is_routable(self, agent_id: int) -> bool:
+        return agent_id in self._routable
+
+    def _changed(self, presence: AgentPresence, old_status: str):
+        if presence.routable:
+            self._routable.setdefault(presence.agent_id, None)
+        else:
+            self._routable.pop(presence.agent_id, None)
+        metrics.set_gauge("presence.routable", len(self._routable))
+        if self._backend is not None and not self._applying_remote:
+            self._publish(presence)
+
+        for listener in self._listeners:
+            try:
+                listener(presence, old_status)
+            except Exception as e:
+                logger.error(f"Presence listener failed: {str(e)}")
+
+    async def flush(self):
+        """Persist dirty statuses to the agents table in one transaction"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+
+        by_status: Dict[str, List[int]] = {}
+        for agent_id in dirty:
+            by_status.setdefault(self.agents[agent_id].status, []).append(agent_id)
+
+        try:
+            async with session_scope() as db:
+                for status, agent_ids in by_status.items():
+                    await db.execute(
+                        update(Agent).where(Agent.id.in_(agent_ids)).values(status=status)
+                    )
+            metrics.inc("presence.flushed", len(dirty))
+        except Exception as e:
+            # Keep them dirty so the next flush retries
+            self._dirty |= dirty
+            logger.error(f"Presence write-behind failed: {str(e)}")
+
+    async def run_write_behind(self, interval: float = PRESENCE_FLUSH_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+
+# Global instance
+presence_index = PresenceIndex()
+
+
+def get_presence_index() -> PresenceIndex:
+    """Get the global presence index"""
+    return presence_index
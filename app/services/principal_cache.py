@@ -0,0 +1,100 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+from app.models.models import Agent
+from app.services.metrics import metrics
+from app.config import AUTH_CACHE_TTL, AUTH_CACHE_MAX_SIZE
+
+
+@dataclass
+class AgentPrincipal:
+    """Lightweight, detached view of the authenticated agent.
+
+    ``status`` is the agent's status when the token was last looked up and
+    is not kept current: status changes go through the presence index (and
+    its write-behind), so read the live value with ``presence_index.status_of``.
+    """
+
+    id: int
+    username: str
+    full_name: str
+    status: str
+    livekit_identity: str
+
+    @classmethod
+    def from_agent(cls, agent: Agent) -> "AgentPrincipal":
+        return cls(
+            id=agent.id,
+            username=agent.username,
+            full_name=agent.full_name,
+            status=agent.status,
+            livekit_identity=agent.livekit_identity,
+        )
+
+
+class PrincipalCache:
+    """Short-TTL, size-bounded (LRU) cache of bearer token -> AgentPrincipal.
+
+    An agent's entries are dropped on logout and when their username is
+    registered again. A status change does not drop them: status lives in
+    the presence index, which is where it is read from.
+    """
+
+    def __init__(self, ttl: float = AUTH_CACHE_TTL, max_size: int = AUTH_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, AgentPrincipal]]" = OrderedDict()
+        self._tokens_by_username: Dict[str, Set[str]] = {}
+
+    def get(self, token: str) -> Optional[AgentPrincipal]:
+        entry = self._entries.get(token)
+        if entry is None:
+            metrics.inc("auth.principal_cache.miss")
+            return None
+
+        expires_at, principal = entry
+        if expires_at <= time.monotonic():
+            self.invalidate_token(token)
+            metrics.inc("auth.principal_cache.miss")
+            return None
+
+        self._entries.move_to_end(token)
+        metrics.inc("auth.principal_cache.hit")
+        return principal
+
+    def put(self, token: str, principal: AgentPrincipal, token_exp: Optional[float] = None):
+        """Cache a principal; never beyond the token's own expiry (unix seconds)"""
+        ttl = self.ttl
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0:
+            return
+
+        self.invalidate_token(token)
+        self._entries[token] = (time.monotonic() + ttl, principal)
+        self._tokens_by_username.setdefault(principal.username, set()).add(token)
+
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self.invalidate_token(oldest)
+
+    def invalidate_token(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        username = entry[1].username
+        tokens = self._tokens_by_username.get(username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_username[username]
+
+    def invalidate_username(self, username: str):
+        for token in list(self._tokens_by_username.get(username, ())):
+            self.invalidate_token(token)
+
+
+# Global instance
+principal_cache = PrincipalCache()
@@ -0,0 +1,196 @@
+import abc
+import heapq
+import itertools
+import time
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.models.models import AgentStatus
+from app.services.presence import AgentPresence, PresenceIndex, get_presence_index
+from app.config import ROUTING_STRATEGY, logger
+
+
+class RoutingStrategy(abc.ABC):
+    """Orders routable agents with a heap keyed by the strategy's sort key.
+
+    The strategy follows the presence index: agents enter the heap when they
+    become routable and leave when they stop being routable. Keys change when
+    a call starts or ends (Busy transitions, e.g. from handle_call_ended and
+    hangup_call), so stale heap entries are skipped lazily instead of being
+    removed in place.
+    """
+
+    name = "base"
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        # agent_id -> key of its live heap entry (only routable agents)
+        self._keys: Dict[int, Tuple] = {}
+        self._heap: List[Tuple[Tuple, int]] = []
+        self.idle_since: Dict[int, float] = {}
+        self.calls_today: Dict[int, int] = {}
+        self.last_assigned: Dict[int, int] = {}
+        self.weights: Dict[int, float] = {}
+        self._assignments = itertools.count(1)
+        self._day = date.today()
+
+    @abc.abstractmethod
+    def key(self, agent_id: int) -> Tuple:
+        """Sort key for an agent; the smallest key is routed to first"""
+
+    def on_presence_change(self, presence: AgentPresence, old_status: str):
+        """PresenceIndex listener keeping the heap in step with agent state"""
+        agent_id = presence.agent_id
+        now = self.clock()
+
+        if presence.status != old_status:
+            if presence.status == AgentStatus.BUSY.value:
+                self.call_started(agent_id)
+            elif presence.status == AgentStatus.AVAILABLE.value:
+                # Idle time starts when a call ends or the agent comes back
+                self.idle_since[agent_id] = now
+
+        if presence.routable:
+            self.idle_since.setdefault(agent_id, now)
+            if agent_id not in self._keys:
+                self._push(agent_id)
+        else:
+            self._keys.pop(agent_id, None)
+
+    def call_started(self, agent_id: int):
+        self._roll_day()
+        self.calls_today[agent_id] = self.calls_today.get(agent_id, 0) + 1
+        self.last_assigned[agent_id] = next(self._assignments)
+
+    def set_weight(self, agent_id: int, weight: float):
+        self.weights[agent_id] = max(weight, 0.01)
+        if agent_id in self._keys:
+            self._push(agent_id)
+
+    def select(self, exclude: Iterable[int] = ()) -> Optional[int]:
+        ranked = self.rank(limit=1, exclude=exclude)
+        return ranked[0] if ranked else None
+
+    def rank(self, limit: Optional[int] = None, exclude: Iterable[int] = ()) -> List[int]:
+        """Best routable agents first; O(k log n) for the top k"""
+        self._roll_day()
+        excluded: Set[int] = set(exclude)
+        limit = len(self._keys) if limit is None else limit
+
+        ranked: List[int] = []
+        popped: List[Tuple[Tuple, int]] = []
+        seen: Set[int] = set()
+        while self._heap and len(ranked) < limit:
+            entry = heapq.heappop(self._heap)
+            key, agent_id = entry
+            if self._keys.get(agent_id) != key or agent_id in seen:
+                continue  # stale or duplicate entry: drop it for good
+            seen.add(agent_id)
+            popped.append(entry)
+            if agent_id not in excluded:
+                ranked.append(agent_id)
+
+        for entry in popped:
+            heapq.heappush(self._heap, entry)
+        return ranked
+
+    def _push(self, agent_id: int):
+        key = self.key(agent_id)
+        self._keys[agent_id] = key
+        heapq.heappush(self._heap, (key, agent_id))
+        if len(self._heap) > 4 * len(self._keys) + 64:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._heap = [(key, agent_id) for agent_id, key in self._keys.items()]
+        heapq.heapify(self._heap)
+
+    def _roll_day(self):
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self.calls_today.clear()
+            for agent_id in self._keys:
+                self._keys[agent_id] = self.key(agent_id)
+            self._rebuild()
+
+
+class LongestIdleStrategy(RoutingStrategy):
+    """Agent who has been waiting longest since their last call"""
+
+    name = "longest_idle"
+
+    def key(self, agent_id: int) -> Tuple:
+        return (self.idle_since.get(agent_id, 0.0), agent_id)
+
+
+class LeastCallsStrategy(RoutingStrategy):
+    """Agent with the fewest calls today, longest idle breaking ties"""
+
+    name = "least_calls"
+
+    def key(self, agent_id: int) -> Tuple:
+        return (self.calls_today.get(agent_id, 0), self.idle_since.get(agent_id, 0.0), agent_id)
+
+
+class RoundRobinStrategy(RoutingStrategy):
+    """Agent who was assigned a call least recently"""
+
+    name = "round_robin"
+
+    def key(self, agent_id: int) -> Tuple:
+        return (self.last_assigned.get(agent_id, 0), agent_id)
+
+
+class WeightedStrategy(RoutingStrategy):
+    """Calls today divided by the agent's weight (default 1.0), so an agent
+    weighted 2.0 takes twice the share of one weighted 1.0"""
+
+    name = "weighted"
+
+    def key(self, agent_id: int) -> Tuple:
+        weight = self.weights.get(agent_id, 1.0)
+        return (
+            self.calls_today.get(agent_id, 0) / weight,
+            self.idle_since.get(agent_id, 0.0),
+            agent_id,
+        )
+
+
+ROUTING_STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (
+        LongestIdleStrategy,
+        LeastCallsStrategy,
+        RoundRobinStrategy,
+        WeightedStrategy,
+    )
+}
+
+
+def create_routing_strategy(
+    name: str,
+    presence: Optional[PresenceIndex] = None,
+    clock: Callable[[], float] = time.time,
+) -> RoutingStrategy:
+    """Build a strategy by name and subscribe it to the presence index"""
+    strategy_class = ROUTING_STRATEGIES.get(name)
+    if strategy_class is None:
+        logger.warning(f"Unknown routing strategy '{name}', using longest_idle")
+        strategy_class = LongestIdleStrategy
+    strategy = strategy_class(clock=clock)
+
+    presence = presence or get_presence_index()
+    for agent_presence in presence.agents.values():
+        strategy.on_presence_change(agent_presence, agent_presence.status)
+    presence.add_listener(strategy.on_presence_change)
+    return strategy
+
+
+# Global instance
+routing_strategy = create_routing_strategy(ROUTING_STRATEGY)
+
+
+def get_routing_strategy() -> RoutingStrategy:
+    """Get the configured routing strategy"""
+    return routing_strategy
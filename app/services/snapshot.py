@@ -0,0 +1,148 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+
+from app.database.db import session_scope
+from app.models.models import Agent, Call
+from app.services.metrics import metrics
+from app.services.presence import PresenceIndex, get_presence_index
+from app.config import SNAPSHOT_CALL_LIMIT, SNAPSHOT_ROOMS_TTL, logger
+
+
+class SnapshotBuilder:
+    """Full state an agent page renders, sent on connect and on resync.
+
+    After the snapshot the session is kept current by deltas
+    (status_updates, room_update, call_invitation, ...), so the page has no
+    reason to poll. The active room list comes from LiveKit and is shared
+    by the snapshots built within SNAPSHOT_ROOMS_TTL seconds of each other,
+    so a reconnect storm costs one LiveKit request rather than one per agent.
+    It is dropped when this worker hears a room start or finish, and a
+    resync always fetches it anew.
+    """
+
+    def __init__(
+        self,
+        presence: Optional[PresenceIndex] = None,
+        rooms_ttl: float = SNAPSHOT_ROOMS_TTL,
+        call_limit: int = SNAPSHOT_CALL_LIMIT,
+    ):
+        self.presence = presence if presence is not None else get_presence_index()
+        self.rooms_ttl = rooms_ttl
+        self.call_limit = call_limit
+        # (monotonic time fetched, fetch) for the shared room list
+        self._rooms: Optional[tuple] = None
+
+    async def build(self, agent_id: int, fresh_rooms: bool = False) -> Dict:
+        started = time.monotonic()
+        agents, calls = await self._agents_and_calls(agent_id)
+        rooms, invitation, auto_assignment = await asyncio.gather(
+            self._active_rooms(fresh=fresh_rooms),
+            self._pending_invitation(agent_id),
+            self._auto_assignment_status(),
+        )
+        metrics.observe("ws.snapshot_ms", (time.monotonic() - started) * 1000)
+        return {
+            "agent": next((a for a in agents if a["agent_id"] == str(agent_id)), None),
+            "agents": agents,
+            "calls": calls,
+            # None when LiveKit could not be reached: the page falls back to fetching
+            "rooms": rooms,
+            "invitation": invitation,
+            "auto_assignment": auto_assignment,
+        }
+
+    async def _agents_and_calls(self, agent_id: int):
+        async with session_scope() as db:
+            agent_rows = (
+                await db.execute(select(Agent.id, Agent.username, Agent.full_name, Agent.status))
+            ).all()
+            calls = (
+                await db.scalars(
+                    select(Call)
+                    .where(Call.agent_id == agent_id)
+                    .order_by(Call.start_time.desc())
+                    .limit(self.call_limit)
+                )
+            ).all()
+            agents = []
+            for row in agent_rows:
+                presence = self.presence.agents.get(row.id)
+                agents.append(
+                    {
+                        "agent_id": str(row.id),
+                        "username": row.username,
+                        "full_name": row.full_name,
+                        # The table can lag the presence index by one write-behind interval
+                        "status": presence.status if presence is not None else row.status,
+                        "connected": presence.connected if presence is not None else False,
+                    }
+                )
+            return agents, [self._call_out(call) for call in calls]
+
+    @staticmethod
+    def _call_out(call: Call) -> Dict:
+        """Same fields as CallOut (GET /api/calls)"""
+        return {
+            "id": call.id,
+            "agent_id": call.agent_id,
+            "caller_id": call.caller_id,
+            "direction": call.direction,
+            "start_time": call.start_time.isoformat() if call.start_time else None,
+            "duration": call.duration,
+            "status": call.status,
+            "livekit_room_name": call.livekit_room_name,
+        }
+
+    def invalidate_rooms(self):
+        """Forget the shared room list, e.g. because a room started or finished"""
+        self._rooms = None
+
+    async def _active_rooms(self, fresh: bool = False) -> Optional[List[Dict]]:
+        # Imported here: the calls router imports the connection manager
+        from app.routers.calls import LiveKitService
+
+        now = time.monotonic()
+        if fresh or self._rooms is None or now - self._rooms[0] >= self.rooms_ttl:
+            self._rooms = (now, asyncio.ensure_future(LiveKitService.list_active_rooms()))
+        try:
+            # Shielded: one session going away must not cancel the others' fetch
+            return await asyncio.shield(self._rooms[1])
+        except Exception as e:
+            logger.error(f"Snapshot could not list active rooms: {str(e)}")
+            return None
+
+    @staticmethod
+    async def _pending_invitation(agent_id: int) -> Optional[Dict]:
+        from app.services.auto_assignment_service import get_auto_assignment_service
+
+        try:
+            return await get_auto_assignment_service().pending_invitation(agent_id)
+        except Exception as e:
+            logger.error(f"Snapshot could not look up invitation for agent {agent_id}: {str(e)}")
+            return None
+
+    @staticmethod
+    async def _auto_assignment_status() -> Dict:
+        """Same fields as GET /api/auto-assignment/status"""
+        from app.services.auto_assignment_service import get_auto_assignment_service
+
+        service = get_auto_assignment_service()
+        return {
+            "is_monitoring": service.is_monitoring,
+            "pending_assignments": await service.get_pending_assignments(),
+            "queue_depth": len(service.queue),
+            "is_leader": service.leader.is_leader,
+            "leader": service.leader.leader,
+        }
+
+
+# Global instance
+snapshot_builder = SnapshotBuilder()
+
+
+def get_snapshot_builder() -> SnapshotBuilder:
+    """Get the global snapshot builder"""
+    return snapshot_builder
@@ -0,0 +1,377 @@
+import abc
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.services.background import spawn
+from app.config import STATE_BACKEND, REDIS_URL, REDIS_KEY_PREFIX, logger
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis is only needed for STATE_BACKEND=redis
+    aioredis = None
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+def _default_node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class StateBackend(abc.ABC):
+    """State that every uvicorn worker must agree on, plus pub/sub fan-out.
+
+    Hashes hold JSON documents and sets hold strings. A message published on
+    a channel reaches every subscribed worker, the publisher included, so
+    handlers compare message["origin"] with node_id when they must skip
+    their own messages.
+    """
+
+    name = "base"
+
+    def __init__(self, node_id: Optional[str] = None):
+        self.node_id = node_id or _default_node_id()
+        self._handlers: Dict[str, List[Handler]] = {}
+
+    def subscribe(self, channel: str, handler: Handler):
+        """Register an async handler(message) for a channel"""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abc.abstractmethod
+    async def hset(self, name: str, key: str, value: dict):
+        """Store a document under a hash field, replacing any previous one"""
+
+    @abc.abstractmethod
+    async def hsetnx(self, name: str, key: str, value: dict) -> bool:
+        """Set only if the field is absent; True for the caller that set it"""
+
+    @abc.abstractmethod
+    async def hget(self, name: str, key: str) -> Optional[dict]:
+        """Document under a hash field, or None"""
+
+    @abc.abstractmethod
+    async def hdel(self, name: str, key: str) -> bool:
+        """Delete a hash field; True if it existed"""
+
+    @abc.abstractmethod
+    async def hdel_if(self, name: str, key: str, field: str, value: str) -> bool:
+        """Delete a hash entry only if its document has document[field] == value.
+
+        Lets a worker drop an entry it owns without racing a newer owner.
+        """
+
+    @abc.abstractmethod
+    async def hgetall(self, name: str) -> Dict[str, dict]:
+        """Every field of a hash with its document"""
+
+    @abc.abstractmethod
+    async def sadd(self, name: str, member: str) -> bool:
+        """Add to a set; True only for the caller that actually added it"""
+
+    @abc.abstractmethod
+    async def srem(self, name: str, member: str) -> bool:
+        """Remove from a set; True if it was a member"""
+
+    @abc.abstractmethod
+    async def smembers(self, name: str) -> Set[str]:
+        """Every member of a set"""
+
+    @abc.abstractmethod
+    async def publish(self, channel: str, message: dict):
+        """Send a message to every worker subscribed to the channel"""
+
+    @abc.abstractmethod
+    async def acquire_lease(self, name: str, ttl: float) -> bool:
+        """Take a free lease, or extend one this node holds, for ttl seconds.
+
+        Returns False while another node holds it.
+        """
+
+    @abc.abstractmethod
+    async def release_lease(self, name: str) -> bool:
+        """Give up a lease; only its holder can release it"""
+
+    @abc.abstractmethod
+    async def lease_holder(self, name: str) -> Optional[str]:
+        """Node id holding a lease, or None if it is free"""
+
+    async def _dispatch(self, channel: str, message: dict):
+        for handler in self._handlers.get(channel, ()):
+            try:
+                await handler(message)
+            except Exception as e:
+                logger.error(f"State backend handler for {channel} failed: {str(e)}")
+
+
+class InMemoryHub:
+    """Storage and subscribers shared by in-memory backends.
+
+    One hub per process is the single-worker setup; several backends on
+    one hub stand in for several workers on one Redis (scripts, tests).
+    """
+
+    def __init__(self):
+        self.hashes: Dict[str, Dict[str, str]] = {}
+        self.sets: Dict[str, Set[str]] = {}
+        # lease name -> (holder node id, monotonic expiry)
+        self.leases: Dict[str, Tuple[str, float]] = {}
+        self.backends: List["InMemoryStateBackend"] = []
+
+
+class InMemoryStateBackend(StateBackend):
+    """Process-local backend for development and single-worker deployments"""
+
+    name = "memory"
+
+    def __init__(self, hub: Optional[InMemoryHub] = None, node_id: Optional[str] = None):
+        super().__init__(node_id)
+        self.hub = hub or InMemoryHub()
+        self.hub.backends.append(self)
+
+    async def hset(self, name: str, key: str, value: dict):
+        # Stored encoded so callers get a copy, as they would from Redis
+        self.hub.hashes.setdefault(name, {})[key] = json.dumps(value, default=str)
+
+    async def hsetnx(self, name: str, key: str, value: dict) -> bool:
+        if key in self.hub.hashes.get(name, {}):
+            return False
+        await self.hset(name, key, value)
+        return True
+
+    async def hget(self, name: str, key: str) -> Optional[dict]:
+        raw = self.hub.hashes.get(name, {}).get(key)
+        return json.loads(raw) if raw is not None else None
+
+    async def hdel(self, name: str, key: str) -> bool:
+        return self.hub.hashes.get(name, {}).pop(key, None) is not None
+
+    async def hdel_if(self, name: str, key: str, field: str, value: str) -> bool:
+        document = await self.hget(name, key)
+        if document is None or document.get(field) != value:
+            return False
+        return await self.hdel(name, key)
+
+    async def hgetall(self, name: str) -> Dict[str, dict]:
+        return {key: json.loads(raw) for key, raw in self.hub.hashes.get(name, {}).items()}
+
+    async def sadd(self, name: str, member: str) -> bool:
+        members = self.hub.sets.setdefault(name, set())
+        if member in members:
+            return False
+        members.add(member)
+        return True
+
+    async def srem(self, name: str, member: str) -> bool:
+        members = self.hub.sets.get(name, set())
+        if member not in members:
+            return False
+        members.discard(member)
+        return True
+
+    async def smembers(self, name: str) -> Set[str]:
+        return set(self.hub.sets.get(name, set()))
+
+    async def publish(self, channel: str, message: dict):
+        message = json.loads(json.dumps(message, default=str))
+        for backend in list(self.hub.backends):
+            await backend._dispatch(channel, message)
+
+    async def acquire_lease(self, name: str, ttl: float) -> bool:
+        now = time.monotonic()
+        holder = self.hub.leases.get(name)
+        if holder is not None and holder[0] != self.node_id and holder[1] > now:
+            return False
+        self.hub.leases[name] = (self.node_id, now + ttl)
+        return True
+
+    async def release_lease(self, name: str) -> bool:
+        holder = self.hub.leases.get(name)
+        if holder is None or holder[0] != self.node_id:
+            return False
+        del self.hub.leases[name]
+        return True
+
+    async def lease_holder(self, name: str) -> Optional[str]:
+        holder = self.hub.leases.get(name)
+        if holder is None or holder[1] <= time.monotonic():
+            return None
+        return holder[0]
+
+    async def close(self):
+        if self in self.hub.backends:
+            self.hub.backends.remove(self)
+
+
+# Compare-and-delete on one field of a JSON document stored in a hash
+_HDEL_IF = """
+local raw = redis.call('HGET', KEYS[1], ARGV[1])
+if raw and cjson.decode(raw)[ARGV[2]] == ARGV[3] then
+    return redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+# Leases are keys holding the holder's node id, with a TTL. The lease scripts
+# check the holder first so a node can never extend or drop another's lease.
+_ACQUIRE_LEASE = """
+local holder = redis.call('GET', KEYS[1])
+if holder == false then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+elseif holder == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+_RELEASE_LEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisStateBackend(StateBackend):
+    """Redis backend for running several workers (or hosts) side by side.
+
+    Pass a client (e.g. fakeredis.aioredis.FakeRedis()) to run without a
+    live server.
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        url: str = REDIS_URL,
+        client=None,
+        prefix: str = REDIS_KEY_PREFIX,
+        node_id: Optional[str] = None,
+    ):
+        super().__init__(node_id)
+        if client is None:
+            if aioredis is None:
+                raise RuntimeError("STATE_BACKEND=redis needs the redis package (pip install redis)")
+            client = aioredis.from_url(url, decode_responses=True)
+        self.redis = client
+        self.prefix = prefix
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+
+    async def start(self):
+        if self._listener is not None:
+            return
+        self._pubsub = self.redis.pubsub()
+        if self._handlers:
+            await self._pubsub.subscribe(*(self._key(channel) for channel in self._handlers))
+        self._listener = asyncio.create_task(self._listen())
+        logger.info(f"Redis state backend started as node {self.node_id}")
+
+    def subscribe(self, channel: str, handler: Handler):
+        new_channel = channel not in self._handlers
+        super().subscribe(channel, handler)
+        if new_channel and self._pubsub is not None:
+            spawn(self._pubsub.subscribe(self._key(channel)), f"Subscribing to {channel}")
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        await self.redis.aclose()
+
+    async def _listen(self):
+        while True:
+            try:
+                async for item in self._pubsub.listen():
+                    if item.get("type") != "message":
+                        continue
+                    channel = item["channel"][len(self.prefix):]
+                    await self._dispatch(channel, json.loads(item["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis pub/sub listener failed, resubscribing: {str(e)}")
+                await asyncio.sleep(1)
+
+    async def hset(self, name: str, key: str, value: dict):
+        await self.redis.hset(self._key(name), key, json.dumps(value, default=str))
+
+    async def hsetnx(self, name: str, key: str, value: dict) -> bool:
+        return bool(
+            await self.redis.hsetnx(self._key(name), key, json.dumps(value, default=str))
+        )
+
+    async def hget(self, name: str, key: str) -> Optional[dict]:
+        raw = await self.redis.hget(self._key(name), key)
+        return json.loads(raw) if raw is not None else None
+
+    async def hdel(self, name: str, key: str) -> bool:
+        return bool(await self.redis.hdel(self._key(name), key))
+
+    async def hdel_if(self, name: str, key: str, field: str, value: str) -> bool:
+        return bool(await self.redis.eval(_HDEL_IF, 1, self._key(name), key, field, value))
+
+    async def hgetall(self, name: str) -> Dict[str, dict]:
+        raw = await self.redis.hgetall(self._key(name))
+        return {key: json.loads(value) for key, value in raw.items()}
+
+    async def sadd(self, name: str, member: str) -> bool:
+        return bool(await self.redis.sadd(self._key(name), member))
+
+    async def srem(self, name: str, member: str) -> bool:
+        return bool(await self.redis.srem(self._key(name), member))
+
+    async def smembers(self, name: str) -> Set[str]:
+        return set(await self.redis.smembers(self._key(name)))
+
+    async def publish(self, channel: str, message: dict):
+        await self.redis.publish(self._key(channel), json.dumps(message, default=str))
+
+    async def acquire_lease(self, name: str, ttl: float) -> bool:
+        return bool(
+            await self.redis.eval(
+                _ACQUIRE_LEASE, 1, self._key(f"lease:{name}"), self.node_id, int(ttl * 1000)
+            )
+        )
+
+    async def release_lease(self, name: str) -> bool:
+        return bool(
+            await self.redis.eval(_RELEASE_LEASE, 1, self._key(f"lease:{name}"), self.node_id)
+        )
+
+    async def lease_holder(self, name: str) -> Optional[str]:
+        return await self.redis.get(self._key(f"lease:{name}"))
+
+
+def create_state_backend(name: str = STATE_BACKEND) -> StateBackend:
+    if name == RedisStateBackend.name:
+        return RedisStateBackend()
+    if name != InMemoryStateBackend.name:
+        logger.warning(f"Unknown state backend '{name}', using memory")
+    return InMemoryStateBackend()
+
+
+# Global instance
+state_backend = create_state_backend()
+
+
+def get_state_backend() -> StateBackend:
+    """Get the configured shared-state backend"""
+    return state_backend
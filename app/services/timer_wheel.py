@@ -0,0 +1,143 @@
+import asyncio
+import inspect
+import math
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set
+
+from app.services.metrics import metrics
+from app.config import logger
+
+
+class _Timer:
+    __slots__ = ("key", "due_tick", "callback", "args")
+
+    def __init__(self, key: Hashable, due_tick: int, callback: Callable, args: tuple):
+        self.key = key
+        self.due_tick = due_tick
+        self.callback = callback
+        self.args = args
+
+
+class TimerWheel:
+    """Hashed timing wheel: every deadline is driven by one asyncio task.
+
+    A timer due in n ticks goes into slot (now + n) % slots; each tick the
+    driver looks at a single slot and fires the timers that are due (timers
+    more than one revolution away stay put until a later pass). Scheduling
+    and cancelling are dict operations, so both are O(1) and cancelling
+    leaves nothing behind for the event loop to clean up. Timers fire up to
+    one tick late.
+
+    Callbacks may be plain functions or coroutine functions; coroutines are
+    started as tasks so a slow callback never holds up the wheel.
+    """
+
+    def __init__(
+        self,
+        tick: float = 0.1,
+        slots: int = 512,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.tick = tick
+        self.clock = clock
+        self._slots: List[Dict[Hashable, _Timer]] = [{} for _ in range(slots)]
+        self._timers: Dict[Hashable, _Timer] = {}
+        self._origin = clock()
+        self._cursor = 0  # last tick the driver has processed
+        self._driver: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._timers
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable, *args: Any):
+        """Call callback(*args) after delay seconds, replacing any timer with this key"""
+        self.cancel(key)
+        now = self._current_tick()
+        if not self._timers:
+            # The driver skips ahead while idle; start counting from now
+            self._cursor = now
+        due_tick = now + max(1, math.ceil(delay / self.tick))
+        timer = _Timer(key, due_tick, callback, args)
+        self._timers[key] = timer
+        self._slots[due_tick % len(self._slots)][key] = timer
+        self._ensure_driver()
+
+    def cancel(self, key: Hashable) -> bool:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        del self._slots[timer.due_tick % len(self._slots)][key]
+        return True
+
+    def remaining(self, key: Hashable) -> Optional[float]:
+        """Seconds until the timer fires (None if it is not scheduled)"""
+        timer = self._timers.get(key)
+        if timer is None:
+            return None
+        return max(0.0, self._origin + timer.due_tick * self.tick - self.clock())
+
+    def stop(self):
+        """Drop every timer and stop the driver (it restarts on the next schedule)"""
+        if self._driver is not None:
+            self._driver.cancel()
+            self._driver = None
+        for slot in self._slots:
+            slot.clear()
+        self._timers.clear()
+
+    def _current_tick(self) -> int:
+        return int((self.clock() - self._origin) / self.tick)
+
+    def _ensure_driver(self):
+        if self._driver is None or self._driver.done():
+            self._wakeup = asyncio.Event()
+            self._driver = asyncio.get_running_loop().create_task(self._run())
+        else:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            if not self._timers:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = self._current_tick()
+            while self._cursor < now and self._timers:
+                self._cursor += 1
+                self._advance(self._cursor)
+            metrics.set_gauge("timers.pending", len(self._timers))
+
+            next_tick_at = self._origin + (self._cursor + 1) * self.tick
+            await asyncio.sleep(max(0.0, next_tick_at - self.clock()))
+
+    def _advance(self, tick: int):
+        slot = self._slots[tick % len(self._slots)]
+        if not slot:
+            return
+        due = [timer for timer in slot.values() if timer.due_tick <= tick]
+        for timer in due:
+            del slot[timer.key]
+            del self._timers[timer.key]
+        for timer in due:
+            self._fire(timer)
+
+    def _fire(self, timer: _Timer):
+        try:
+            result = timer.callback(*timer.args)
+            if inspect.isawaitable(result):
+                task = asyncio.ensure_future(result)
+                self._running.add(task)
+                task.add_done_callback(self._task_done)
+        except Exception as e:
+            logger.error(f"Timer {timer.key!r} failed: {str(e)}")
+
+    def _task_done(self, task: asyncio.Task):
+        self._running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Timer callback failed: {str(task.exception())}")
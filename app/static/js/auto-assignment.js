@@ -4,7 +4,8 @@ class AutoAssignmentManager {
     this.isActive = false;
     this.currentInvitation = null;
     this.countdownTimer = null;
-    this.statusUpdateInterval = null;
+    // Last auto-assignment status shown, kept current from WebSocket frames
+    this.status = null;
 
     this.initializeUI();
     this.bindEvents();
@@ -112,7 +113,7 @@ class AutoAssignmentManager {
     if (response.ok) {
       this.isActive = true;
       this.updateUI();
-      this.startStatusUpdates();
+      this.applyStatusChange({ is_monitoring: true });
       this.showNotification("Auto-assignment started successfully", "success");
     } else {
       const error = await response.text();
@@ -134,7 +135,7 @@ class AutoAssignmentManager {
     if (response.ok) {
       this.isActive = false;
       this.updateUI();
-      this.stopStatusUpdates();
+      this.applyStatusChange({ is_monitoring: false });
       this.showNotification("Auto-assignment stopped", "info");
     } else {
       const error = await response.text();
@@ -162,17 +163,47 @@ class AutoAssignmentManager {
     }
   }
 
-  startStatusUpdates() {
-    // Update status every 10 seconds
-    this.statusUpdateInterval = setInterval(() => {
-      this.getStatus();
-    }, 10000);
+  applyStatusChange(change) {
+    // No polling: the status arrives with the WebSocket snapshot (or when
+    // the panel is opened) and frames are applied to it as they come in
+    if (this.status) {
+      this.updateStatusDisplay({ ...this.status, ...change });
+    }
   }
 
-  stopStatusUpdates() {
-    if (this.statusUpdateInterval) {
-      clearInterval(this.statusUpdateInterval);
-      this.statusUpdateInterval = null;
+  applyAssignmentEvent(data) {
+    if (!this.status) return;
+    const pending = { ...(this.status.pending_assignments || {}) };
+    if (data.type === "call_invitation") {
+      // We are being rung for this room
+      if (!pending[data.room_name]) {
+        pending[data.room_name] = { caller_id: data.caller_id, state: "ringing" };
+      }
+    } else if (data.type === "room_update") {
+      if (!data.room || data.room.event !== "room_deleted") return;
+      delete pending[data.room.room_name];
+    } else {
+      // Assigned, or revoked: the server only revokes once ringing is over
+      delete pending[data.room_name];
+    }
+    this.applyStatusChange({ pending_assignments: pending });
+  }
+
+  applySnapshot(snapshot) {
+    if (snapshot.auto_assignment) {
+      this.updateStatusDisplay(snapshot.auto_assignment);
+    }
+    const invitation = snapshot.invitation;
+    const current = this.currentInvitation;
+    if (invitation && (!current || current.room_name !== invitation.room_name)) {
+      // Rung while the page was loading or reconnecting
+      if (current) {
+        this.hideCallInvitation();
+      }
+      this.showCallInvitation(invitation);
+    } else if (!invitation && current) {
+      // Answered, revoked or timed out while we were disconnected
+      this.hideCallInvitation();
     }
   }
 
@@ -192,6 +223,7 @@ class AutoAssignmentManager {
   }
 
   updateStatusDisplay(status) {
+    this.status = status;
     this.elements.serviceStatus.textContent = status.is_monitoring
       ? "Running"
       : "Stopped";
@@ -358,6 +390,10 @@ class AutoAssignmentManager {
         } else {
           this.showNotification("Call invitation declined", "info");
         }
+      } else if (response.status === 409) {
+        // Another agent in the ring group answered first
+        this.hideCallInvitation();
+        this.showNotification("Call was already answered by another agent", "info");
       } else {
         const error = await response.text();
         throw new Error(error);
@@ -606,12 +642,29 @@ class AutoAssignmentManager {
       } at ${new Date().toLocaleTimeString()}`;
     }
 
+    if (
+      ["call_invitation", "call_invitation_revoked", "call_assigned", "room_update"].includes(
+        data.type
+      )
+    ) {
+      this.applyAssignmentEvent(data);
+    }
+
     switch (data.type) {
+      case "snapshot":
+        this.applySnapshot(data);
+        break;
+
       case "call_invitation":
         console.log("Processing call invitation:", data);
         this.showCallInvitation(data);
         break;
 
+      case "call_invitation_revoked":
+        console.log("Processing invitation revoke:", data);
+        this.handleInvitationRevoked(data);
+        break;
+
       case "call_assigned":
         console.log("Processing call assignment:", data);
         this.hideCallInvitation();
@@ -633,6 +686,26 @@ class AutoAssignmentManager {
     }
   }
 
+  handleInvitationRevoked(data) {
+    // Only close the modal if it is still showing the revoked invitation
+    if (
+      !this.currentInvitation ||
+      this.currentInvitation.room_name !== data.room_name
+    ) {
+      return;
+    }
+
+    this.hideCallInvitation();
+    const messages = {
+      answered_elsewhere: "Call was answered by another agent",
+      caller_hung_up: "Caller hung up",
+    };
+    this.showNotification(
+      messages[data.reason] || "Call invitation withdrawn",
+      "info"
+    );
+  }
+
   handleCallEnded(data) {
     // Clean up any auto-assignment related state when call ends
     console.log("Auto-assignment: Call ended, cleaning up...");
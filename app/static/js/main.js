@@ -54,6 +54,8 @@ document.addEventListener("DOMContentLoaded", () => {
 
   // WebSocket connection
   let socket;
+  let lastSeq = null;
+  let initialSnapshotHandled = false;
   connectWebSocket();
 
   // Livekit call handlers should be initialized from livekit-handler.js
@@ -66,9 +68,8 @@ document.addEventListener("DOMContentLoaded", () => {
   let callTimerInterval = null;
   let isMuted = false;
 
-  // Initialize UI
-  loadCallHistory();
-  loadInboundCalls();
+  // Initial state (status, call history, inbound rooms) arrives as the
+  // WebSocket snapshot; see handleSnapshot
 
   // Event Listeners
   logoutBtn.addEventListener("click", handleLogout);
@@ -92,9 +93,15 @@ document.addEventListener("DOMContentLoaded", () => {
       const tabId = button.dataset.tab;
       document.getElementById(tabId).classList.add("active");
 
+      // Only receive room updates while the inbound calls tab is shown
+      updateSubscriptions();
+
       // Refresh data when switching to a tab
       if (tabId === "inbound-tab") {
-        loadInboundCalls();
+        // Room updates were not sent while the tab was hidden: resync
+        if (!requestResync()) {
+          loadInboundCalls();
+        }
       } else if (tabId === "recent-tab") {
         loadCallHistory();
       }
@@ -109,9 +116,6 @@ document.addEventListener("DOMContentLoaded", () => {
     });
   });
 
-  // Set initial agent status (from server or localStorage)
-  fetchCurrentStatus();
-
   // Listen for call ended events from LiveKit
   window.addEventListener("callEnded", (event) => {
     console.log("🔥 Call ended event received from LiveKit:", event.detail);
@@ -132,6 +136,8 @@ document.addEventListener("DOMContentLoaded", () => {
     console.log("Using agent ID:", agent.id);
 
     socket = new WebSocket(wsUrl);
+    // Sequence number of the last frame applied; null until a snapshot arrives
+    lastSeq = null;
 
     // Make socket available globally for auto-assignment manager
     window.socket = socket;
@@ -140,6 +146,9 @@ document.addEventListener("DOMContentLoaded", () => {
       console.log("✅ WebSocket connection established successfully");
       console.log("Agent ID connected:", agent.id);
 
+      // Receive only the broadcasts this page shows
+      updateSubscriptions();
+
       // Update debug panel if available
       const debugWebSocket = document.getElementById("debugWebSocket");
       if (debugWebSocket) {
@@ -149,6 +158,22 @@ document.addEventListener("DOMContentLoaded", () => {
 
     socket.onmessage = (event) => {
       const data = JSON.parse(event.data);
+      if (data.type === "snapshot") {
+        lastSeq = data.seq;
+      } else if (lastSeq !== null) {
+        if (data.seq !== lastSeq + 1) {
+          // A frame was lost (e.g. our socket fell behind): start over from a snapshot
+          console.warn(`Missed frames ${lastSeq + 1}-${data.seq - 1}, resyncing`);
+          requestResync();
+        } else {
+          lastSeq = data.seq;
+        }
+      }
+      if (data.type === "ping") {
+        // Server heartbeat: agents that stop answering are set Offline
+        socket.send(JSON.stringify({ type: "pong", ts: data.ts }));
+        return;
+      }
       handleWebSocketMessage(data);
     };
 
@@ -177,6 +202,30 @@ document.addEventListener("DOMContentLoaded", () => {
     };
   }
 
+  function requestResync() {
+    // Ask for a fresh snapshot; frames are not checked until it arrives
+    if (!socket || socket.readyState !== WebSocket.OPEN) return false;
+    lastSeq = null;
+    socket.send(JSON.stringify({ type: "resync" }));
+    return true;
+  }
+
+  function updateSubscriptions() {
+    // Call invitations and our own status always arrive; room updates only
+    // matter while the inbound calls tab is shown
+    if (!socket || socket.readyState !== WebSocket.OPEN) return;
+    const inboundTabActive = document
+      .querySelector("#inbound-tab")
+      .classList.contains("active");
+    socket.send(
+      JSON.stringify({
+        type: "subscribe",
+        topics: inboundTabActive ? ["rooms"] : [],
+        replace: true,
+      })
+    );
+  }
+
   function handleWebSocketMessage(data) {
     // First, let auto-assignment manager handle its messages
     if (window.autoAssignmentManager) {
@@ -184,11 +233,19 @@ document.addEventListener("DOMContentLoaded", () => {
     }
 
     switch (data.type) {
+      case "snapshot":
+        handleSnapshot(data);
+        break;
       case "incoming_call":
         showIncomingCall(data);
         break;
-      case "status_update":
-        // Update UI if another agent's status changes (if needed)
+      case "status_updates":
+        // Follow status changes made in our other tabs or by the server
+        data.updates.forEach((update) => {
+          if (update.agent_id === String(agent.id)) {
+            statusSelect.value = update.status;
+          }
+        });
         break;
       case "call_ended":
         handleCallEnded(data);
@@ -201,21 +258,19 @@ document.addEventListener("DOMContentLoaded", () => {
         const inboundTabActive = document
           .querySelector("#inbound-tab")
           .classList.contains("active");
-        if (inboundTabActive) {
-          // If we have specific room data, we could potentially just update that room
-          // instead of reloading everything
-          if (data.room && data.room.event) {
-            if (data.room.event === "room_created") {
-              highlightNewRoom(data.room.room_name);
-            } else if (data.room.event === "room_deleted") {
-              removeDeletedRoom(data.room.room_name);
-            }
-          } else {
-            // Just do a full refresh
-            loadInboundCalls();
+        // The event carries the room itself, so the table is updated in
+        // place; the full list is only fetched again with a snapshot
+        if (inboundTabActive && data.room && data.room.event) {
+          if (data.room.event === "room_created") {
+            highlightNewRoom(data.room);
+          } else if (data.room.event === "room_deleted") {
+            removeDeletedRoom(data.room.room_name);
           }
         }
         break;
+      case "subscribed":
+        console.log("Subscribed to topics:", data.topics);
+        break;
       case "call_invitation":
         // Handled by auto-assignment manager
         console.log("Call invitation received:", data);
@@ -224,11 +279,38 @@ document.addEventListener("DOMContentLoaded", () => {
         // Handled by auto-assignment manager
         console.log("Call assigned:", data);
         break;
+      case "call_invitation_revoked":
+        // Handled by auto-assignment manager
+        console.log("Call invitation revoked:", data);
+        break;
       default:
         console.log("Unknown message type:", data.type);
     }
   }
 
+  function handleSnapshot(data) {
+    console.log("Snapshot received:", data);
+    if (data.agent) {
+      statusSelect.value = data.agent.status;
+    }
+    if (!initialSnapshotHandled) {
+      initialSnapshotHandled = true;
+      // Opening the page makes the agent Available
+      if (data.agent && data.agent.status !== "Available" && !activeCall) {
+        updateAgentStatus("Available")
+          .then(() => console.log("Forced agent status to Available"))
+          .catch((error) => console.error("Error in force status update:", error));
+      }
+    }
+    renderCallHistory(data.calls || []);
+    if (data.rooms) {
+      renderInboundRooms(data.rooms);
+    } else {
+      // The server could not list rooms; ask for them directly
+      loadInboundCalls();
+    }
+  }
+
   function showIncomingCall(data) {
     // Show incoming call panel with caller information
     incomingCallerId.textContent = data.caller_id || "Unknown";
@@ -652,21 +734,26 @@ document.addEventListener("DOMContentLoaded", () => {
         throw new Error("Failed to load call history");
       }
 
-      const data = await response.json();
+      renderCallHistory(await response.json());
+    } catch (error) {
+      console.error("Call history error:", error);
+    }
+  }
 
-      // Clear existing rows
-      callLogBody.innerHTML = "";
+  function renderCallHistory(calls) {
+    // Clear existing rows
+    callLogBody.innerHTML = "";
 
-      // Add calls to the table
-      data.forEach((call) => {
-        const row = document.createElement("tr");
+    // Add calls to the table
+    calls.forEach((call) => {
+      const row = document.createElement("tr");
 
-        const formattedDate = new Date(
-          call.timestamp || call.start_time
-        ).toLocaleString();
-        const duration = call.duration ? formatDuration(call.duration) : "N/A";
+      const formattedDate = new Date(
+        call.timestamp || call.start_time
+      ).toLocaleString();
+      const duration = call.duration ? formatDuration(call.duration) : "N/A";
 
-        row.innerHTML = `
+      row.innerHTML = `
                     <td>${formattedDate}</td>
                     <td>${call.direction}</td>
                     <td>${
@@ -676,11 +763,8 @@ document.addEventListener("DOMContentLoaded", () => {
                     <td>${call.status}</td>
                 `;
 
-        callLogBody.appendChild(row);
-      });
-    } catch (error) {
-      console.error("Call history error:", error);
-    }
+      callLogBody.appendChild(row);
+    });
   }
 
   function formatDuration(seconds) {
@@ -725,44 +809,13 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
-  // Function to force update the agent status regardless of current UI state
-  async function forceStatusUpdate() {
-    try {
-      // Get current agent info to check status
-      const response = await fetch("/api/agents/me", {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
-      });
-
-      if (!response.ok) {
-        throw new Error("Failed to get agent info");
-      }
-
-      const data = await response.json();
-      console.log("Current agent status:", data.status);
-
-      // If not available, force update to Available
-      if (data.status !== "Available") {
-        await updateAgentStatus("Available");
-        console.log("Forced agent status to Available");
-      }
-    } catch (error) {
-      console.error("Error in force status update:", error);
-    }
-  }
-
-  // Add event listener for page load to force status check
-  window.addEventListener("load", function () {
-    setTimeout(forceStatusUpdate, 1000);
-  });
-
   // Track the current rooms to detect changes
   let currentRooms = [];
 
   async function loadInboundCalls() {
     try {
-      const response = await fetch("/api/calls/active-rooms", {
+      // Rooms and their participants in one request
+      const response = await fetch("/api/calls/rooms", {
         method: "GET",
         headers: {
           "Content-Type": "application/json",
@@ -775,121 +828,7 @@ document.addEventListener("DOMContentLoaded", () => {
       }
 
       const data = await response.json();
-      const rooms = data.rooms || [];
-
-      // Save previous room names before updating
-      const previousRooms = [...currentRooms];
-
-      // Update current rooms
-      currentRooms = rooms.map((room) => room.room_name);
-
-      // Find new rooms (rooms that weren't in the previous list)
-      const newRooms = rooms
-        .filter((room) => !previousRooms.includes(room.room_name))
-        .map((room) => room.room_name);
-
-      // Clear the inbound calls table
-      inboundCallsBody.innerHTML = "";
-
-      if (rooms.length === 0) {
-        // Display a message if no rooms are available
-        const row = document.createElement("tr");
-        row.innerHTML = `
-                    <td colspan="5" style="text-align: center;">No active rooms available</td>
-                `;
-        inboundCallsBody.appendChild(row);
-        return;
-      }
-
-      // Enhanced load: fetch detailed info for each room
-      const enhancedRooms = await Promise.all(
-        rooms.map(async (room) => {
-          try {
-            // Fetch detailed room info for accurate participant count
-            const detailResponse = await fetch(
-              `/api/calls/room/${room.room_name}`,
-              {
-                method: "GET",
-                headers: {
-                  Authorization: `Bearer ${token}`,
-                },
-              }
-            );
-
-            if (detailResponse.ok) {
-              const detailData = await detailResponse.json();
-              // Override participant count with accurate data
-              return {
-                ...room,
-                participant_count: detailData.participant_count,
-                participants: detailData.participants || [],
-              };
-            }
-          } catch (err) {
-            console.warn(
-              `Could not fetch details for room ${room.room_name}:`,
-              err
-            );
-          }
-          // Fall back to original room data if detailed fetch fails
-          return room;
-        })
-      );
-
-      // Add each room to the table
-      enhancedRooms.forEach((room) => {
-        const row = document.createElement("tr");
-        row.dataset.roomName = room.room_name;
-
-        // Add 'new' class if this is a newly added room
-        if (newRooms.includes(room.room_name) && previousRooms.length > 0) {
-          row.classList.add("room-item", "new");
-
-          // Remove the 'new' class after animation completes
-          setTimeout(() => {
-            row.classList.remove("new");
-          }, 2000);
-        } else {
-          row.classList.add("room-item");
-        }
-
-        // Format creation time if available
-        let formattedTime = "N/A";
-        if (room.creation_time) {
-          try {
-            const date = new Date(room.creation_time);
-            formattedTime = date.toLocaleTimeString();
-          } catch (e) {
-            console.warn("Unable to format creation time:", e);
-          }
-        }
-
-        // Create participant info tooltip if available
-        let participantInfo = "";
-        if (room.participants && room.participants.length > 0) {
-          const participantList = room.participants
-            .map((p) => p.name || p.id || "Unknown")
-            .join(", ");
-          participantInfo = ` title="${participantList}"`;
-        }
-
-        row.innerHTML = `
-                    <td>${room.room_name}</td>
-                    <td>${room.room_id || "N/A"}</td>
-                    <td>${room.status || "Active"}</td>
-                    <td${participantInfo}>${room.participant_count || 0}</td>
-                    <td><button class="join-call-btn" data-room="${
-                      room.room_name
-                    }">Join Call</button></td>
-                `;
-
-        inboundCallsBody.appendChild(row);
-      });
-
-      // Add event listeners to the join call buttons
-      document.querySelectorAll(".join-call-btn").forEach((button) => {
-        button.addEventListener("click", handleJoinRoom);
-      });
+      renderInboundRooms(data.rooms || []);
     } catch (error) {
       console.error("Error loading inbound calls:", error);
 
@@ -904,24 +843,116 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
-  function highlightNewRoom(roomName) {
-    // First check if the room already exists in the current rooms
-    if (currentRooms.includes(roomName)) {
-      // If it exists, find the row and highlight it
-      const existingRow = document.querySelector(
-        `tr[data-room-name="${roomName}"]`
-      );
-      if (existingRow) {
-        existingRow.classList.add("new");
-        setTimeout(() => {
-          existingRow.classList.remove("new");
-        }, 2000);
-        return;
+  function renderInboundRooms(rooms) {
+    // Save previous room names before updating
+    const previousRooms = [...currentRooms];
+
+    // Update current rooms
+    currentRooms = rooms.map((room) => room.room_name);
+
+    // Find new rooms (rooms that weren't in the previous list)
+    const newRooms = rooms
+      .filter((room) => !previousRooms.includes(room.room_name))
+      .map((room) => room.room_name);
+
+    // Clear the inbound calls table
+    inboundCallsBody.innerHTML = "";
+
+    if (rooms.length === 0) {
+      // Display a message if no rooms are available
+      const row = document.createElement("tr");
+      row.innerHTML = `
+                  <td colspan="5" style="text-align: center;">No active rooms available</td>
+              `;
+      inboundCallsBody.appendChild(row);
+      return;
+    }
+
+    // Add each room to the table
+    rooms.forEach((room) => {
+      const row = buildRoomRow(room);
+
+      // Add 'new' class if this is a newly added room
+      if (newRooms.includes(room.room_name) && previousRooms.length > 0) {
+        flashRow(row);
+      }
+
+      inboundCallsBody.appendChild(row);
+    });
+
+    // Add event listeners to the join call buttons
+    document.querySelectorAll(".join-call-btn").forEach((button) => {
+      button.addEventListener("click", handleJoinRoom);
+    });
+  }
+
+  function buildRoomRow(room) {
+    const row = document.createElement("tr");
+    row.dataset.roomName = room.room_name;
+    row.classList.add("room-item");
+
+    // Format creation time if available
+    let formattedTime = "N/A";
+    if (room.creation_time) {
+      try {
+        const date = new Date(room.creation_time);
+        formattedTime = date.toLocaleTimeString();
+      } catch (e) {
+        console.warn("Unable to format creation time:", e);
       }
     }
 
-    // If we don't have the room, reload the entire list
-    loadInboundCalls();
+    // Create participant info tooltip if available
+    let participantInfo = "";
+    if (room.participants && room.participants.length > 0) {
+      const participantList = room.participants
+        .map((p) => p.name || p.id || "Unknown")
+        .join(", ");
+      participantInfo = ` title="${participantList}"`;
+    }
+
+    row.innerHTML = `
+                <td>${room.room_name}</td>
+                <td>${room.room_id || "N/A"}</td>
+                <td>${room.status || "Active"}</td>
+                <td${participantInfo}>${room.participant_count || 0}</td>
+                <td><button class="join-call-btn" data-room="${
+                  room.room_name
+                }">Join Call</button></td>
+            `;
+    return row;
+  }
+
+  function flashRow(row) {
+    row.classList.add("new");
+    // Remove the 'new' class after animation completes
+    setTimeout(() => {
+      row.classList.remove("new");
+    }, 2000);
+  }
+
+  function highlightNewRoom(room) {
+    // A room we already show (e.g. from the snapshot) is only highlighted
+    const existingRow = document.querySelector(
+      `tr[data-room-name="${room.room_name}"]`
+    );
+    if (existingRow) {
+      flashRow(existingRow);
+      return;
+    }
+
+    // Replace the "no rooms" message, if that is all the table holds
+    if (currentRooms.length === 0) {
+      inboundCallsBody.innerHTML = "";
+    }
+    currentRooms.push(room.room_name);
+
+    const row = buildRoomRow(room);
+    flashRow(row);
+    row
+      .querySelector(".join-call-btn")
+      .addEventListener("click", handleJoinRoom);
+    inboundCallsBody.appendChild(row);
   }
 
   function removeDeletedRoom(roomName) {
@@ -953,9 +984,6 @@ document.addEventListener("DOMContentLoaded", () => {
       if (index !== -1) {
         currentRooms.splice(index, 1);
       }
-    } else {
-      // If we can't find the row, reload the entire list
-      loadInboundCalls();
     }
   }
 
@@ -0,0 +1,70 @@
+"""Micro-benchmark: cost of encoding one broadcast for N connected agents.
+
+Compares the old path (stdlib json re-encoding the dict for every
+recipient, as send_json did) with encoding the frame once via
+app.api.websocket_manager.encode_frame (orjson when installed).
+
+Usage: python scripts/bench_broadcast_encoding.py [--rounds 200]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.api.websocket_manager import encode_frame, orjson  # noqa: E402
+
+CONNECTION_COUNTS = (10, 100, 1000)
+
+
+def sample_message() -> dict:
+    return {
+        "type": "room_update",
+        "timestamp": str(datetime.now()),
+        "room": {
+            "event": "room_created",
+            "room_name": "inbound-+15551234567-1700000000",
+            "room_id": "RM_abcdefghijkl",
+        },
+    }
+
+
+def per_recipient(message: dict, connections: int) -> None:
+    for _ in range(connections):
+        json.dumps(message)
+
+
+def encode_once(message: dict, connections: int) -> None:
+    frame = encode_frame(message)
+    for _ in range(connections):
+        # Every socket receives the same pre-built frame
+        _ = frame
+
+
+def measure(fn, message: dict, connections: int, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(message, connections)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    message = sample_message()
+    encoder = "orjson" if orjson is not None else "json (orjson not installed)"
+    print(f"Encoder for encode-once path: {encoder}")
+    print(f"{'connections':>12} {'per-recipient us':>18} {'encode-once us':>16} {'speedup':>8}")
+    for connections in CONNECTION_COUNTS:
+        old = measure(per_recipient, message, connections, args.rounds)
+        new = measure(encode_once, message, connections, args.rounds)
+        print(f"{connections:>12} {old:>18.1f} {new:>16.1f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
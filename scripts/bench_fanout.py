@@ -0,0 +1,118 @@
+"""Benchmark: WebSocket frames sent per broadcast, with and without topic subscriptions.
+
+Connects N fake agent sessions to a ConnectionManager (in-memory state
+backend) and replays the same burst of agent status changes and room
+events twice:
+
+- every session on the default topics (WS_DEFAULT_TOPICS, '*' out of the box),
+  i.e. every broadcast reaches every session;
+- sessions subscribed the way the agent page subscribes: their own agent
+  always, 'rooms' only while the inbound calls tab is open, plus a few
+  supervisors on '*'.
+
+Reports the frames handed to sockets and the time spent broadcasting.
+
+Usage: python scripts/bench_fanout.py [--sessions 400] [--status-updates 2000]
+       [--room-events 200] [--inbound-share 0.2] [--supervisors 5]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.api.websocket_manager import ConnectionManager  # noqa: E402
+from app.services.metrics import metrics  # noqa: E402
+from app.services.node_registry import NodeRegistry  # noqa: E402
+from app.services.state_backend import InMemoryHub, InMemoryStateBackend  # noqa: E402
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame: str):
+        self.sent += 1
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def run(args, subscribe: bool) -> dict:
+    rng = random.Random(args.seed)
+    backend = InMemoryStateBackend(InMemoryHub(), node_id="bench")
+    manager = ConnectionManager(backend, nodes=NodeRegistry(backend))
+    # Measure fan-out alone: one frame per status change, no batching
+    manager.status_batch_window = 0
+    sockets = []
+    for agent_id in range(1, args.sessions + 1):
+        websocket = FakeWebSocket()
+        connection = await manager.connect(websocket, str(agent_id))
+        sockets.append(websocket)
+        if not subscribe:
+            continue
+        if agent_id <= args.supervisors:
+            topics = ["*"]
+        elif rng.random() < args.inbound_share:
+            topics = ["rooms"]
+        else:
+            topics = []
+        manager.update_topics(connection, topics, replace=True)
+    await asyncio.sleep(0)  # let the writers send the subscription acks
+    baseline = sum(websocket.sent for websocket in sockets)
+    frames_before = metrics.counters.get("ws.broadcast_frames", 0)
+
+    start = time.perf_counter()
+    for i in range(args.status_updates + args.room_events):
+        if i % (1 + args.status_updates // max(1, args.room_events)) == 0:
+            await manager.broadcast_room_update(
+                {"event": "room_created", "room_name": f"inbound-{i}", "queue": "default"}
+            )
+        else:
+            agent_id = str(rng.randint(1, args.sessions))
+            await manager.broadcast_status_update(agent_id, rng.choice(["Available", "Busy"]))
+        # Give the writers a turn, as a live event loop would between events
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+    for connection in [c for sessions in manager.active_connections.values() for c in sessions]:
+        connection.stop()
+    return {
+        "enqueued": metrics.counters.get("ws.broadcast_frames", 0) - frames_before,
+        "sent": sum(websocket.sent for websocket in sockets) - baseline,
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=400)
+    parser.add_argument("--status-updates", type=int, default=2000)
+    parser.add_argument("--room-events", type=int, default=200)
+    parser.add_argument("--inbound-share", type=float, default=0.2,
+                        help="share of agents with the inbound calls tab open")
+    parser.add_argument("--supervisors", type=int, default=5, help="sessions on '*'")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    broadcasts = args.status_updates + args.room_events
+    print(f"{args.sessions} sessions, {broadcasts} broadcasts")
+    print(f"{'mode':<14}{'frames queued':>15}{'frames sent':>13}{'per broadcast':>15}{'ms':>9}")
+    for label, subscribe in (("default", False), ("subscriptions", True)):
+        result = asyncio.run(run(args, subscribe))
+        print(
+            f"{label:<14}{result['enqueued']:>15.0f}{result['sent']:>13}"
+            f"{result['enqueued'] / broadcasts:>15.1f}{result['seconds'] * 1000:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Reproduce a shift-change login storm against a running server.
+
+Fires N concurrent /api/login requests while a probe keeps hitting a
+cheap endpoint (/api/metrics). With bcrypt on the event loop the probe
+stalls for the whole storm; with the worker pool it stays flat.
+
+Usage:
+    python scripts/bench_login_storm.py --register   # first run: create agents
+    python scripts/bench_login_storm.py --agents 200
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+PASSWORD = "storm-password"
+
+
+def register(base_url: str, count: int):
+    for i in range(count):
+        requests.post(
+            f"{base_url}/api/register",
+            json={
+                "username": f"storm{i}",
+                "full_name": f"Storm Agent {i}",
+                "password": PASSWORD,
+            },
+        )
+
+
+def login(base_url: str, i: int) -> float:
+    start = time.perf_counter()
+    response = requests.post(
+        f"{base_url}/api/login",
+        data={"username": f"storm{i}", "password": PASSWORD},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    if response.status_code != 200:
+        print(f"storm{i}: {response.status_code} {response.text}")
+    return elapsed
+
+
+def probe(base_url: str, stop: threading.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        requests.get(f"{base_url}/api/metrics")
+        samples.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.05)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login storm benchmark")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--register", action="store_true")
+    args = parser.parse_args()
+
+    if args.register:
+        print(f"Registering {args.agents} agents...")
+        register(args.url, args.agents)
+
+    probe_samples = []
+    stop = threading.Event()
+    prober = threading.Thread(target=probe, args=(args.url, stop, probe_samples))
+    prober.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.agents) as pool:
+        latencies = list(pool.map(lambda i: login(args.url, i), range(args.agents)))
+    total = time.perf_counter() - start
+
+    stop.set()
+    prober.join()
+
+    print(f"{args.agents} logins in {total:.1f}s")
+    print(
+        f"login latency ms: p50={statistics.median(latencies):.0f} "
+        f"p95={percentile(latencies, 0.95):.0f} max={max(latencies):.0f}"
+    )
+    print(
+        f"probe latency ms during storm: p50={statistics.median(probe_samples):.1f} "
+        f"p95={percentile(probe_samples, 0.95):.1f} max={max(probe_samples):.1f}"
+    )
+    metrics = requests.get(f"{args.url}/api/metrics").json()
+    queue = metrics["summaries"].get("auth.password.queue_ms")
+    if queue:
+        print(f"server-side bcrypt queue ms: p95={queue['p95']:.0f} max={queue['max']:.0f}")
+
+
+if __name__ == "__main__":
+    main()
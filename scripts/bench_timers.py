@@ -0,0 +1,120 @@
+"""Benchmark: invitation timeouts as one task per timer vs a single timer wheel.
+
+Schedules N timers (default 10k, like a campaign spike with many calls
+ringing at once), cancels most of them the way answered invitations are
+cancelled, and lets the rest fire. Reports the cost of scheduling and
+cancelling, peak memory, and how late the surviving timers fired.
+
+Usage: python scripts/bench_timers.py [--timers 10000] [--delay 1.0]
+       [--cancel 0.9] [--tick 0.1]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.timer_wheel import TimerWheel  # noqa: E402
+
+
+class TaskPerTimer:
+    """The old approach: asyncio.create_task(sleep-then-act) per invitation"""
+
+    def __init__(self):
+        self.tasks = {}
+
+    def schedule(self, key, delay, callback, *args):
+        async def sleeper():
+            await asyncio.sleep(delay)
+            self.tasks.pop(key, None)
+            callback(*args)
+
+        self.tasks[key] = asyncio.create_task(sleeper())
+
+    def cancel(self, key):
+        task = self.tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def stop(self):
+        for task in self.tasks.values():
+            task.cancel()
+
+
+async def run(name: str, args) -> dict:
+    timers = TaskPerTimer() if name == "task_per_timer" else TimerWheel(tick=args.tick)
+    rng = random.Random(7)
+    keys = [("invite", f"inbound-{i}", i) for i in range(args.timers)]
+    lateness = []
+
+    def fired(deadline: float):
+        lateness.append(time.monotonic() - deadline)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    for key in keys:
+        delay = args.delay * (0.5 + rng.random())
+        timers.schedule(key, delay, fired, time.monotonic() + delay)
+    schedule_s = time.perf_counter() - started
+    await asyncio.sleep(0)  # let tasks start so their frames are counted
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    cancelled = rng.sample(keys, int(len(keys) * args.cancel))
+    started = time.perf_counter()
+    for key in cancelled:
+        timers.cancel(key)
+    cancel_s = time.perf_counter() - started
+
+    expected = len(keys) - len(cancelled)
+    deadline = time.monotonic() + args.delay * 3 + 1
+    while len(lateness) < expected and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    timers.stop()
+
+    lateness.sort()
+    return {
+        "name": name,
+        "schedule_us": schedule_s / len(keys) * 1e6,
+        "cancel_us": cancel_s / max(len(cancelled), 1) * 1e6,
+        "peak_kb": peak / 1024,
+        "fired": len(lateness),
+        "expected": expected,
+        "late_p50_ms": statistics.median(lateness) * 1000 if lateness else 0.0,
+        "late_max_ms": lateness[-1] * 1000 if lateness else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--timers", type=int, default=10000)
+    parser.add_argument("--delay", type=float, default=1.0, help="mean timeout (s)")
+    parser.add_argument("--cancel", type=float, default=0.9, help="fraction cancelled")
+    parser.add_argument("--tick", type=float, default=0.1, help="wheel tick (s)")
+    args = parser.parse_args()
+
+    print(
+        f"{args.timers} timers, mean delay {args.delay}s, "
+        f"{args.cancel:.0%} cancelled, wheel tick {args.tick}s"
+    )
+    print(
+        f"{'approach':>15} {'schedule (us)':>14} {'cancel (us)':>12} "
+        f"{'peak (KiB)':>11} {'fired':>11} {'late p50 (ms)':>14} {'late max (ms)':>14}"
+    )
+    for name in ("task_per_timer", "timer_wheel"):
+        result = asyncio.run(run(name, args))
+        print(
+            f"{result['name']:>15} {result['schedule_us']:>14.2f} "
+            f"{result['cancel_us']:>12.2f} {result['peak_kb']:>11.0f} "
+            f"{result['fired']:>5}/{result['expected']:<5} "
+            f"{result['late_p50_ms']:>14.1f} {result['late_max_ms']:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
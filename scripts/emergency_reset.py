@@ -11,6 +11,11 @@ def emergency_reset(username="agent2", password="password123"):
     """
     Emergency reset of call center agent status
     This script fixes ALL possible issues that could prevent making calls
+
+    While the server runs, the agent's live status is held in its presence
+    index and written over the agents table by the write-behind task, so
+    the status written in step 1 only counts if the server is stopped (it
+    is read at startup). Step 3 sets the live status through the API.
     """
     print("===== EMERGENCY CALL CENTER RESET =====")
     print(f"Resetting all states for agent: {username}")
@@ -31,7 +36,8 @@ def emergency_reset(username="agent2", password="password123"):
             
         agent_id = result[0]
         
-        # Reset agent status
+        # Reset agent status (read by the presence index at the next startup;
+        # a running server is reset through the API in step 3)
         cursor.execute("UPDATE agents SET status = 'Available' WHERE id = ?", (agent_id,))
         
         # Mark all calls as completed
@@ -1,9 +1,53 @@
+"""Force an agent's status to Available.
+
+While the server runs, an agent's live status is held in its presence
+index, and the write-behind task writes it over the agents table. So the
+status is set through the API (PUT /api/agents/status) whenever the server
+answers. The agents table is written directly only when the server is
+down; the presence index loads it at the next startup.
+
+Usage: python scripts/force_status.py [username] [password]
+"""
 import sqlite3
 import sys
 
-def force_status_available(username):
-    """Force an agent's status to Available directly in the database."""
+import requests
+
+API_URL = "http://localhost:8000/api"
+
+
+def force_status_via_api(username, password):
+    """Set the live status through a running server; None if it is not running."""
+    try:
+        response = requests.post(
+            f"{API_URL}/login",
+            data={"username": username, "password": password},
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+    except requests.ConnectionError:
+        return None
+    if response.status_code != 200:
+        print(f"Error: login failed for agent '{username}': {response.text}")
+        return False
+    token = response.json().get("access_token")
+    response = requests.put(
+        f"{API_URL}/agents/status",
+        json={"status": "Available"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    if response.status_code != 200:
+        print(f"Error: status update failed: {response.text}")
+        return False
+    print(f"Status updated for agent '{username}' via the API: Available")
+    return True
+
+def force_status_available(username, password="password123"):
+    """Force an agent's status to Available (via the API when the server runs)."""
     try:
+        via_api = force_status_via_api(username, password)
+        if via_api is False:
+            return False
+
         # Connect to the SQLite database
         conn = sqlite3.connect('callcenter.db')
         cursor = conn.cursor()
@@ -19,19 +63,20 @@ def force_status_available(username):
         current_status = result[0]
         print(f"Current status for agent '{username}': {current_status}")
         
-        # Update the status to Available
-        cursor.execute(
-            "UPDATE agents SET status = ? WHERE username = ?", 
-            ("Available", username)
-        )
-        
-        conn.commit()
-        
-        # Verify the update
-        cursor.execute("SELECT status FROM agents WHERE username = ?", (username,))
-        new_status = cursor.fetchone()[0]
-        
-        print(f"Status updated for agent '{username}': {new_status}")
+        if via_api is None:
+            # Server is down: the presence index reads this at startup
+            cursor.execute(
+                "UPDATE agents SET status = ? WHERE username = ?", 
+                ("Available", username)
+            )
+            
+            conn.commit()
+            
+            # Verify the update
+            cursor.execute("SELECT status FROM agents WHERE username = ?", (username,))
+            new_status = cursor.fetchone()[0]
+            
+            print(f"Status updated for agent '{username}' in the database: {new_status}")
         
         # Also check if there are any active calls for this agent
         cursor.execute("""
@@ -63,9 +108,10 @@ if __name__ == "__main__":
         username = sys.argv[1]
     else:
         username = "agent2"  # Default username
+    password = sys.argv[2] if len(sys.argv) > 2 else "password123"
     
     print(f"Forcing status to Available for agent: {username}")
-    success = force_status_available(username)
+    success = force_status_available(username, password)
     
     if success:
         print("\nStatus update successful! You should now be able to make calls.")
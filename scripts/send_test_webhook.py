@@ -0,0 +1,71 @@
+"""Local LiveKit webhook stand-in.
+
+Posts a signed webhook event to the call center exactly the way the
+LiveKit server does (JWT in the Authorization header carrying the
+SHA-256 of the body), so inbound auto-assignment can be exercised
+without a real SIP call.
+
+Usage:
+    python scripts/send_test_webhook.py room_started inbound-15551234567-1700000000
+    python scripts/send_test_webhook.py room_finished inbound-15551234567-1700000000
+"""
+import argparse
+import base64
+import hashlib
+import os
+import sys
+import time
+
+import requests
+from google.protobuf.json_format import MessageToJson
+from livekit import api
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.config import LIVEKIT_API_KEY, LIVEKIT_API_SECRET  # noqa: E402
+
+EVENTS = ("room_started", "participant_joined", "room_finished")
+
+
+def build_body(event: str, room_name: str) -> str:
+    webhook_event = api.WebhookEvent(
+        event=event,
+        room=api.Room(name=room_name),
+        created_at=int(time.time()),
+    )
+    if event == "participant_joined":
+        webhook_event.participant.identity = f"sip_{room_name}"
+    return MessageToJson(webhook_event)
+
+
+def sign(body: str, api_key: str, api_secret: str) -> str:
+    body_hash = base64.b64encode(hashlib.sha256(body.encode()).digest()).decode()
+    return api.AccessToken(api_key, api_secret).with_sha256(body_hash).to_jwt()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send a signed LiveKit webhook")
+    parser.add_argument("event", choices=EVENTS)
+    parser.add_argument("room_name")
+    parser.add_argument("--url", default="http://localhost:8000/api/livekit/webhook")
+    parser.add_argument("--api-key", default=LIVEKIT_API_KEY)
+    parser.add_argument("--api-secret", default=LIVEKIT_API_SECRET)
+    args = parser.parse_args()
+
+    body = build_body(args.event, args.room_name)
+    token = sign(body, args.api_key, args.api_secret)
+
+    start = time.perf_counter()
+    response = requests.post(
+        args.url,
+        data=body,
+        headers={"Authorization": token, "Content-Type": "application/webhook+json"},
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Status code: {response.status_code} ({elapsed_ms:.1f} ms)")
+    print(response.text)
+
+
+if __name__ == "__main__":
+    main()
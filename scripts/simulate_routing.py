@@ -0,0 +1,134 @@
+"""Simulation: how evenly each routing strategy spreads calls across agents.
+
+Replays a Poisson stream of inbound calls against a pool of agents on a
+virtual clock, driving the real PresenceIndex and routing strategies from
+app.services.routing. The "first_by_id" baseline mimics the old behaviour of
+taking agents in database order.
+
+Usage: python scripts/simulate_routing.py [--agents 500] [--calls 10000]
+       [--aht 300] [--occupancy 0.7] [--seed 7]
+"""
+import argparse
+import heapq
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.models.models import AgentStatus  # noqa: E402
+from app.services.presence import PresenceIndex  # noqa: E402
+from app.services.routing import (  # noqa: E402
+    ROUTING_STRATEGIES,
+    RoutingStrategy,
+    create_routing_strategy,
+)
+
+
+class FirstByIdStrategy(RoutingStrategy):
+    """Baseline: lowest agent id first, like the old unordered DB query"""
+
+    name = "first_by_id"
+
+    def key(self, agent_id: int):
+        return (agent_id,)
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def simulate(name: str, args) -> dict:
+    rng = random.Random(args.seed)
+    clock = VirtualClock()
+    presence = PresenceIndex()
+    if name == FirstByIdStrategy.name:
+        strategy = FirstByIdStrategy(clock=clock)
+        presence.add_listener(strategy.on_presence_change)
+    else:
+        strategy = create_routing_strategy(name, presence=presence, clock=clock)
+
+    for agent_id in range(1, args.agents + 1):
+        presence.set_connected(agent_id, True)
+        presence.set_status(agent_id, AgentStatus.AVAILABLE.value)
+    if name == "weighted":
+        # A tenth of the floor are senior agents expected to take double load
+        for agent_id in range(1, args.agents + 1, 10):
+            strategy.set_weight(agent_id, 2.0)
+
+    # Offered load sized so the floor runs at the requested occupancy
+    arrival_rate = args.agents * args.occupancy / args.aht
+    handled = {agent_id: 0 for agent_id in range(1, args.agents + 1)}
+    talk_time = {agent_id: 0.0 for agent_id in range(1, args.agents + 1)}
+    call_ends = []
+    blocked = 0
+    select_ns = 0
+
+    for _ in range(args.calls):
+        arrival = clock.now + rng.expovariate(arrival_rate)
+        while call_ends and call_ends[0][0] <= arrival:
+            # Release agents at their own hang-up time so idle time is exact
+            clock.now, agent_id = heapq.heappop(call_ends)
+            presence.set_status(agent_id, AgentStatus.AVAILABLE.value)
+        clock.now = arrival
+
+        started = time.perf_counter_ns()
+        agent_id = strategy.select()
+        select_ns += time.perf_counter_ns() - started
+        if agent_id is None:
+            blocked += 1
+            continue
+
+        duration = rng.expovariate(1 / args.aht)
+        presence.set_status(agent_id, AgentStatus.BUSY.value)
+        handled[agent_id] += 1
+        talk_time[agent_id] += duration
+        heapq.heappush(call_ends, (clock.now + duration, agent_id))
+
+    counts = list(handled.values())
+    return {
+        "name": name,
+        "blocked": blocked,
+        "min": min(counts),
+        "max": max(counts),
+        "stdev": statistics.pstdev(counts),
+        "idle_agents": sum(1 for count in counts if count == 0),
+        "talk_stdev_min": statistics.pstdev(talk_time.values()) / 60,
+        "select_us": select_ns / args.calls / 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=500)
+    parser.add_argument("--calls", type=int, default=10000)
+    parser.add_argument("--aht", type=float, default=300, help="average handle time (s)")
+    parser.add_argument("--occupancy", type=float, default=0.7)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(
+        f"{args.agents} agents, {args.calls} calls, AHT {args.aht:.0f}s, "
+        f"target occupancy {args.occupancy:.0%}"
+    )
+    print(
+        f"{'strategy':>14} {'blocked':>8} {'min':>5} {'max':>5} {'stdev':>7} "
+        f"{'no calls':>9} {'talk sd (min)':>14} {'select (us)':>12}"
+    )
+    for name in (FirstByIdStrategy.name, *ROUTING_STRATEGIES):
+        result = simulate(name, args)
+        print(
+            f"{result['name']:>14} {result['blocked']:>8} {result['min']:>5} "
+            f"{result['max']:>5} {result['stdev']:>7.2f} {result['idle_agents']:>9} "
+            f"{result['talk_stdev_min']:>14.1f} {result['select_us']:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Stress test: concurrent invitation responses must assign each call exactly once.
+
+Drives the real AutoAssignmentService (in parallel ring mode) against a
+throwaway SQLite database and a fake WebSocket manager whose sends yield to
+the event loop at random. Every invitation gets a burst of duplicate
+responses, as if the WebSocket handler, the REST /auto-assignment/respond
+route and the timeout timer all answered at once. Some of the bursts accept
+and some decline, and some invitations are left to time out. Agents hang up
+shortly after they are assigned, so queued calls keep being drained.
+
+Checks that every call is assigned exactly once, to an agent whose accept
+was the one that succeeded, that no agent is given two calls at the same
+time, and that no ringing state or timer is left over.
+
+Usage: python scripts/stress_assignment.py [--agents 100] [--calls 1000]
+       [--group 5] [--duplicates 3] [--seed 7]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+_db_dir = tempfile.mkdtemp(prefix="stress-assignment-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/stress.db"
+
+from sqlalchemy import select  # noqa: E402
+
+from app.database.db import Base, engine, session_scope  # noqa: E402
+from app.models.models import AgentStatus, Call  # noqa: E402
+from app.services.auto_assignment_service import AutoAssignmentService  # noqa: E402
+from app.services.call_queue import CallQueue  # noqa: E402
+from app.services.presence import PresenceIndex  # noqa: E402
+from app.services.routing import create_routing_strategy  # noqa: E402
+from app.services.timer_wheel import TimerWheel  # noqa: E402
+
+
+class FakeManager:
+    """Records what would have been sent; every send yields at random"""
+
+    def __init__(self, rng: random.Random, on_invite, on_assigned):
+        self.rng = rng
+        self.on_invite = on_invite
+        self.on_assigned = on_assigned
+
+    async def _jitter(self):
+        await asyncio.sleep(self.rng.random() * 0.002)
+
+    async def send_call_invitation(self, agent_id: str, data: dict) -> bool:
+        await self._jitter()
+        self.on_invite(int(agent_id), data["room_name"])
+        return True
+
+    async def send_call_invitation_revoked(self, agent_id: str, data: dict):
+        await self._jitter()
+
+    async def send_assignment_notification(self, agent_id: str, data: dict):
+        await self._jitter()
+        self.on_assigned(int(agent_id), data["room_name"])
+
+    async def broadcast_room_update(self, data: dict):
+        pass
+
+
+async def run(args) -> list:
+    rng = random.Random(args.seed)
+    presence = PresenceIndex()
+    routing = create_routing_strategy("longest_idle", presence=presence)
+    queue = CallQueue(max_size=args.calls)
+    tasks = set()
+
+    accepted_ok = defaultdict(list)  # room -> agents whose accept returned True
+    assignments = defaultdict(list)  # room -> agents notified as the winner
+    in_call = set()
+    problems = []
+
+    def spawn(coro):
+        task = asyncio.ensure_future(coro)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    async def respond(agent_id: int, room_name: str, accepted: bool):
+        await asyncio.sleep(rng.random() * 0.003)
+        ok = await service.handle_invitation_response(room_name, agent_id, accepted)
+        if ok and accepted:
+            accepted_ok[room_name].append(agent_id)
+
+    def on_invite(agent_id: int, room_name: str):
+        roll = rng.random()
+        if roll < 0.1:
+            return  # never answers: the timeout timer responds
+        accepted = roll < 0.6
+        for _ in range(args.duplicates):
+            spawn(respond(agent_id, room_name, accepted))
+
+    async def hang_up(agent_id: int):
+        await asyncio.sleep(rng.random() * 0.02)
+        in_call.discard(agent_id)
+        presence.set_status(agent_id, AgentStatus.AVAILABLE.value)
+
+    def on_assigned(agent_id: int, room_name: str):
+        if agent_id in in_call:
+            problems.append(f"agent {agent_id} given {room_name} while on another call")
+        in_call.add(agent_id)
+        assignments[room_name].append(agent_id)
+        spawn(hang_up(agent_id))
+
+    manager = FakeManager(rng, on_invite, on_assigned)
+    service = AutoAssignmentService(manager, presence=presence, routing=routing, queue=queue)
+    service.timers = TimerWheel(tick=0.01)
+    service.ring_mode = "parallel"
+    service.ring_group_size = args.group
+    service.invitation_timeout = 0.05
+    # Lead (as a lone worker would) so the queue is drained here; there is
+    # no LiveKit server to reconcile against
+    await service.leader.campaign()
+    service.monitor_task.cancel()
+
+    for agent_id in range(1, args.agents + 1):
+        presence.set_connected(agent_id, True)
+        presence.set_status(agent_id, AgentStatus.AVAILABLE.value)
+
+    rooms = [f"inbound-+1555{i:07d}-{i}" for i in range(args.calls)]
+    # Webhook and reconciliation both start some rooms
+    starts = [service._initiate_assignment(room) for room in rooms]
+    starts += [service._initiate_assignment(room) for room in rng.sample(rooms, len(rooms) // 10)]
+    rng.shuffle(starts)
+    await asyncio.gather(*starts)
+
+    deadline = time.monotonic() + args.max_seconds
+    while time.monotonic() < deadline:
+        if len(assignments) == len(rooms) and not tasks and not service.pending_assignments:
+            break
+        service._schedule_drain()  # stands in for the reconciliation loop
+        await asyncio.sleep(0.01)
+
+    for room in rooms:
+        winners = assignments.get(room, [])
+        if len(winners) != 1:
+            problems.append(f"{room} assigned {len(winners)} times: {winners}")
+        elif accepted_ok.get(room) != winners:
+            problems.append(f"{room} went to {winners} but accepts succeeded for {accepted_ok.get(room)}")
+    if service.pending_assignments or service.ringing_agents or len(service.timers):
+        problems.append(
+            f"left over: {len(service.pending_assignments)} pending, "
+            f"{len(service.ringing_agents)} ringing, {len(service.timers)} timers"
+        )
+
+    async with session_scope() as db:
+        calls = (await db.scalars(select(Call))).all()
+    owners = {call.livekit_room_name: call.agent_id for call in calls}
+    for room, winners in assignments.items():
+        if winners and owners.get(room) != winners[0]:
+            problems.append(f"{room} call record belongs to {owners.get(room)}, not {winners[0]}")
+
+    per_agent = Counter(agent for winners in assignments.values() for agent in winners)
+    print(
+        f"{len(rooms)} calls, {args.agents} agents, ring group {args.group}, "
+        f"{args.duplicates} duplicate responses per invitation"
+    )
+    print(
+        f"assigned {sum(len(w) for w in assignments.values())}, "
+        f"calls per agent {min(per_agent.values(), default=0)}-{max(per_agent.values(), default=0)}"
+    )
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=100)
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--group", type=int, default=5, help="agents rung at once")
+    parser.add_argument("--duplicates", type=int, default=3, help="responses per invitation")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--max-seconds", type=float, default=120)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    problems = asyncio.run(run(args))
+    for problem in problems[:20]:
+        print(f"FAIL: {problem}")
+    if problems:
+        print(f"{len(problems)} problems")
+        sys.exit(1)
+    print("OK: every call assigned exactly once")
+
+
+if __name__ == "__main__":
+    main()